@@ -0,0 +1,37 @@
+#!.dt-venv/bin/python3
+"""
+Compare matching a list of merchant keywords with one Regex filter per keyword against
+a single Keywords filter.
+
+Usage: python -m benchmarks.keywords [rows] [keywords]
+"""
+import sys, time
+import numpy as np
+import pandas as pd
+from dt.lib.filter import Regex, Keywords
+from benchmarks.string_ops import descriptions
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    df = pd.DataFrame({"description": descriptions(rows)}).astype({"description": "str"})
+    keywords = [f"MERCHANT {i} PURCHASE" for i in range(0, count * 5, 5)]
+
+    print(f"{rows} rows, {count} keywords, pandas {pd.__version__}")
+
+    start = time.perf_counter()
+    expected = np.zeros(rows, dtype=bool)
+    for keyword in keywords:
+        expected |= Regex("description", f".*{keyword}").apply(df).to_numpy()
+    regex_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = Keywords("description", keywords, case_sensitive=True).apply(df).to_numpy()
+    keywords_seconds = time.perf_counter() - start
+
+    assert (expected == actual).all()
+    print(f"{'one regex per keyword':<24} | {regex_seconds:>9.3f}s")
+    print(f"{'keywords':<24} | {keywords_seconds:>9.3f}s | {regex_seconds / keywords_seconds:>6.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+#!.dt-venv/bin/python3
+"""
+Measure each stage of an import, from reading synthetic statements to writing the database:
+reading, every step of the compiled plan, building and hashing the transaction batch, writing
+new transactions, skipping them as duplicates on a second import, and writing CSV output.
+
+Stage times are the median of the runs; peak memory is the largest amount allocated through
+Python's allocator (tracemalloc) during the stage in a separate traced run, since tracing
+slows the stages down. Results are printed as JSON, and a table is printed to stderr.
+Pass --compare with the JSON of an earlier run to print the change of every stage.
+
+Usage: python -m benchmarks.pipeline [--rows N] [--files N] [--shapes checking ...] [--runs N]
+           [--overlap F] [-o results.json] [--compare baseline.json]
+"""
+import os, sys, json, time, platform, subprocess, tempfile, tracemalloc
+from argparse import ArgumentParser
+from typing import Callable
+import numpy as np
+import pandas as pd
+from benchmarks.statements import SHAPES, Shape, write_statements
+from dt.io.db.interface import DatabaseInterface
+from dt.io.reader import DataReader
+from dt.io.schema import Schema
+from dt.lib.plan import PlanCompiler
+from dt.lib.transaction import TransactionBatch
+from dt.lib.transform import TransformFactory
+
+class Stage:
+    """Timing and peak memory of one stage of the import."""
+    def __init__(self, name: str, rows: int):
+        self.name = name
+        self.rows = rows
+        self.seconds: list[float] = []
+        self.peak_bytes: int | None = None
+
+    def to_dict(self) -> dict:
+        seconds = float(np.median(self.seconds))
+        return {
+            "name": self.name,
+            "rows": self.rows,
+            "seconds": seconds,
+            "rows_per_second": self.rows / seconds if seconds > 0 else None,
+            "peak_bytes": self.peak_bytes,
+        }
+
+class Pipeline:
+    """One import of the statements of a shape, run stage by stage."""
+    def __init__(self, shape: Shape, paths: list[str], directory: str):
+        self.shape = shape
+        self.paths = paths
+        self.directory = directory
+        self.plan = PlanCompiler.compile([TransformFactory.from_dict(t) for t in shape.config["transforms"]])
+        self.schema = Schema.from_dict(shape.config["schema"]) if "schema" in shape.config else None
+
+    def stages(self) -> list[tuple[str, Callable]]:
+        """
+        The stages in order. Each stage is called with the output of the previous one, so the
+        whole list runs an import once.
+        """
+        stages = [("read", lambda _: DataReader(self.paths, usecols=self.plan.usecols(), schema=self.schema).read())]
+        for index, step in enumerate(self.plan.steps):
+            stages.append((f"transform {index} {step.__class__.__name__}", step.transform))
+        stages.append(("hash", TransactionBatch.from_dataframe))
+        stages.append(("write database", self.write_to_db))
+        stages.append(("skip duplicates", self.write_to_db))
+        stages.append(("write csv", self.write_to_csv))
+        return stages
+
+    def write_to_db(self, batch: TransactionBatch) -> TransactionBatch:
+        batch.write_to_db(self.db)
+        return batch
+
+    def write_to_csv(self, batch: TransactionBatch) -> TransactionBatch:
+        batch.write_to_csv(os.path.join(self.directory, "output.csv"))
+        return batch
+
+    def run(self, stages: list[Stage], traced: bool = False) -> int:
+        """Run an import into a new database, recording every stage. Returns the transactions imported."""
+        database = tempfile.mkdtemp(dir=self.directory)
+        self.db = DatabaseInterface(os.path.join(database, "dt"))
+        # Open and migrate the database outside of the measured stages.
+        self.db.connection
+
+        value = None
+        for stage, (_, function) in zip(stages, self.stages()):
+            if traced:
+                tracemalloc.reset_peak()
+                start = tracemalloc.get_traced_memory()[0]
+                value = function(value)
+                stage.peak_bytes = tracemalloc.get_traced_memory()[1] - start
+            else:
+                start = time.perf_counter()
+                value = function(value)
+                stage.seconds.append(time.perf_counter() - start)
+
+        imported = self.db.transactions_count()
+        self.db.connection.close()
+        return imported
+
+def measure(shape: Shape, directory: str, rows: int, files: int, overlap: float, runs: int) -> dict:
+    paths = write_statements(os.path.join(directory, shape.name), shape, rows, files, overlap)
+    pipeline = Pipeline(shape, paths, directory)
+    read = sum(len(pd.read_csv(path, usecols=[0])) for path in paths)
+    stages = [Stage(name, read) for name, _ in pipeline.stages()]
+
+    for _ in range(runs):
+        imported = pipeline.run(stages)
+
+    tracemalloc.start()
+    pipeline.run(stages, traced=True)
+    tracemalloc.stop()
+
+    results = [stage.to_dict() for stage in stages]
+    return {
+        "files": len(paths),
+        "bytes": sum(os.path.getsize(path) for path in paths),
+        "rows": read,
+        "transactions": imported,
+        "seconds": sum(stage["seconds"] for stage in results),
+        "stages": results,
+    }
+
+def commit() -> str | None:
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True)
+        return result.stdout.strip() or None
+    except OSError:
+        return None
+
+def report(results: dict, baseline: dict | None = None):
+    """Print a table of the results, with the change from the baseline when given, to stderr."""
+    print(f"{'stage':<40} | {'seconds':>9} | {'rows/s':>12} | {'peak MiB':>9}" + (" | change" if baseline else ""), file=sys.stderr)
+    for name, shape in results["shapes"].items():
+        print(f"{name}: {shape['rows']} rows, {shape['files']} files, {shape['bytes'] / 2**20:.1f} MiB, {shape['transactions']} transactions imported", file=sys.stderr)
+        before = {stage["name"]: stage for stage in (baseline or {}).get("shapes", {}).get(name, {}).get("stages", [])}
+        for stage in [*shape["stages"], {"name": "total", "seconds": shape["seconds"], "rows_per_second": shape["rows"] / shape["seconds"], "peak_bytes": None}]:
+            line = f"  {stage['name']:<38} | {stage['seconds']:>9.3f} | {stage['rows_per_second'] or 0:>12,.0f} | "
+            line += f"{stage['peak_bytes'] / 2**20:>9.1f}" if stage["peak_bytes"] is not None else " " * 9
+            if baseline:
+                seconds = before[stage["name"]]["seconds"] if stage["name"] in before else baseline["shapes"].get(name, {}).get("seconds") if stage["name"] == "total" else None
+                line += f" | {stage['seconds'] / seconds:>5.2f}x" if seconds else " |"
+            print(line, file=sys.stderr)
+
+def main():
+    parser = ArgumentParser(description="Benchmark the stages of an import of synthetic statements.")
+    parser.add_argument("--rows", type=int, default=200_000, help="Transactions generated per shape.")
+    parser.add_argument("--files", type=int, default=4, help="Statements the transactions of a shape are split over.")
+    parser.add_argument("--overlap", type=float, default=0.05, help="Fraction of each statement repeated from the previous one.")
+    parser.add_argument("--shapes", nargs="+", choices=list(SHAPES), default=list(SHAPES), help="Institution shapes to generate.")
+    parser.add_argument("--runs", type=int, default=3, help="Timed runs per shape; stage times are the median.")
+    parser.add_argument("-o", "--output", help="Write the JSON results to this file instead of stdout.")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare with.")
+    args = parser.parse_args()
+
+    results = {
+        "commit": commit(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "parameters": {"rows": args.rows, "files": args.files, "overlap": args.overlap, "runs": args.runs},
+        "shapes": {},
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        for name in args.shapes:
+            results["shapes"][name] = measure(SHAPES[name], directory, args.rows, args.files, args.overlap, args.runs)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+    report(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=4)
+    else:
+        print(json.dumps(results, indent=4))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+#!.dt-venv/bin/python3
+"""
+Compare parsing dates one value at a time with datetime.strptime (the former ReadDate)
+with the vectorized ReadDate.transform_column.
+
+Usage: python -m benchmarks.read_date [values ...]
+"""
+import sys, time
+from datetime import datetime
+import pandas as pd
+from dt.lib.transform import ReadDate
+
+DATE_FORMAT = "%m/%d/%Y"
+
+def synthetic_dates(values: int) -> pd.Series:
+    dates = [f"{month:02d}/{day:02d}/2025" for month in range(1, 13) for day in range(1, 29)]
+    return pd.Series((dates * (values // len(dates) + 1))[:values], name="date")
+
+def one_by_one(dates: pd.Series) -> pd.Series:
+    return dates.transform(lambda date: datetime.strptime(date, DATE_FORMAT))
+
+def measure(function, dates: pd.Series) -> float:
+    start = time.perf_counter()
+    function(dates)
+    return len(dates) / (time.perf_counter() - start)
+
+def main():
+    sizes = [int(size) for size in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    read_date = ReadDate(columns=["date"], date_format=DATE_FORMAT)
+
+    print(f"{'values':>10} | {'strptime (values/s)':>20} | {'vectorized (values/s)':>22} | {'speedup':>7}")
+    for size in sizes:
+        dates = synthetic_dates(size)
+        before = measure(one_by_one, dates)
+        after = measure(read_date.transform_column, dates)
+        print(f"{size:>10} | {before:>20,.0f} | {after:>22,.0f} | {after / before:>6.1f}x")
+
+if __name__ == "__main__":
+    main()
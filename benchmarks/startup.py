@@ -0,0 +1,58 @@
+#!.dt-venv/bin/python3
+"""
+Measure the startup cost of the CLI: wall time of light commands and the imports they
+load, as reported by `python -X importtime`.
+
+Usage: python -m benchmarks.startup [runs]
+"""
+import os, sys, time, subprocess, tempfile, shutil
+
+COMMANDS = [["--help"], ["config", "list"]]
+
+# Modules which should only be imported by the applications that process data.
+HEAVY_MODULES = ["pandas", "numpy", "pyarrow"]
+
+def cli_copy(directory: str) -> str:
+    """Copy the dt package so the database created by the commands stays out of the repository."""
+    source = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "dt")
+    shutil.copytree(source, os.path.join(directory, "dt"), ignore=shutil.ignore_patterns("db.sqlite*", "__pycache__"))
+    return directory
+
+def run(directory: str, command: list[str], importtime: bool = False) -> tuple[float, str]:
+    flags = ["-X", "importtime"] if importtime else []
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join([directory, os.environ.get("PYTHONPATH", "")])}
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, *flags, "-m", "dt.cli", *command], cwd=directory, env=env, capture_output=True, text=True)
+    return time.perf_counter() - start, result.stderr
+
+def imports(stderr: str) -> list[tuple[int, str, bool]]:
+    """Parse -X importtime output into (cumulative microseconds, module, top level) of every import."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented below the module importing them.
+        modules.append((int(cumulative), name.strip(), not name.startswith("  ")))
+    return modules
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    with tempfile.TemporaryDirectory() as directory:
+        cli_copy(directory)
+        print(f"python {sys.version.split()[0]}, {runs} runs per command")
+
+        for command in COMMANDS:
+            run(directory, command)
+            seconds = sorted(run(directory, command)[0] for _ in range(runs))
+            modules = imports(run(directory, command, importtime=True)[1])
+            loaded = [name for name in HEAVY_MODULES if any(module == name or module.startswith(f"{name}.") for _, module, _ in modules)]
+            top_level = [(cumulative, module) for cumulative, module, top in modules if top]
+
+            print(f"\ndt {' '.join(command)}: median {seconds[len(seconds) // 2] * 1000:.0f} ms, imports {sum(c for c, _ in top_level) / 1000:.0f} ms, heavy modules: {', '.join(loaded) or 'none'}")
+            for cumulative, module in sorted(top_level, reverse=True)[:5]:
+                print(f"  {cumulative / 1000:>8.1f} ms  {module}")
+
+if __name__ == "__main__":
+    main()
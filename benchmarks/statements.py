@@ -0,0 +1,175 @@
+#!.dt-venv/bin/python3
+"""
+Generate synthetic bank statements shaped like the exports of different kinds of institution,
+together with a configuration which imports them.
+
+Usage: python -m benchmarks.statements <shape> <directory> [rows] [files]
+"""
+import os, sys, json
+import numpy as np
+import pandas as pd
+
+class Shape:
+    """
+    Layout of the statements exported by one kind of institution: the columns of the file,
+    how each column is written and the configuration which turns the file into transactions.
+    """
+    def __init__(self, name: str, columns: list[str], date_format: str, config: dict):
+        self.name = name
+        self.columns = columns
+        self.date_format = date_format
+        self.config = config
+
+    def frame(self, dates: pd.Series, merchants: np.ndarray, amounts: np.ndarray, rng: np.random.Generator) -> pd.DataFrame:
+        """Write the generated transactions in the layout of the institution."""
+        raise NotImplementedError()
+
+    def __str__(self) -> str:
+        return f"{self.__class__.__name__}(name={self.name}, columns={self.columns})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+def institution_transforms(institution: str, credit: str = "greater_than") -> list[dict]:
+    """
+    Transforms shared by every shape once the columns are renamed: institution, type and sign
+    of the amount. Credits are the amounts matching the credit comparison with zero.
+    """
+    return [
+        {"type": "trim_strings", "columns": ["description"]},
+        {"type": "create_column", "name": "institution", "default_value": institution},
+        {"type": "create_column", "name": "type", "default_value": "debit"},
+        {"type": "conditional_update", "filters": [{"type": credit, "column": "amount", "threshold": 0}], "assignments": [{"type": "string", "column": "type", "value": "credit"}]},
+        {"type": "absolute_value", "columns": ["amount"]},
+        {"type": "reorder_columns", "columns": ["date", "description", "institution", "type", "amount"]}
+    ]
+
+class Checking(Shape):
+    """Checking account: signed plain amounts, a running balance and padded descriptions."""
+    def __init__(self):
+        super().__init__("checking", ["Date", "Description", "Amount", "Balance"], "%m/%d/%Y", {
+            "name": "checking",
+            "transforms": [
+                {"type": "rename_columns", "columns": {"Date": "date", "Description": "description", "Amount": "amount", "Balance": "balance"}},
+                {"type": "drop_columns", "columns": ["balance"]},
+                {"type": "date", "columns": ["date"], "date_format": "%m/%d/%Y"},
+                *institution_transforms("Checking")
+            ]
+        })
+
+    def frame(self, dates, merchants, amounts, rng):
+        return pd.DataFrame({
+            "Date": dates.dt.strftime(self.date_format),
+            "Description": np.char.add(np.char.add("  POS PURCHASE ", merchants.astype(str)), "  "),
+            "Amount": np.char.mod("%.2f", amounts),
+            "Balance": np.char.mod("%.2f", 5000 + np.cumsum(amounts)),
+        })
+
+class CreditCard(Shape):
+    """Credit card: positive charges written as currency, payments in accounting parentheses, typed by a schema."""
+    def __init__(self):
+        super().__init__("credit_card", ["Transaction Date", "Post Date", "Description", "Category", "Amount"], "%Y-%m-%d", {
+            "name": "credit_card",
+            "transforms": [
+                {"type": "rename_columns", "columns": {"Transaction Date": "date", "Post Date": "post_date", "Description": "description", "Category": "category", "Amount": "amount"}},
+                {"type": "drop_columns", "columns": ["post_date", "category"]},
+                *institution_transforms("Card", credit="less_than")
+            ],
+            "schema": {"columns": {"Transaction Date": {"type": "date", "format": "%Y-%m-%d"}, "Amount": "decimal"}, "infer": True}
+        })
+
+    def frame(self, dates, merchants, amounts, rng):
+        categories = np.array(["Groceries", "Dining", "Travel", "Shopping", "Utilities"])
+        text = np.char.add("$", np.array([f"{abs(amount):,.2f}" for amount in amounts]))
+        return pd.DataFrame({
+            "Transaction Date": dates.dt.strftime(self.date_format),
+            "Post Date": (dates + pd.to_timedelta(rng.integers(0, 3, len(dates)), unit="D")).dt.strftime(self.date_format),
+            "Description": merchants,
+            "Category": categories[rng.integers(0, len(categories), len(dates))],
+            "Amount": np.where(amounts < 0, text, np.char.add(np.char.add("(", text), ")")),
+        })
+
+class Brokerage(Shape):
+    """Brokerage account: long dates, many columns which are dropped and actions labelled by keyword."""
+    ACTIONS = np.array(["YOU BOUGHT", "YOU SOLD", "DIVIDEND RECEIVED", "REINVESTMENT", "FEE CHARGED"])
+
+    def __init__(self):
+        super().__init__("brokerage", ["Run Date", "Account", "Action", "Symbol", "Description", "Quantity", "Price", "Amount", "Settlement Date"], "%B %d, %Y", {
+            "name": "brokerage",
+            "transforms": [
+                {"type": "rename_columns", "columns": {"Run Date": "date", "Action": "action", "Description": "description", "Amount": "amount"}},
+                {"type": "drop_columns", "columns": ["Account", "Symbol", "Quantity", "Price", "Settlement Date"]},
+                {"type": "date", "columns": ["date"], "date_format": "%B %d, %Y"},
+                *institution_transforms("Brokerage")[:4],
+                {"type": "conditional_update", "filters": [], "assignments": [{"type": "keyword", "column": "type", "value": "action", "keywords": {"bought": "buy", "sold": "sell", "dividend": "dividend", "fee": "fee"}}]},
+                {"type": "drop_columns", "columns": ["action"]},
+                *institution_transforms("Brokerage")[4:]
+            ]
+        })
+
+    def frame(self, dates, merchants, amounts, rng):
+        quantity = rng.integers(1, 200, len(dates))
+        return pd.DataFrame({
+            "Run Date": dates.dt.strftime(self.date_format),
+            "Account": "Individual X12345678",
+            "Action": self.ACTIONS[rng.integers(0, len(self.ACTIONS), len(dates))],
+            "Symbol": np.char.add("SYM", (rng.integers(0, 500, len(dates))).astype(str)),
+            "Description": np.char.add(merchants.astype(str), " COMMON STOCK"),
+            "Quantity": quantity,
+            "Price": np.char.mod("%.2f", np.abs(amounts) / quantity),
+            "Amount": np.char.mod("%.2f", amounts),
+            "Settlement Date": (dates + pd.Timedelta(days=2)).dt.strftime(self.date_format),
+        })
+
+SHAPES = {shape.name: shape for shape in [Checking(), CreditCard(), Brokerage()]}
+
+def transactions(rows: int, rng: np.random.Generator) -> tuple[pd.Series, np.ndarray, np.ndarray]:
+    """
+    Dates over two years, newest first as statements list them, merchants with a long tail of
+    rarely seen names and mostly small debits with occasional large credits.
+    """
+    dates = pd.Series(pd.Timestamp("2024-01-01") + pd.to_timedelta(np.sort(rng.integers(0, 730, rows))[::-1], unit="D"))
+    merchant_ids = np.minimum(rng.zipf(1.3, rows), 20_000)
+    merchants = np.char.add("MERCHANT ", merchant_ids.astype(str))
+    debits = -np.round(rng.lognormal(3, 1.2, rows), 2)
+    credits = np.round(rng.lognormal(7, 0.5, rows), 2)
+    amounts = np.where(rng.random(rows) < 0.1, credits, debits)
+    return dates, merchants, amounts
+
+def write_statements(directory: str, shape: Shape, rows: int, files: int = 1, overlap: float = 0.0, seed: int = 0) -> list[str]:
+    """
+    Write rows transactions split over files statements of the shape into the directory.
+    Each statement after the first repeats the last overlap fraction of the previous one,
+    as overlapping exports do, so importing them exercises duplicate detection.
+    Returns the paths of the written files.
+    """
+    rng = np.random.default_rng(seed)
+    df = shape.frame(*transactions(rows, rng), rng)
+    os.makedirs(directory, exist_ok=True)
+
+    paths = []
+    bounds = np.linspace(0, rows, files + 1).astype(int)
+    for index, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+        repeated = int((end - start) * overlap) if index > 0 else 0
+        path = os.path.join(directory, f"{shape.name}_{index:04d}.csv")
+        df.iloc[start - repeated:end].to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in SHAPES:
+        print(f"Usage: python -m benchmarks.statements <{'|'.join(SHAPES)}> <directory> [rows] [files]")
+        sys.exit(1)
+
+    shape = SHAPES[sys.argv[1]]
+    rows = int(sys.argv[3]) if len(sys.argv) > 3 else 100_000
+    files = int(sys.argv[4]) if len(sys.argv) > 4 else 1
+    paths = write_statements(sys.argv[2], shape, rows, files)
+
+    config_path = os.path.join(sys.argv[2], f"{shape.name}.json")
+    with open(config_path, "w") as file:
+        json.dump(shape.config, file, indent=4)
+    print(f"Wrote {rows} {shape.name} transactions to {len(paths)} files and the configuration {config_path}")
+
+if __name__ == "__main__":
+    main()
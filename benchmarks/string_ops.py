@@ -0,0 +1,53 @@
+#!.dt-venv/bin/python3
+"""
+Compare the former per-element TrimStrings and Regex implementations with the
+vectorized ones on a description column.
+
+Usage: python -m benchmarks.string_ops [rows]
+"""
+import sys, time
+import numpy as np
+import pandas as pd
+from dt.lib.transform import TrimStrings
+from dt.lib.filter import Regex
+
+def descriptions(rows: int, seed: int = 0) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    merchants = np.array([f"  MERCHANT {i} PURCHASE #{i * 7}  " for i in range(5000)], dtype=object)
+    return pd.Series(merchants[rng.integers(0, len(merchants), rows)], dtype=object, name="description")
+
+def measure(name: str, before, after):
+    start = time.perf_counter()
+    before()
+    before_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    after()
+    after_seconds = time.perf_counter() - start
+
+    print(f"{name:<28} | {before_seconds:>9.3f}s | {after_seconds:>9.3f}s | {before_seconds / after_seconds:>6.1f}x")
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    pattern = r"MERCHANT 4\d+"
+    column = descriptions(rows)
+    df = pd.DataFrame({"description": column})
+    strings = df.astype({"description": "str"})
+
+    print(f"{rows} rows, pandas {pd.__version__}, description dtype {column.dtype} / {strings['description'].dtype}")
+    print(f"{'operation':<28} | {'before':>10} | {'after':>10} | speedup")
+    measure("trim (object column)",
+        lambda: column.transform(lambda s: s.strip() if isinstance(s, str) else s),
+        lambda: TrimStrings(["description"]).transform_column(column))
+    measure("trim (string column)",
+        lambda: strings["description"].transform(lambda s: s.strip() if isinstance(s, str) else s),
+        lambda: TrimStrings(["description"]).transform_column(strings["description"]))
+    measure("regex (object column)",
+        lambda: df["description"].astype(str).str.match(pattern),
+        lambda: Regex("description", pattern).apply(df))
+    measure("regex (string column)",
+        lambda: strings["description"].astype(str).str.match(pattern),
+        lambda: Regex("description", pattern).apply(strings))
+
+if __name__ == "__main__":
+    main()
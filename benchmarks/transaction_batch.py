@@ -0,0 +1,46 @@
+#!.dt-venv/bin/python3
+"""
+Compare building transactions row by row (the former TransactionList.from_dataframe)
+with the columnar TransactionBatch.from_dataframe.
+
+Usage: python -m benchmarks.transaction_batch [rows ...]
+"""
+import sys, time
+import numpy as np
+import pandas as pd
+from dt.lib.transaction import Transaction, TransactionBatch
+
+def synthetic_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    merchants = np.array([f"MERCHANT {i} PURCHASE" for i in range(2000)], dtype=object)
+    return pd.DataFrame({
+        "date": pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 5 * 365, rows), unit="D"),
+        "description": merchants[rng.integers(0, len(merchants), rows)],
+        "institution": np.where(rng.random(rows) < 0.5, "Bank A", "Bank B"),
+        "type": np.where(rng.random(rows) < 0.8, "debit", "credit"),
+        "amount": np.round(rng.uniform(0, 500, rows), 2),
+    })
+
+def row_by_row(df: pd.DataFrame) -> list[Transaction]:
+    return [
+        Transaction(date=row['date'], description=row['description'], institution=row['institution'], type=row['type'], amount_cents=round(row["amount"] * 100))
+        for _, row in df.iterrows()
+    ]
+
+def measure(function, df: pd.DataFrame) -> float:
+    start = time.perf_counter()
+    function(df)
+    return len(df) / (time.perf_counter() - start)
+
+def main():
+    sizes = [int(size) for size in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+
+    print(f"{'rows':>10} | {'row by row (rows/s)':>20} | {'batch (rows/s)':>16} | {'speedup':>7}")
+    for size in sizes:
+        df = synthetic_frame(size)
+        before = measure(row_by_row, df)
+        after = measure(TransactionBatch.from_dataframe, df)
+        print(f"{size:>10} | {before:>20,.0f} | {after:>16,.0f} | {after / before:>6.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,9 @@
 #!.dt-venv/bin/python3
 import sys, time
-from tracemalloc import start
 from dt.io.argument_parser import ArgumentReader
 from dt.lib.application import ApplicationFactory
 from dt.io.db.interface import DatabaseInterface
-from dt.lib.application import ConfigApplication, TransformApplication
+from dt.lib.application import ConfigApplication, TransformApplication, WatchApplication, QueryApplication, SearchApplication, ReportApplication
 
 def main():
     try:
@@ -16,6 +15,10 @@ def main():
         # Attach applications.
         ConfigApplication.attach(arg_reader.get_subparser())
         TransformApplication.attach(arg_reader.get_subparser())
+        WatchApplication.attach(arg_reader.get_subparser())
+        QueryApplication.attach(arg_reader.get_subparser())
+        SearchApplication.attach(arg_reader.get_subparser())
+        ReportApplication.attach(arg_reader.get_subparser())
 
         # Determine application to run.
         application = ApplicationFactory.create_application(arg_reader, database_interface)
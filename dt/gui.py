@@ -1,26 +1,200 @@
 #!.dt-venv/bin/python3
-from PyQt5.QtCore import QSize, Qt
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, QObject, QSize, QTimer, Qt, pyqtSignal
 from PyQt5.QtWidgets import (
     QApplication,
+    QComboBox,
+    QFileDialog,
+    QHeaderView,
+    QInputDialog,
+    QLineEdit,
     QMainWindow,
-    QToolBar,
-    QTableWidget,
-    QTableWidgetItem
+    QMessageBox,
+    QProgressDialog,
+    QTableView,
+    QToolBar
 )
 
-from dt.db.interface import DatabaseConnection
-from dt.db.reader_interface import ReaderDatabaseInterface
+from dt.io.db.interface import DatabaseInterface
+from dt.io.db.query import TransactionQuery, DEFAULT_PAGE_SIZE, format_amount
+from dt.lib.job import ImportJob, ImportProgress, ImportCancelled
 import sys
 
-app = QApplication(sys.argv)
-primary_screen = app.primaryScreen()
-height = primary_screen.size().height() if primary_screen else 600
-width = primary_screen.size().width() if primary_screen else 800
+# Columns of the transaction table: header label and the sort column of each.
+TABLE_COLUMNS = [
+    ("Date", "date"),
+    ("Description", "description"),
+    ("Institution", "institution"),
+    ("Type", "type"),
+    ("Amount", "amount"),
+    ("Category", "category"),
+]
 
 
-class DTTable(QTableWidget):
-    def __init__(self):
+class TransactionTableModel(QAbstractTableModel):
+    """
+    Transactions matching a query, fetched from the database a page at a time as the view
+    scrolls to the last fetched row (canFetchMore/fetchMore). Sorting and filtering replace
+    the query and start again from the first page, so they run in the database and only the
+    rows scrolled past are ever held in memory.
+    """
+    def __init__(self, db: DatabaseInterface, query: TransactionQuery | None = None, page_size: int = DEFAULT_PAGE_SIZE):
         super().__init__()
+        self.db = db
+        self.query = query or TransactionQuery()
+        self.page_size = page_size
+        self.rows: list[tuple] = []
+        self.after: tuple | None = None
+        self.exhausted = False
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(TABLE_COLUMNS)
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.TextAlignmentRole and TABLE_COLUMNS[index.column()][1] == "amount":
+            return int(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+
+        _, _, day, description, institution, type, amount_cents, category = self.rows[index.row()]
+        # Dates are stored as ISO 8601 date times; missing dates were stored as NaT.
+        values = ["" if day in (None, "NaT") else day[:10], description, institution, type, format_amount(amount_cents), category]
+        value = values[index.column()]
+        return "" if value is None else str(value)
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return TABLE_COLUMNS[section][0]
+        return super().headerData(section, orientation, role)
+
+    def canFetchMore(self, parent: QModelIndex = QModelIndex()) -> bool:
+        return not parent.isValid() and not self.exhausted
+
+    def fetchMore(self, parent: QModelIndex = QModelIndex()):
+        """Append the next page of the query, starting after the key of the last fetched row."""
+        if not self.canFetchMore(parent):
+            return
+
+        rows = self.db.transactions_query(self.query, self.after, self.page_size)
+        self.exhausted = len(rows) < self.page_size
+        if len(rows) == 0:
+            return
+
+        self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(rows) - 1)
+        self.rows.extend(rows)
+        self.after = self.query.key(rows[-1])
+        self.endInsertRows()
+
+    def sort(self, column: int, order: Qt.SortOrder = Qt.SortOrder.AscendingOrder):
+        self.query.sort = TABLE_COLUMNS[column][1]
+        self.query.descending = order == Qt.SortOrder.DescendingOrder
+        self.reset()
+
+    def set_query(self, query: TransactionQuery):
+        """Show the transactions of the query, keeping the current sort order."""
+        query.sort = self.query.sort
+        query.descending = self.query.descending
+        self.query = query
+        self.reset()
+
+    def reset(self):
+        """Drop the fetched rows and fetch the first page of the query again."""
+        self.beginResetModel()
+        self.rows = []
+        self.after = None
+        self.exhausted = False
+        self.endResetModel()
+        self.fetchMore()
+
+
+class DTFilterBar(QToolBar):
+    """Filters of the transaction table: description text and institution, type and category."""
+    def __init__(self, db: DatabaseInterface, model: TransactionTableModel):
+        super().__init__("Filters")
+        self.db = db
+        self.model = model
+
+        self.text = QLineEdit()
+        self.text.setPlaceholderText("Description contains")
+        self.text.setClearButtonEnabled(True)
+        self.addWidget(self.text)
+
+        # Filter once typing pauses rather than on every key press.
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(300)
+        self.timer.timeout.connect(self.apply)
+        self.text.textChanged.connect(lambda: self.timer.start())
+
+        self.choices = {}
+        for column in ["institution", "type", "category"]:
+            choice = QComboBox()
+            choice.currentIndexChanged.connect(self.apply)
+            self.addWidget(choice)
+            self.choices[column] = choice
+        self.load_choices()
+
+    def load_choices(self):
+        """
+        Fill the choices with the stored values, keeping the current selections. Distinct values
+        are read from the monthly aggregates instead of the transactions.
+        """
+        labels = {"institution": "All institutions", "type": "All types", "category": "All categories"}
+        for column, choice in self.choices.items():
+            selected = choice.currentData()
+            choice.blockSignals(True)
+            choice.clear()
+            choice.addItem(labels[column], None)
+            for value in self.db.aggregates_values(column):
+                choice.addItem(value, value)
+            choice.setCurrentIndex(max(choice.findData(selected), 0))
+            choice.blockSignals(False)
+
+    def query(self) -> TransactionQuery:
+        selected = {column: [choice.currentData()] if choice.currentData() is not None else None for column, choice in self.choices.items()}
+        return TransactionQuery(
+            institutions=selected["institution"],
+            types=selected["type"],
+            categories=selected["category"],
+            text=self.text.text().strip() or None
+        )
+
+    def apply(self):
+        self.model.set_query(self.query())
+
+
+class ImportWorker(QObject):
+    """
+    Runs an ImportJob on a worker thread so the window keeps responding. The job reports from
+    the worker thread; the signals deliver its progress and result on the thread of the window.
+    """
+    progress = pyqtSignal(object)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, job: ImportJob):
+        super().__init__()
+        self.job = job
+        self.job.on_progress = self.progress.emit
+
+    def start(self):
+        self.job.start(on_finished=self.done)
+
+    def cancel(self):
+        self.job.cancel()
+
+    def done(self, job: ImportJob):
+        if job.error is None:
+            self.finished.emit(job.progress)
+        elif isinstance(job.error, ImportCancelled):
+            self.cancelled.emit()
+        else:
+            self.failed.emit(str(job.error))
 
 
 class DTToolbar(QToolBar):
@@ -30,50 +204,93 @@ class DTToolbar(QToolBar):
 
         menu = window.menuBar()
         file_menu = menu.addMenu("File")
+        import_action = file_menu.addAction("Import Files...")
+        import_action.triggered.connect(window.choose_import)
 
 
 class DTMainWindow(QMainWindow):
-    def show_state(self, state):
-        print(state == Qt.CheckState.Checked)
-        print(state)
-
-    def __init__(self):
+    def __init__(self, db: DatabaseInterface):
         super().__init__()
 
-        dbc = DatabaseConnection(sys.argv[0])
-        dbc.init_db()
-        rdbi = ReaderDatabaseInterface(dbc)
-
         self.setWindowTitle("Data Transformer")
-        self.setMinimumSize(QSize(width // 2 , height // 2))
-
-        transaction_count = rdbi.transactions_amount()
-        transactions = rdbi.transactions_fetch_all()
-
-        table = QTableWidget(transaction_count, 5)
-        table.setHorizontalHeaderLabels(["Date", "Description", "Institution", "Type", "Amount"])
-        
-        for index, transaction in enumerate(transactions):
-            dateItem = QTableWidgetItem(transaction[1])
-            descriptionItem = QTableWidgetItem(transaction[2])
-            institutionItem = QTableWidgetItem(transaction[3])
-            typeItem = QTableWidgetItem(transaction[4])
-            amountItem = QTableWidgetItem(str(transaction[5]))
-
-            table.setItem(index, 0, dateItem)
-            table.setItem(index, 1, descriptionItem)
-            table.setItem(index, 2, institutionItem)
-            table.setItem(index, 3, typeItem)
-            table.setItem(index, 4, amountItem)
-        
-        table.show()
+        screen = QApplication.primaryScreen()
+        size = screen.size() if screen else QSize(800, 600)
+        self.setMinimumSize(QSize(size.width() // 2, size.height() // 2))
+
+        self.db = db
+        self.model = TransactionTableModel(db)
+        self.worker: ImportWorker | None = None
 
+        table = QTableView()
+        table.setModel(self.model)
+        table.setWordWrap(False)
+        # Fixed row heights let the view lay out rows without measuring every one of them.
+        table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        table.horizontalHeader().setStretchLastSection(True)
+        table.horizontalHeader().setSortIndicator(0, Qt.SortOrder.AscendingOrder)
+        # Enabling sorting sorts by the indicator, which fetches the first page.
+        table.setSortingEnabled(True)
+        self.table = table
+
+        self.filters = DTFilterBar(db, self.model)
         self.addToolBar(DTToolbar(self))
+        self.addToolBar(self.filters)
 
         self.setCentralWidget(table)
 
+    def choose_import(self):
+        """Ask for a configuration and the files to import with it, then import them."""
+        configs = [row[0] for row in self.db.config_list()]
+        if len(configs) == 0:
+            QMessageBox.information(self, "Import Files", "Add a configuration with `dt config add` before importing files.")
+            return
+
+        config, chosen = QInputDialog.getItem(self, "Import Files", "Configuration:", configs, 0, False)
+        if not chosen:
+            return
+        paths, _ = QFileDialog.getOpenFileNames(self, "Import Files", "", "Statements (*.csv *.parquet *.arrow *.feather);;All files (*)")
+        if len(paths) > 0:
+            self.start_import(config, paths)
+
+    def start_import(self, config: str, paths: list[str]) -> ImportWorker:
+        """Import the files with the configuration in the background, showing its progress."""
+        from dt.lib.config import Config
+
+        dialog = QProgressDialog("Reading files...", "Cancel", 0, 0, self)
+        dialog.setWindowTitle("Import Files")
+        dialog.setMinimumDuration(0)
+
+        worker = ImportWorker(ImportJob(self.db, Config(config, self.db), paths))
+        worker.progress.connect(lambda progress: self.show_progress(dialog, progress))
+        worker.finished.connect(lambda progress: self.import_finished(dialog, f"Imported {progress.rows_inserted} transactions ({progress.rows_skipped} duplicates skipped)"))
+        worker.cancelled.connect(lambda: self.import_finished(dialog, "Import cancelled"))
+        worker.failed.connect(lambda error: self.import_finished(dialog, f"Import failed: {error}"))
+        dialog.canceled.connect(worker.cancel)
+
+        self.worker = worker
+        worker.start()
+        return worker
+
+    def show_progress(self, dialog: QProgressDialog, progress: ImportProgress):
+        dialog.setMaximum(progress.files_total)
+        dialog.setValue(progress.files_read)
+        dialog.setLabelText(progress.summary())
+
+    def import_finished(self, dialog: QProgressDialog, message: str):
+        dialog.reset()
+        self.statusBar().showMessage(message)
+        self.filters.load_choices()
+        self.model.reset()
+
+
+def main():
+    app = QApplication(sys.argv)
+
+    window = DTMainWindow(DatabaseInterface(sys.argv[0]))
+    window.show()
+
+    sys.exit(app.exec())
 
-window = DTMainWindow()
-window.show()
 
-app.exec()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
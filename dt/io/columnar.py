@@ -0,0 +1,94 @@
+import os, glob
+from uuid import uuid4
+from typing import Callable, Iterator
+import pandas as pd
+
+# Supported columnar formats and the pyarrow dataset format each is written with.
+# Arrow and Feather files are both written in the Arrow IPC file format.
+COLUMNAR_FORMATS = {"parquet": "parquet", "arrow": "ipc", "feather": "ipc"}
+
+def import_pyarrow():
+    """Import pyarrow, which is only required for columnar files."""
+    try:
+        import pyarrow
+        return pyarrow
+    except ImportError:
+        raise ValueError("Columnar formats (parquet, arrow, feather) require pyarrow; install it with `pip install pyarrow`.")
+
+def columns_to_read(names: list[str], usecols: Callable | None) -> list[str] | None:
+    return None if usecols is None else [name for name in names if usecols(name)]
+
+def to_frame(table) -> pd.DataFrame:
+    # Dates are stored as date32 and read back as datetime64 so they match dates parsed from CSV.
+    return table.to_pandas(date_as_object=False)
+
+def read_columnar(file_path: str, usecols: Callable | None = None) -> pd.DataFrame:
+    """Read a Parquet, Arrow or Feather file, keeping only the columns usecols accepts."""
+    import_pyarrow()
+    import pyarrow.parquet as pq
+    import pyarrow.feather as feather
+
+    if file_path.endswith(".parquet"):
+        columns = columns_to_read(pq.read_schema(file_path).names, usecols)
+        return to_frame(pq.read_table(file_path, columns=columns))
+    else:
+        table = feather.read_table(file_path, memory_map=True)
+        columns = columns_to_read(table.column_names, usecols)
+        return to_frame(table if columns is None else table.select(columns))
+
+def read_columnar_chunks(file_path: str, chunksize: int, usecols: Callable | None = None) -> Iterator[pd.DataFrame]:
+    """Read a Parquet, Arrow or Feather file lazily, at most chunksize rows at a time."""
+    pa = import_pyarrow()
+    import pyarrow.parquet as pq
+
+    if file_path.endswith(".parquet"):
+        parquet_file = pq.ParquetFile(file_path)
+        columns = columns_to_read(parquet_file.schema_arrow.names, usecols)
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns):
+            yield to_frame(batch)
+    else:
+        with pa.memory_map(file_path) as source:
+            reader = pa.ipc.open_file(source)
+            columns = columns_to_read(reader.schema.names, usecols)
+            for index in range(reader.num_record_batches):
+                batch = reader.get_batch(index)
+                if columns is not None:
+                    batch = batch.select(columns)
+                for start in range(0, batch.num_rows, chunksize):
+                    yield to_frame(batch.slice(start, chunksize))
+
+def write_partitioned(df: pd.DataFrame, directory: str, format: str, date_column: str = "date", append: bool = False) -> int:
+    """
+    Write the data frame as typed columnar files partitioned by the year and month of the
+    date column, <directory>/year=YYYY/month=MM/part-<id>-<n>.<format>. When appending new part
+    files are added next to the existing ones; otherwise existing part files of the format are
+    removed first. Returns the number of files written.
+    """
+    if format not in COLUMNAR_FORMATS:
+        raise ValueError(f"Unsupported columnar format {format}; must be one of {', '.join(COLUMNAR_FORMATS)}.")
+
+    pa = import_pyarrow()
+    import pyarrow.dataset as ds
+
+    dates = pd.to_datetime(df[date_column])
+    table = pa.Table.from_pandas(df.assign(**{date_column: dates}), preserve_index=False)
+    table = table.set_column(table.schema.get_field_index(date_column), date_column, table[date_column].cast(pa.date32()))
+    table = table.append_column("year", pa.array(dates.dt.strftime("%Y"), pa.string()))
+    table = table.append_column("month", pa.array(dates.dt.strftime("%m"), pa.string()))
+
+    if not append:
+        for file_path in glob.glob(os.path.join(glob.escape(directory), "year=*", "month=*", f"*.{format}")):
+            os.remove(file_path)
+
+    written = []
+    ds.write_dataset(
+        table,
+        directory,
+        format=COLUMNAR_FORMATS[format],
+        partitioning=["year", "month"],
+        partitioning_flavor="hive",
+        basename_template=f"part-{uuid4().hex}-{{i}}.{format}",
+        existing_data_behavior="overwrite_or_ignore",
+        file_visitor=lambda file: written.append(file.path)
+    )
+    return len(written)
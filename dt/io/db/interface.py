@@ -1,42 +1,66 @@
 import sqlite3
 import pathlib
+from typing import Iterable, Iterator
+from .migrations import MIGRATIONS
+from .query import TransactionQuery, AggregateQuery, DEFAULT_PAGE_SIZE
+
+# Write-ahead logging lets readers (reports, the GUI) run while an import is writing.
+# NORMAL synchronous mode is durable in WAL mode except on power loss mid-checkpoint.
+PRAGMAS = [
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -65536",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA temp_store = MEMORY",
+]
+
+# Number of rows inserted per executemany call when writing to the database.
+DEFAULT_BATCH_SIZE = 10_000
 
 class DatabaseInitializer:
     def __init__(self, executable_path: str):
         parent_folder = pathlib.Path(executable_path).parent
         self.connection = sqlite3.connect(f"{parent_folder}/db.sqlite")
 
+        for pragma in PRAGMAS:
+            self.connection.execute(pragma)
+
+    def schema_version(self) -> int:
+        return self.connection.execute("PRAGMA user_version").fetchone()[0]
+
     def init_db(self):
-        self.connection.execute(
-            """
-            CREATE TABLE IF NOT EXISTS configs (
-            id INTEGER PRIMARY KEY,
-            name TEXT NOT NULL UNIQUE,
-            config TEXT NOT NULL)
-            """
-        )
+        """Apply every migration newer than the database's user_version, each in its own transaction."""
+        version = self.schema_version()
 
-        self.connection.execute(
-            """
-            CREATE TABLE IF NOT EXISTS transactions (
-            id INTEGER PRIMARY KEY,
-            hash TEXT,
-            date TEXT,
-            description TEXT,
-            institution TEXT,
-            type TEXT,
-            amount REAL)
-            """
-        )
-        
-        self.connection.commit()
+        for migration in MIGRATIONS:
+            if migration.version <= version:
+                continue
+
+            try:
+                self.connection.execute("BEGIN")
+                migration.apply(self.connection)
+                self.connection.execute(f"PRAGMA user_version = {migration.version}")
+                self.connection.commit()
+            except Exception as e:
+                self.connection.rollback()
+                raise RuntimeError(f"Failed to apply database migration {migration}: {e}")
 
 class DatabaseInterface:
+    """
+    Access to the application database. The database is opened and migrated on first use,
+    so applications which never touch it do not pay for it.
+    """
     def __init__(self, executable_path: str):
-        initializer = DatabaseInitializer(executable_path)
-        initializer.init_db()
+        self.executable_path = executable_path
+        self._connection: sqlite3.Connection | None = None
 
-        self.connection = initializer.connection
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            initializer = DatabaseInitializer(self.executable_path)
+            initializer.init_db()
+            self._connection = initializer.connection
+        return self._connection
 
     def config_insert(self, name, config):
         try:
@@ -70,6 +94,38 @@ class DatabaseInterface:
         cursor.close()
         return config
 
+    def imports_read(self, path: str, config: str):
+        """Returns the (size, mtime_ns, content_hash) recorded for the file imported with the config."""
+        cursor = self.connection.execute(
+            "SELECT size, mtime_ns, content_hash FROM imports WHERE path = ? AND config = ?",
+            (path, config)
+        )
+        return cursor.fetchone()
+
+    def imports_find_content(self, content_hash: str, config: str) -> bool:
+        """Returns whether a file with the content hash was imported with the config, under any path."""
+        cursor = self.connection.execute(
+            "SELECT 1 FROM imports WHERE content_hash = ? AND config = ? LIMIT 1",
+            (content_hash, config)
+        )
+        return cursor.fetchone() is not None
+
+    def imports_upsert(self, rows: Iterable[tuple]):
+        """
+        Record (path, size, mtime_ns, content_hash, config, rows) for imported files, replacing
+        earlier records of the same path and config. Does not commit.
+        """
+        self.connection.executemany(
+            """
+            INSERT INTO imports (path, size, mtime_ns, content_hash, config, rows, imported)
+            VALUES (?, ?, ?, ?, ?, ?, datetime('now'))
+            ON CONFLICT (path, config) DO UPDATE SET
+            size = excluded.size, mtime_ns = excluded.mtime_ns, content_hash = excluded.content_hash,
+            rows = excluded.rows, imported = excluded.imported
+            """,
+            rows
+        )
+
     def transactions_fetch_all(self):
         cursor = self.connection.execute("SELECT * FROM transactions")
         rows = cursor.fetchall()
@@ -80,11 +136,100 @@ class DatabaseInterface:
         count = cursor.fetchone()[0]
         return count
     
-    def transactions_get_hashes(self):
-        cursor = self.connection.execute("SELECT hash FROM transactions")
-        hashes = [row[0] for row in cursor.fetchall()]
-        return hashes
-    
+    def transactions_insert_many(self, rows: Iterable[tuple]) -> int:
+        """
+        Insert (hash, date, description, institution, type, amount_cents, category) rows with a single
+        executemany, add their descriptions to the full text index and their amounts to the monthly
+        aggregates. Rows whose hash is already stored are ignored by the unique hash index.
+        Does not commit so the caller controls the transaction. Returns the number of rows inserted.
+        """
+        last_id = self.connection.execute("SELECT COALESCE(MAX(id), 0) FROM transactions").fetchone()[0]
+        cursor = self.connection.executemany(
+            """
+            INSERT OR IGNORE INTO transactions (hash, date, description, institution, type, amount_cents, category)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            rows
+        )
+        # New rows get ids above the largest stored id.
+        self.connection.execute(
+            "INSERT INTO transactions_fts (rowid, description) SELECT id, description FROM transactions WHERE id > ?",
+            (last_id,)
+        )
+        self.aggregates_add(last_id)
+        return cursor.rowcount
+
+    def transactions_query(self, query: TransactionQuery, after: tuple | None = None, limit: int = DEFAULT_PAGE_SIZE) -> list[tuple]:
+        """
+        Returns a page of at most limit transactions matching the query, starting after the
+        key (query.key) of the last row of the previous page. The key is matched through the
+        index of the sort column, so later pages cost the same as the first.
+        """
+        statement, parameters = query.sql(after, limit)
+        return self.connection.execute(statement, parameters).fetchall()
+
+    def transactions_stream(self, query: TransactionQuery, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[tuple]:
+        """Yields every transaction matching the query, fetching batch_size rows from the cursor at a time."""
+        statement, parameters = query.sql()
+        cursor = self.connection.execute(statement, parameters)
+        try:
+            while rows := cursor.fetchmany(batch_size):
+                yield from rows
+        finally:
+            cursor.close()
+
+    def transactions_search_text(self, text: str, query: TransactionQuery | None = None, after: tuple[float, int] | None = None, limit: int = DEFAULT_PAGE_SIZE) -> list[tuple]:
+        """
+        Returns a page of at most limit transactions matching the query whose description
+        contains every word of the text, ranked by the full text index with the best matches
+        first. The rank is the last value of every row; pages start after the (rank, id) key
+        of the last row of the previous page.
+        """
+        statement, parameters = (query or TransactionQuery()).search_sql(text, after, limit)
+        return self.connection.execute(statement, parameters).fetchall()
+
+    def transactions_fts_rebuild(self):
+        """Rebuild the full text index of the descriptions from the transactions table."""
+        with self.connection:
+            self.connection.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')")
+
+    def aggregates_add(self, after_id: int):
+        """Add the transactions with ids above after_id to the monthly aggregates. Does not commit."""
+        self.connection.execute(
+            """
+            INSERT INTO monthly_aggregates (month, institution, type, category, count, total_cents, min_cents, max_cents)
+            SELECT COALESCE(NULLIF(substr(date, 1, 7), 'NaT'), ''), COALESCE(institution, ''), COALESCE(type, ''), COALESCE(category, ''),
+            COUNT(*), COALESCE(SUM(amount_cents), 0), MIN(amount_cents), MAX(amount_cents)
+            FROM transactions
+            WHERE id > ?
+            GROUP BY 1, 2, 3, 4
+            ON CONFLICT (month, institution, type, category) DO UPDATE SET
+            count = count + excluded.count,
+            total_cents = total_cents + excluded.total_cents,
+            min_cents = CASE WHEN min_cents IS NULL OR excluded.min_cents < min_cents THEN excluded.min_cents ELSE min_cents END,
+            max_cents = CASE WHEN max_cents IS NULL OR excluded.max_cents > max_cents THEN excluded.max_cents ELSE max_cents END
+            """,
+            (after_id,)
+        )
+
+    def aggregates_read(self, query: AggregateQuery) -> list[tuple]:
+        """Returns the totals of the groups of the query: the group values, count, total, minimum and maximum cents."""
+        statement, parameters = query.sql()
+        return self.connection.execute(statement, parameters).fetchall()
+
+    def aggregates_values(self, column: str) -> list[str]:
+        """Returns the distinct institutions, types or categories of the monthly aggregates, without the missing value ''."""
+        if column not in ["institution", "type", "category"]:
+            raise ValueError(f"Invalid aggregate column {column}; must be institution, type or category")
+        cursor = self.connection.execute(f"SELECT DISTINCT {column} FROM monthly_aggregates WHERE {column} != '' ORDER BY {column}")
+        return [row[0] for row in cursor]
+
+    def aggregates_rebuild(self):
+        """Recompute the monthly aggregates from the transactions, e.g. after transactions were changed or deleted."""
+        with self.connection:
+            self.connection.execute("DELETE FROM monthly_aggregates")
+            self.aggregates_add(0)
+
     def transactions_search(self, hash: str):
         cursor = self.connection.execute("SELECT * FROM transactions WHERE hash = ?", (hash,))
         row = cursor.fetchone()
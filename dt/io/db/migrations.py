@@ -0,0 +1,207 @@
+import sqlite3
+from hashlib import sha256
+from typing import Callable
+
+class Migration:
+    """
+    A versioned change to the database schema.
+    Migrations are applied in order to databases whose user_version is below the migration version.
+    Functions are registered on the connection so the statements can call them.
+    """
+    def __init__(self, version: int, description: str, statements: list[str], functions: dict[str, Callable] | None = None):
+        self.version = version
+        self.description = description
+        self.statements = statements
+        self.functions = functions or {}
+
+    def apply(self, connection: sqlite3.Connection) -> None:
+        """Apply the migration. The caller is responsible for the surrounding transaction."""
+        for name, function in self.functions.items():
+            connection.create_function(name, function.__code__.co_argcount, function, deterministic=True)
+        for statement in self.statements:
+            connection.execute(statement)
+
+    def __str__(self) -> str:
+        return f"{self.__class__.__name__}(version={self.version}, description={self.description})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+def transaction_hash(date: str, description, institution, type, amount_cents: int | None) -> str:
+    """
+    Hash of a stored transaction over its amount in cents, formatted the way
+    dt.lib.transaction.hash_transactions formats the values of a data frame.
+    """
+    values = [date.replace("T", " ", 1)]
+    values += ["nan" if value is None else str(value) for value in (description, institution, type)]
+    values.append("<NA>" if amount_cents is None else str(amount_cents))
+    return sha256("".join(values).encode('utf-8')).hexdigest()
+
+MIGRATIONS = [
+    Migration(1, "create configs and transactions tables", [
+        """
+        CREATE TABLE IF NOT EXISTS configs (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE,
+        config TEXT NOT NULL)
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS transactions (
+        id INTEGER PRIMARY KEY,
+        hash TEXT,
+        date TEXT,
+        description TEXT,
+        institution TEXT,
+        type TEXT,
+        amount REAL)
+        """
+    ]),
+    # Databases created before hashes were unique may contain duplicates which
+    # have to be removed before the unique index can be created.
+    Migration(2, "unique transaction hashes", [
+        """
+        DELETE FROM transactions
+        WHERE id NOT IN (SELECT MIN(id) FROM transactions GROUP BY hash)
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS transactions_hash_index ON transactions (hash)"
+    ]),
+    # SQLite cannot change a column type in place so the table is rebuilt.
+    Migration(3, "integer cent amounts and indexed date, institution and type", [
+        """
+        CREATE TABLE transactions_new (
+        id INTEGER PRIMARY KEY,
+        hash TEXT,
+        date TEXT,
+        description TEXT,
+        institution TEXT,
+        type TEXT,
+        amount_cents INTEGER)
+        """,
+        """
+        INSERT INTO transactions_new (id, hash, date, description, institution, type, amount_cents)
+        SELECT id, hash, date, description, institution, type, CAST(ROUND(amount * 100) AS INTEGER)
+        FROM transactions
+        """,
+        "DROP TABLE transactions",
+        "ALTER TABLE transactions_new RENAME TO transactions",
+        "CREATE UNIQUE INDEX transactions_hash_index ON transactions (hash)",
+        "CREATE INDEX transactions_date_index ON transactions (date)",
+        "CREATE INDEX transactions_institution_index ON transactions (institution, date)",
+        "CREATE INDEX transactions_type_index ON transactions (type, date)"
+    ]),
+    # Compiled transform plans keyed by the hash of the configuration text they were compiled from.
+    Migration(4, "compiled plan cache", [
+        """
+        CREATE TABLE plan_cache (
+        hash TEXT PRIMARY KEY,
+        config TEXT NOT NULL,
+        plan BLOB NOT NULL)
+        """,
+        "CREATE INDEX plan_cache_config_index ON plan_cache (config)"
+    ]),
+    # Files already imported, so unchanged files can be skipped before they are parsed.
+    Migration(5, "import manifest", [
+        """
+        CREATE TABLE imports (
+        id INTEGER PRIMARY KEY,
+        path TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        content_hash TEXT NOT NULL,
+        config TEXT NOT NULL,
+        rows INTEGER NOT NULL,
+        imported TEXT NOT NULL,
+        UNIQUE (path, config))
+        """,
+        "CREATE INDEX imports_content_hash_index ON imports (content_hash, config)"
+    ]),
+    # Hashes used to be computed over the float amount, so 10 and 10.0 hashed differently.
+    # Rows written by dt are rehashed over their integer cents and the duplicates this reveals
+    # are removed; rows without a date were not written by dt and keep their hash.
+    Migration(6, "transaction hashes over integer cents", [
+        "DROP INDEX transactions_hash_index",
+        """
+        UPDATE transactions
+        SET hash = transaction_hash(date, description, institution, type, amount_cents)
+        WHERE date IS NOT NULL
+        """,
+        """
+        DELETE FROM transactions
+        WHERE id NOT IN (SELECT MIN(id) FROM transactions GROUP BY hash)
+        """,
+        "CREATE UNIQUE INDEX transactions_hash_index ON transactions (hash)"
+    ], {"transaction_hash": transaction_hash}),
+    # Range queries on amounts; date ranges, institutions and types are indexed since migration 3.
+    Migration(7, "indexed amounts", [
+        "CREATE INDEX transactions_amount_index ON transactions (amount_cents)"
+    ]),
+    # Full text index of the descriptions. The index reads the text from the transactions
+    # table (external content), so it has to be kept in step with the table: triggers handle
+    # updates and deletes, while inserted rows are indexed by transactions_insert_many one
+    # batch at a time, as indexing row by row from a trigger is several times slower.
+    # The rows already stored are indexed by a rebuild.
+    Migration(8, "full text search of descriptions", [
+        """
+        CREATE VIRTUAL TABLE transactions_fts USING fts5(
+        description,
+        content = 'transactions',
+        content_rowid = 'id',
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3')
+        """,
+        """
+        CREATE TRIGGER transactions_fts_delete AFTER DELETE ON transactions BEGIN
+        INSERT INTO transactions_fts (transactions_fts, rowid, description) VALUES ('delete', old.id, old.description);
+        END
+        """,
+        """
+        CREATE TRIGGER transactions_fts_update AFTER UPDATE OF description ON transactions BEGIN
+        INSERT INTO transactions_fts (transactions_fts, rowid, description) VALUES ('delete', old.id, old.description);
+        INSERT INTO transactions_fts (rowid, description) VALUES (new.id, new.description);
+        END
+        """,
+        "INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')"
+    ]),
+    # Totals of every month, institution, type and category, so reports never read the
+    # transactions. Missing values are grouped under '' as NULLs are never equal in keys.
+    # transactions_insert_many adds the transactions it inserts to the totals.
+    Migration(9, "categories and monthly aggregates", [
+        "ALTER TABLE transactions ADD COLUMN category TEXT",
+        """
+        CREATE TABLE monthly_aggregates (
+        month TEXT NOT NULL,
+        institution TEXT NOT NULL,
+        type TEXT NOT NULL,
+        category TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        total_cents INTEGER NOT NULL,
+        min_cents INTEGER,
+        max_cents INTEGER,
+        PRIMARY KEY (month, institution, type, category))
+        WITHOUT ROWID
+        """,
+        """
+        INSERT INTO monthly_aggregates (month, institution, type, category, count, total_cents, min_cents, max_cents)
+        SELECT COALESCE(NULLIF(substr(date, 1, 7), 'NaT'), ''), COALESCE(institution, ''), COALESCE(type, ''), COALESCE(category, ''),
+        COUNT(*), COALESCE(SUM(amount_cents), 0), MIN(amount_cents), MAX(amount_cents)
+        FROM transactions
+        GROUP BY 1, 2, 3, 4
+        """
+    ]),
+    # Sorting by any column a page at a time, ties broken by date and id. Institutions and
+    # types are indexed with their dates since migration 3; the amount index gains the date.
+    Migration(10, "sortable columns", [
+        "CREATE INDEX transactions_description_index ON transactions (description, date)",
+        "CREATE INDEX transactions_category_index ON transactions (category, date)",
+        "DROP INDEX transactions_amount_index",
+        "CREATE INDEX transactions_amount_index ON transactions (amount_cents, date)"
+    ]),
+    # Plans were cached pickled; they are now cached as JSON layouts of the configured transforms.
+    Migration(11, "plan cache without pickles", [
+        "DELETE FROM plan_cache"
+    ]),
+    # Reading a cached plan cost as much as parsing and compiling the configuration again.
+    Migration(12, "drop plan cache", [
+        "DROP TABLE plan_cache"
+    ]),
+]
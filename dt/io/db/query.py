@@ -0,0 +1,276 @@
+from datetime import date, timedelta
+from decimal import Decimal, InvalidOperation
+
+# Rows returned per page of a query.
+DEFAULT_PAGE_SIZE = 100
+
+# Columns of the rows returned by transaction queries.
+TRANSACTION_COLUMNS = ["id", "hash", "date", "description", "institution", "type", "amount_cents", "category"]
+
+# Columns transactions can be sorted by, and the column of the transactions table of each.
+SORT_COLUMNS = {
+    "date": "date",
+    "description": "description",
+    "institution": "institution",
+    "type": "type",
+    "amount": "amount_cents",
+    "category": "category",
+}
+
+# Columns reports can be grouped by, and the expression of each over the monthly aggregates.
+GROUP_COLUMNS = {
+    "year": "substr(month, 1, 4)",
+    "month": "month",
+    "institution": "institution",
+    "type": "type",
+    "category": "category",
+}
+
+def match_expression(text: str) -> str:
+    """
+    Turn search text into an FTS5 query matching descriptions which contain every word, so
+    user input is never parsed as FTS5 syntax. Words ending in * match as prefixes.
+    """
+    terms = []
+    for word in text.split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*").replace('"', '""')
+        if len(word) > 0:
+            terms.append(f'"{word}"' + ("*" if prefix else ""))
+    if len(terms) == 0:
+        raise ValueError("Search text must contain at least one word")
+    return " ".join(terms)
+
+def parse_amount(text: str) -> int:
+    """Parse an amount in currency units such as "12.50" or "-3" into integer cents."""
+    try:
+        cents = Decimal(text.replace(",", "").lstrip("$")) * 100
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount {text}; must be a number such as 12.50")
+    if cents != cents.to_integral_value():
+        raise ValueError(f"Invalid amount {text}; must not have more than two decimals")
+    return int(cents)
+
+def format_amount(cents: int | None) -> str:
+    """Format integer cents as currency units with two decimals, e.g. -1234 as "-12.34"."""
+    if cents is None:
+        return ""
+    return f"{'-' if cents < 0 else ''}{abs(cents) // 100}.{abs(cents) % 100:02d}"
+
+class TransactionQuery:
+    """
+    Filters and order of a query of the transactions table. Unset filters match every row.
+    Dates are inclusive, amounts are integer cents and text matches descriptions containing
+    it, ignoring case. Rows are ordered by the sort column, then date and then id, so those
+    values of the last row of a page are the key the next page starts after.
+    """
+    def __init__(
+        self,
+        start_date: date | None = None,
+        end_date: date | None = None,
+        institutions: list[str] | None = None,
+        types: list[str] | None = None,
+        categories: list[str] | None = None,
+        min_cents: int | None = None,
+        max_cents: int | None = None,
+        text: str | None = None,
+        descending: bool = False,
+        sort: str = "date"
+    ):
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Cannot sort by {sort}; must be one of {", ".join(SORT_COLUMNS)}")
+
+        self.start_date = start_date
+        self.end_date = end_date
+        self.institutions = institutions or []
+        self.types = types or []
+        self.categories = categories or []
+        self.min_cents = min_cents
+        self.max_cents = max_cents
+        self.text = text
+        self.descending = descending
+        self.sort = sort
+
+    def order_columns(self) -> list[str]:
+        """Columns the rows are ordered by, which together identify a row."""
+        return list(dict.fromkeys([SORT_COLUMNS[self.sort], "date", "id"]))
+
+    def key(self, row: tuple) -> tuple:
+        """The key of a row returned by the query: its values of the order columns."""
+        return tuple(row[TRANSACTION_COLUMNS.index(column)] for column in self.order_columns())
+
+    def where(self) -> tuple[str, list]:
+        """Returns the conditions of the filters of the query and their parameters."""
+        conditions = []
+        parameters = []
+
+        # Dates are stored as ISO 8601 text, so ranges compare as strings.
+        if self.start_date is not None:
+            conditions.append("date >= ?")
+            parameters.append(self.start_date.isoformat())
+        if self.end_date is not None:
+            conditions.append("date < ?")
+            parameters.append((self.end_date + timedelta(days=1)).isoformat())
+        if len(self.institutions) > 0:
+            conditions.append(f"institution IN ({", ".join("?" * len(self.institutions))})")
+            parameters += self.institutions
+        if len(self.types) > 0:
+            conditions.append(f"type IN ({", ".join("?" * len(self.types))})")
+            parameters += self.types
+        if len(self.categories) > 0:
+            conditions.append(f"category IN ({", ".join("?" * len(self.categories))})")
+            parameters += self.categories
+        if self.min_cents is not None:
+            conditions.append("amount_cents >= ?")
+            parameters.append(self.min_cents)
+        if self.max_cents is not None:
+            conditions.append("amount_cents <= ?")
+            parameters.append(self.max_cents)
+        if self.text is not None:
+            escaped = self.text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            conditions.append("description LIKE ? ESCAPE '\\'")
+            parameters.append(f"%{escaped}%")
+
+        return " AND ".join(conditions), parameters
+
+    def after(self, key: tuple) -> list[tuple[str, list]]:
+        """
+        Returns the conditions, with their parameters, of the rows after the key. Comparisons with
+        NULL are never true and NULLs sort first, so the rows after a key whose sort value is NULL
+        are the rest of the NULLs followed by every other value, or in descending order the rows
+        after a key with a value are the rest of the values followed by the NULLs. Each condition
+        is matched by the index of the sort column on its own.
+        """
+        columns = self.order_columns()
+        operator = "<" if self.descending else ">"
+        if key[0] is None:
+            conditions = [(f"{columns[0]} IS NULL AND ({", ".join(columns[1:])}) {operator} ({", ".join("?" * len(key[1:]))})", list(key[1:]))]
+            if not self.descending:
+                conditions.append((f"{columns[0]} IS NOT NULL", []))
+        else:
+            conditions = [(f"({", ".join(columns)}) {operator} ({", ".join("?" * len(key))})", list(key))]
+            if self.descending:
+                conditions.append((f"{columns[0]} IS NULL", []))
+        return conditions
+
+    def sql(self, after: tuple | None = None, limit: int | None = None) -> tuple[str, list]:
+        """Returns the SELECT statement of the query and its parameters, starting after the key when given."""
+        filters, filter_parameters = self.where()
+        order = ", ".join(f"{column} {"DESC" if self.descending else "ASC"}" for column in self.order_columns())
+
+        statements = []
+        parameters = []
+        for condition, condition_parameters in (self.after(after) if after is not None else [("", [])]):
+            conditions = [text for text in [filters, condition] if len(text) > 0]
+            statement = f"SELECT {", ".join(TRANSACTION_COLUMNS)} FROM transactions {f"WHERE {" AND ".join(conditions)}" if len(conditions) > 0 else ""} ORDER BY {order}"
+            parameters += filter_parameters + condition_parameters
+            if limit is not None:
+                statement += " LIMIT ?"
+                parameters.append(limit)
+            statements.append(statement)
+
+        if len(statements) == 1:
+            return statements[0], parameters
+
+        # Each part is read through the index and sorted already; ordering the union only sorts
+        # the at most two pages read.
+        statement = f"SELECT * FROM ({" UNION ALL ".join(f"SELECT * FROM ({statement})" for statement in statements)}) ORDER BY {order}"
+        if limit is not None:
+            statement += " LIMIT ?"
+            parameters.append(limit)
+        return statement, parameters
+
+    def search_sql(self, text: str, after: tuple[float, int] | None = None, limit: int | None = None) -> tuple[str, list]:
+        """
+        Returns the SELECT statement and parameters of the transactions matching the query whose
+        description contains the words of the text, best matches first. Rows have the bm25 rank
+        of the match appended; the (rank, id) of the last row of a page is the key the next page
+        starts after.
+        """
+        filters, parameters = self.where()
+        where = f"WHERE {filters}" if len(filters) > 0 else ""
+        # CROSS JOIN keeps the matches as the outer loop, so the index is searched once and the
+        # transactions are looked up by id, instead of searching the index for every transaction.
+        statement = f"""
+            SELECT * FROM (
+            SELECT {", ".join(f"transactions.{column}" for column in TRANSACTION_COLUMNS)}, matches.rank AS rank
+            FROM (SELECT rowid, rank FROM transactions_fts WHERE transactions_fts MATCH ?) AS matches
+            CROSS JOIN transactions ON transactions.id = matches.rowid
+            {where})
+            """
+        parameters.insert(0, match_expression(text))
+        if after is not None:
+            statement += " WHERE (rank, id) > (?, ?)"
+            parameters += list(after)
+        statement += " ORDER BY rank, id"
+        if limit is not None:
+            statement += " LIMIT ?"
+            parameters.append(limit)
+        return statement, parameters
+
+    @staticmethod
+    def search_key(row: tuple) -> tuple[float, int]:
+        """The (rank, id) key of a row returned by a search."""
+        return row[-1], row[0]
+
+    def __str__(self) -> str:
+        return f"{self.__class__.__name__}(start_date={self.start_date}, end_date={self.end_date}, institutions={self.institutions}, types={self.types}, categories={self.categories}, min_cents={self.min_cents}, max_cents={self.max_cents}, text={self.text}, descending={self.descending}, sort={self.sort})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+class AggregateQuery:
+    """
+    Groups and filters of a report over the monthly aggregates. Months are "YYYY-MM" and
+    inclusive; missing institutions, types and categories are grouped under "".
+    """
+    def __init__(
+        self,
+        group_by: list[str] | None = None,
+        start_month: str | None = None,
+        end_month: str | None = None,
+        institutions: list[str] | None = None,
+        types: list[str] | None = None,
+        categories: list[str] | None = None
+    ):
+        self.group_by = group_by or ["month"]
+        self.start_month = start_month
+        self.end_month = end_month
+        self.institutions = institutions or []
+        self.types = types or []
+        self.categories = categories or []
+
+        unknown = [column for column in self.group_by if column not in GROUP_COLUMNS]
+        if len(unknown) > 0:
+            raise ValueError(f"Cannot group by {", ".join(unknown)}; must be one of {", ".join(GROUP_COLUMNS)}")
+
+    def sql(self) -> tuple[str, list]:
+        """Returns the SELECT statement of the report and its parameters."""
+        conditions = []
+        parameters = []
+        if self.start_month is not None:
+            conditions.append("month >= ?")
+            parameters.append(self.start_month)
+        if self.end_month is not None:
+            conditions.append("month <= ?")
+            parameters.append(self.end_month)
+        for column, values in [("institution", self.institutions), ("type", self.types), ("category", self.categories)]:
+            if len(values) > 0:
+                conditions.append(f"{column} IN ({", ".join("?" * len(values))})")
+                parameters += values
+
+        groups = ", ".join(GROUP_COLUMNS[column] for column in self.group_by)
+        where = f"WHERE {" AND ".join(conditions)}" if len(conditions) > 0 else ""
+        statement = f"""
+            SELECT {groups}, SUM(count), SUM(total_cents), MIN(min_cents), MAX(max_cents)
+            FROM monthly_aggregates {where}
+            GROUP BY {groups}
+            ORDER BY {groups}
+            """
+        return statement, parameters
+
+    def __str__(self) -> str:
+        return f"{self.__class__.__name__}(group_by={self.group_by}, start_month={self.start_month}, end_month={self.end_month}, institutions={self.institutions}, types={self.types}, categories={self.categories})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
@@ -0,0 +1,72 @@
+import os
+from hashlib import sha256
+from .db.interface import DatabaseInterface
+
+# Bytes read at a time when hashing file contents.
+HASH_BLOCK_SIZE = 1 << 20
+
+class Fingerprint:
+    """Size, modification time and content hash of a file."""
+    def __init__(self, path: str, size: int, mtime_ns: int):
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self._content_hash: str | None = None
+
+    @classmethod
+    def from_path(cls, path: str):
+        stat = os.stat(path)
+        return cls(os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+    @property
+    def content_hash(self) -> str:
+        """SHA-256 of the file contents, read only when first needed."""
+        if self._content_hash is None:
+            digest = sha256()
+            with open(self.path, "rb") as file:
+                while block := file.read(HASH_BLOCK_SIZE):
+                    digest.update(block)
+            self._content_hash = digest.hexdigest()
+        return self._content_hash
+
+    def __str__(self) -> str:
+        return f"{self.__class__.__name__}(path={self.path}, size={self.size}, mtime_ns={self.mtime_ns})"
+
+class ImportManifest:
+    """
+    Files already imported into the database with a configuration. A file is unchanged when its
+    path, size and modification time match a recorded import, or when its contents match a file
+    imported under another path; only then is the file hashed.
+    """
+    def __init__(self, db: DatabaseInterface, config: str):
+        self.db = db
+        self.config = config
+        self.fingerprints: dict[str, Fingerprint] = {}
+
+    def fingerprint(self, path: str) -> Fingerprint:
+        if path not in self.fingerprints:
+            self.fingerprints[path] = Fingerprint.from_path(path)
+        return self.fingerprints[path]
+
+    def unchanged(self, path: str) -> bool:
+        """Returns whether the file was already imported with the configuration."""
+        fingerprint = self.fingerprint(path)
+        recorded = self.db.imports_read(fingerprint.path, self.config)
+
+        if recorded is not None:
+            size, mtime_ns, _ = recorded
+            if size == fingerprint.size and mtime_ns == fingerprint.mtime_ns:
+                return True
+
+        return self.db.imports_find_content(fingerprint.content_hash, self.config)
+
+    def record(self, rows: dict[str, int]):
+        """Record the files as imported along with the number of rows read from each. Does not commit."""
+        records = []
+        for path, count in rows.items():
+            fingerprint = self.fingerprint(path)
+            records.append((fingerprint.path, fingerprint.size, fingerprint.mtime_ns, fingerprint.content_hash, self.config, count))
+        self.db.imports_upsert(records)
+
+    def __str__(self) -> str:
+        return f"{self.__class__.__name__}(config={self.config})"
@@ -0,0 +1,19 @@
+import os, re
+
+def isDir(path: str) -> bool:
+    return os.path.exists(path) and os.path.isdir(path)
+
+def isFile(file: str, pattern: str | None = None) -> bool:
+    if pattern is None:
+        return os.path.exists(file) and os.path.isfile(file)
+    else:
+        return os.path.exists(file) and os.path.isfile(file) and (re.match(pattern, file) is not None)
+
+def isCSV(file: str):
+    return isFile(file, r".*\.(csv|CSV)$")
+
+def isJSON(file: str):
+    return isFile(file, r".*\.(json|JSON)$")
+
+def isColumnar(file: str):
+    return isFile(file, r".*\.(parquet|arrow|feather)$")
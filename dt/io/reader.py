@@ -1,9 +1,15 @@
-import os, re, json
+import os, json, time
 import pandas as pd
 
 from .db.interface import DatabaseInterface
-from typing import Any
+from .paths import isDir, isFile, isCSV, isJSON, isColumnar
+from .columnar import read_columnar, read_columnar_chunks
+from .schema import Schema
+from .manifest import ImportManifest
+from typing import Any, Callable, Iterator
 from abc import abstractmethod, ABC
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from itertools import repeat
 
 
 # Make a CSV and config specific reader.
@@ -16,20 +22,20 @@ class Reader(ABC):
     def __str__(self) -> str:
         pass
 
-def isDir(path: str) -> bool:
-    return os.path.exists(path) and os.path.isdir(path)
-
-def isFile(file: str, pattern: str | None = None) -> bool:
-    if pattern is None:
-        return os.path.exists(file) and os.path.isfile(file)
+def read_file(file_path: str, header: int | None, usecols: Callable | None = None, transform: Callable[[pd.DataFrame], pd.DataFrame] | None = None, schema: Schema | None = None) -> tuple[pd.DataFrame, float]:
+    """Read and optionally transform a single CSV or columnar file. Returns the data and the seconds it took."""
+    start = time.perf_counter()
+    if isColumnar(file_path):
+        df = read_columnar(file_path, usecols)
+    elif schema is not None:
+        df = schema.read_csv(file_path, header, usecols)
     else:
-        return os.path.exists(file) and os.path.isfile(file) and (re.match(pattern, file) is not None)
+        df = pd.read_csv(file_path, header=header, usecols=usecols)
 
-def isCSV(file: str):
-    return isFile(file, r".*\.(csv|CSV)$")
+    if transform is not None and not df.empty:
+        df = transform(df)
 
-def isJSON(file: str):
-    return isFile(file, r".*\.(json|JSON)$")
+    return df, time.perf_counter() - start
 
 class ConfigReader(Reader):
     def __init__(self, config_name: str, db: DatabaseInterface):
@@ -37,47 +43,173 @@ class ConfigReader(Reader):
         self.db = db
             
     def read(self) -> dict:
+        return ConfigReader.parse(self.read_text())
+
+    @staticmethod
+    def parse(text: str) -> dict:
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Failed to load configuration: {e}")
+
+    def read_text(self) -> str:
+        """Returns the configuration as stored, before it is parsed."""
         if isJSON(self.config_name):
             try:
                 with open(self.config_name, "r", encoding="utf-8") as file:
-                    return json.load(file)
+                    return file.read()
             except Exception as e:
                 raise ValueError(f"Failed to load configuration: {e}")
         else:
-            config = self.db.config_read(self.config_name)[0]
+            config = self.db.config_read(self.config_name)
 
             if config is None:
                 raise ValueError(f"Failed to load config {self.config_name}")
         
-            return json.loads(config)
+            return config[0]
         
     def __str__(self):
         return f"ConfigReader(config_name={self.config_name})"
             
 
 class DataReader(Reader):
-    def __init__(self, file_paths: list[str], headers = True, verbose = False):
+    def __init__(self, file_paths: list[str], headers = True, verbose = False, chunksize: int | None = None, jobs: int = 1, usecols: Callable | None = None, manifest: ImportManifest | None = None, schema: Schema | None = None, on_file: Callable[[str, int], None] | None = None):
         self.headers = headers
         self.verbose = verbose
         self.file_paths = file_paths
-
-    def read(self) -> pd.DataFrame:
+        self.chunksize = chunksize
+        self.jobs = jobs
+        # Passed to pd.read_csv to select which columns are parsed.
+        self.usecols = usecols
+        # Files recorded in the manifest as already imported are skipped.
+        self.manifest = manifest
+        # Column types applied while parsing CSV files.
+        self.schema = schema
+        # Called with the path and row count of every file once it has been read.
+        self.on_file = on_file
+        self.skipped: list[str] = []
+        # Number of rows read from each file.
+        self.rows: dict[str, int] = {}
+
+    def files(self) -> list[str]:
+        """Expand the given paths into the list of files to be read, leaving out unchanged files."""
         file_paths = []
         for file_path in self.file_paths:
             if isDir(file_path):
-                files = [os.path.join(file_path, file) for file in os.listdir(file_path)]
+                files = [os.path.join(file_path, file) for file in sorted(os.listdir(file_path))]
                 file_paths += ([file for file in files if isCSV(file)])
+                # Columnar files are also found in partition directories such as year=2025/month=01.
+                for directory, directories, files in os.walk(file_path):
+                    directories.sort()
+                    file_paths += [os.path.join(directory, file) for file in sorted(files) if isColumnar(os.path.join(directory, file))]
             elif isFile(file_path):
                 file_paths.append(file_path)
             else:
                 raise ValueError(f"Path is not a file or directory: {file_path}")
-        
-        dfs = [pd.read_csv(file_path, header = 0 if self.headers else None) for file_path in file_paths]
-        dfs = [df for df in dfs if not df.empty]
+
+        if self.manifest is not None:
+            self.skipped = [file_path for file_path in file_paths if self.manifest.unchanged(file_path)]
+            file_paths = [file_path for file_path in file_paths if file_path not in self.skipped]
+
+        return file_paths
+
+    def skipped_bytes(self) -> int:
+        return sum(self.manifest.fingerprint(file_path).size for file_path in self.skipped)
+
+    def report_skipped(self):
+        if len(self.skipped) > 0:
+            print(f"Skipped {len(self.skipped)} unchanged files ({self.skipped_bytes()} bytes)")
+
+    def read(self, transform: Callable[[pd.DataFrame], pd.DataFrame] | None = None) -> pd.DataFrame:
+        """
+        Read every file into a single data frame, in the order the files are listed.
+        When jobs is above one the files are parsed concurrently: in threads when only reading,
+        or in processes when a transform is given to be applied to each file as it is read.
+        """
+        file_paths = self.files()
+        header = 0 if self.headers else None
+
+        if len(file_paths) == 0:
+            self.rows = {}
+            if self.verbose:
+                self.report_skipped()
+            return pd.DataFrame()
+
+        if self.jobs > 1 and len(file_paths) > 1:
+            executor_type = ThreadPoolExecutor if transform is None else ProcessPoolExecutor
+            with executor_type(max_workers=self.jobs) as executor:
+                results = self.collect(file_paths, executor.map(read_file, file_paths, repeat(header), repeat(self.usecols), repeat(transform), repeat(self.schema)))
+        else:
+            results = self.collect(file_paths, (read_file(file_path, header, self.usecols, transform, self.schema) for file_path in file_paths))
+
+        self.rows = {file_path: len(df) for file_path, (df, _) in zip(file_paths, results)}
+
+        if self.verbose:
+            self.report_skipped()
+            for file_path, (df, seconds) in zip(file_paths, results):
+                print(f"Read {file_path} ({len(df)} rows) in {seconds:.2f} seconds")
+
+        dfs = [df for df, _ in results if not df.empty]
         df = pd.concat(dfs, ignore_index=True)
 
+        # Categories differing between files are combined into object columns by concat.
+        categories = {name for frame in dfs for name, dtype in frame.dtypes.items() if isinstance(dtype, pd.CategoricalDtype)}
+        for name in categories:
+            if not isinstance(df[name].dtype, pd.CategoricalDtype):
+                df[name] = df[name].astype("category")
+
+        if self.verbose and self.schema is not None:
+            self.report_footprint(df, file_paths[0], header)
+
         return df
 
+    def collect(self, file_paths: list[str], results: Iterator[tuple[pd.DataFrame, float]]) -> list[tuple[pd.DataFrame, float]]:
+        """Gather the results of reading the files in order, reporting each file as it completes."""
+        collected = []
+        for file_path, result in zip(file_paths, results):
+            collected.append(result)
+            if self.on_file is not None:
+                self.on_file(file_path, len(result[0]))
+        return collected
+
+    def report_footprint(self, df: pd.DataFrame, file_path: str, header: int | None):
+        footprint = df.memory_usage(deep=True).sum()
+        if isColumnar(file_path):
+            print(f"Memory footprint: {footprint / 1e6:.1f} MB")
+            return
+
+        plain, typed = self.schema.footprint(file_path, header, self.usecols)
+        print(f"Memory footprint: {footprint / 1e6:.1f} MB (about {footprint * plain / max(typed, 1) / 1e6:.1f} MB without the schema, estimated from {file_path})")
+
+    def read_chunks(self) -> Iterator[pd.DataFrame]:
+        """Read the files lazily, yielding at most chunksize rows at a time."""
+        if self.chunksize is None or self.chunksize < 1:
+            raise ValueError(f"Invalid chunksize {self.chunksize}; must be a positive integer.")
+
+        file_paths = self.files()
+        if self.verbose:
+            self.report_skipped()
+
+        self.rows = {}
+        for file_path in file_paths:
+            self.rows[file_path] = 0
+            for chunk in self.file_chunks(file_path):
+                self.rows[file_path] += len(chunk)
+                if not chunk.empty:
+                    yield chunk
+            if self.on_file is not None:
+                self.on_file(file_path, self.rows[file_path])
+
+    def file_chunks(self, file_path: str) -> Iterator[pd.DataFrame]:
+        if isColumnar(file_path):
+            yield from read_columnar_chunks(file_path, self.chunksize, self.usecols)
+        else:
+            header = 0 if self.headers else None
+            options = {} if self.schema is None else self.schema.read_options(file_path, header, self.usecols)
+            with pd.read_csv(file_path, header=header, usecols=self.usecols, chunksize=self.chunksize, **options) as chunks:
+                for chunk in chunks:
+                    yield chunk if self.schema is None else self.schema.finish(chunk)
+
 
     def __str__(self) -> str:
         output = ""
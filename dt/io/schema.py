@@ -0,0 +1,145 @@
+import pandas as pd
+from enum import Enum
+from typing import Callable
+from dt.lib.money import parse_cents
+
+# Rows read from the start of each file to infer compact column types.
+DEFAULT_SAMPLE_ROWS = 1000
+
+# Text columns with at most this fraction of distinct values in the sample are read as categories.
+CATEGORY_FRACTION = 0.5
+
+class ColumnType(Enum):
+    CATEGORY = "category"
+    STRING = "string"
+    INT = "int"
+    FLOAT = "float"
+    DECIMAL = "decimal"
+    DATE = "date"
+
+# Dtypes passed to the parser. Decimal columns are read as text and converted after parsing,
+# date columns are parsed with their format.
+DTYPES = {
+    ColumnType.CATEGORY: "category",
+    ColumnType.STRING: "str",
+    ColumnType.INT: "Int64",
+    ColumnType.FLOAT: "float64",
+    ColumnType.DECIMAL: "str",
+}
+
+def parse_decimal(series: pd.Series) -> pd.Series:
+    """
+    Convert amounts written with currency symbols, thousands separators or accounting
+    parentheses, such as "$1,234.56" or "(12.00)", to floats rounded to the cent. Empty values
+    become NaN. The text is parsed exactly by parse_cents, so converting the floats back to
+    cents with to_cents gives the written amount.
+    """
+    return (parse_cents(series) / 100).astype("float64")
+
+class Column:
+    """Declared type of a column, with the format of date columns."""
+    def __init__(self, type: ColumnType, format: str | None = None):
+        if type == ColumnType.DATE and format is None:
+            raise ValueError("Date columns in the schema require a 'format'.")
+        self.type = type
+        self.format = format
+
+    @classmethod
+    def from_dict(cls, value: str | dict):
+        if isinstance(value, str):
+            return cls(ColumnType(value))
+        elif isinstance(value, dict) and isinstance(value.get("type"), str):
+            return cls(ColumnType(value["type"]), value.get("format"))
+        else:
+            raise ValueError(f"Invalid column type {value} in schema; must be a type name or an object with 'type' and 'format'.")
+
+    def __str__(self) -> str:
+        return self.type.value if self.format is None else f"{self.type.value}({self.format})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+class Schema:
+    """
+    Column types applied while parsing CSV files, so columns are read directly into compact
+    dtypes. Columns without a declared type are either parsed as usual or, when infer is set,
+    given a type chosen from the first sample_rows rows of each file.
+    """
+    def __init__(self, columns: dict[str | int, Column], infer: bool = False, sample_rows: int = DEFAULT_SAMPLE_ROWS):
+        self.columns = columns
+        self.infer = infer
+        self.sample_rows = sample_rows
+
+    @classmethod
+    def from_dict(cls, s_dict: dict, headers: bool = True):
+        columns = s_dict.get("columns", {})
+        infer = s_dict.get("infer", False)
+        sample_rows = s_dict.get("sample_rows", DEFAULT_SAMPLE_ROWS)
+
+        if not isinstance(columns, dict) or not isinstance(infer, bool) or not isinstance(sample_rows, int) or sample_rows < 1:
+            raise ValueError("Invalid 'schema' property in configuration; must have a 'columns' object, boolean 'infer' and positive 'sample_rows'.")
+
+        # Without headers columns are identified by their position.
+        parsed = {}
+        for name, value in columns.items():
+            key = int(name) if not headers and name.isdigit() else name
+            parsed[key] = Column.from_dict(value)
+        return cls(parsed, infer, sample_rows)
+
+    def infer_types(self, file_path: str, header: int | None, usecols: Callable | None = None) -> dict[str | int, Column]:
+        """Choose types for the undeclared text columns from a sample of the file."""
+        sample = pd.read_csv(file_path, header=header, usecols=usecols, nrows=self.sample_rows)
+        inferred = {}
+        for name in sample.columns:
+            column = sample[name]
+            if name in self.columns or pd.api.types.is_numeric_dtype(column) or pd.api.types.is_bool_dtype(column):
+                continue
+            if len(column) > 0 and column.nunique() <= len(column) * CATEGORY_FRACTION:
+                inferred[name] = Column(ColumnType.CATEGORY)
+            else:
+                inferred[name] = Column(ColumnType.STRING)
+        return inferred
+
+    def read_options(self, file_path: str, header: int | None, usecols: Callable | None = None) -> dict:
+        """Returns the dtype, parse_dates and date_format arguments of pd.read_csv for the file."""
+        columns = dict(self.columns)
+        if self.infer:
+            columns.update(self.infer_types(file_path, header, usecols))
+        if usecols is not None:
+            columns = {name: column for name, column in columns.items() if usecols(name)}
+
+        dates = {name: column.format for name, column in columns.items() if column.type == ColumnType.DATE}
+        options = {"dtype": {name: DTYPES[column.type] for name, column in columns.items() if column.type in DTYPES}}
+        if len(dates) > 0:
+            options["parse_dates"] = list(dates)
+            options["date_format"] = dates
+        return options
+
+    def finish(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Convert the decimal columns and check that the date columns were parsed."""
+        for name, column in self.columns.items():
+            if name not in df.columns:
+                continue
+            if column.type == ColumnType.DECIMAL:
+                df[name] = parse_decimal(df[name])
+            elif column.type == ColumnType.DATE and not pd.api.types.is_datetime64_any_dtype(df[name]):
+                raise ValueError(f"Column {name} has values which do not match the date format {column.format}")
+        return df
+
+    def read_csv(self, file_path: str, header: int | None, usecols: Callable | None = None, nrows: int | None = None) -> pd.DataFrame:
+        """pd.read_csv with the schema applied."""
+        options = self.read_options(file_path, header, usecols)
+        return self.finish(pd.read_csv(file_path, header=header, usecols=usecols, nrows=nrows, **options))
+
+    def footprint(self, file_path: str, header: int | None, usecols: Callable | None = None) -> tuple[int, int]:
+        """Returns the bytes per row of a sample of the file parsed without and with the schema."""
+        plain = pd.read_csv(file_path, header=header, usecols=usecols, nrows=self.sample_rows)
+        typed = self.read_csv(file_path, header, usecols, nrows=self.sample_rows)
+        rows = max(len(plain), 1)
+        return plain.memory_usage(deep=True).sum() // rows, typed.memory_usage(deep=True).sum() // rows
+
+    def __str__(self) -> str:
+        return f"{self.__class__.__name__}(columns={self.columns}, infer={self.infer}, sample_rows={self.sample_rows})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
@@ -1,17 +1,24 @@
 # Create application manager for handling which application is determined to run.
 # Adjust applications so that arguments are passed after the application is created.
 
+import os, sys, csv, time
 from os import path
 from pathlib import Path
 from argparse import Namespace
+from datetime import date
+from itertools import islice
 from abc import abstractmethod, ABC
-from dt.io.db.interface import DatabaseInterface
-from dt.lib.config import Config
-from dt.io.reader import DataReader
-from dt.lib.transform import Transformer
+from typing import TYPE_CHECKING, Iterator
+from dt.io.db.interface import DatabaseInterface, DEFAULT_BATCH_SIZE
+from dt.io.db.query import TransactionQuery, AggregateQuery, GROUP_COLUMNS, SORT_COLUMNS, parse_amount, format_amount
+from dt.io.paths import isCSV
 from dt.io.argument_parser import ArgumentReader
 from argparse import ArgumentParser, _SubParsersAction
-from dt.lib.transaction import TransactionList
+
+# Modules which import pandas are imported by the applications that use them, so that
+# commands like `dt --help` and `dt config list` start without loading pandas.
+if TYPE_CHECKING:
+    from dt.lib.job import ImportProgress
 
 class Application(ABC):
     @staticmethod
@@ -44,6 +51,9 @@ class ConfigApplication(Application):
 
         config_modes_info = config_modes.add_parser("info")
         config_modes_info.add_argument('name', type=str, help="Print details about the configuration")
+
+        config_modes_explain = config_modes.add_parser("explain")
+        config_modes_explain.add_argument('name', type=str, help="Print the original and optimized transform plans of the configuration")
     
     def run(self) -> None:
         match(self.args.mode):
@@ -61,8 +71,13 @@ class ConfigApplication(Application):
             case "delete":
                 self.database_inteface.config_delete(self.args.name)
             case "info":
+                from dt.lib.config import Config
                 config = Config(self.args.name, self.db)
                 print(config)
+            case "explain":
+                from dt.lib.config import Config
+                config = Config(self.args.name, self.db)
+                print(config.plan().explain())
             case _:
                 raise Exception(f"Unknown config application mode: \"{self.args.mode}\"")
 
@@ -72,12 +87,24 @@ class TransformApplication(Application):
         self.db = db
 
         try:
+            from dt.lib.config import Config
             self.config = Config(args.config, db)
             
             self.paths = args.paths
             self.verbose = args.verbose
             self.output = args.output
             self.append = args.append
+            self.chunksize = args.chunksize
+            self.batch_size = args.batch_size
+            self.jobs = args.jobs
+            self.force = args.force
+            self.format = args.format
+            self.progress = args.progress
+            if self.format != "csv" and self.output is None:
+                raise ValueError(f"--format {self.format} requires an output directory (-o)")
+            self.plan = self.config.plan()
+            self.schema = self.config.schema()
+            self.transforms = self.plan.steps
         except Exception as e:
             print(f"Error creating \"{self.__class__.__name__}\": {e}")
 
@@ -87,39 +114,424 @@ class TransformApplication(Application):
         transform_parser.add_argument("-c", "--config", required=True, type=str, help="path to the configuration file")
         transform_parser.add_argument("paths", nargs="+", type=str, help="the path to the bank statement file")
         transform_parser.add_argument("-a", "--append", action="store_true", help="append to the output file instead of overwriting")
-        transform_parser.add_argument("-o", "--output", type=str, help="the path to the output file (default: output.csv)")
+        transform_parser.add_argument("-o", "--output", type=str, help="the path to the output file, or directory for columnar formats (default: write to the database)")
+        transform_parser.add_argument("--format", choices=["csv", "parquet", "arrow", "feather"], default="csv", help="format of the output; columnar formats are written as files partitioned by year and month (default: csv)")
+        transform_parser.add_argument("--chunksize", type=int, help="stream the files in chunks of this many rows to keep memory usage flat")
+        transform_parser.add_argument("-j", "--jobs", type=int, default=1, help="number of files to parse in parallel (ignored with --chunksize)")
+        transform_parser.add_argument("--force", action="store_true", help="import every file, including files already imported with this configuration")
+        transform_parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help=f"number of rows inserted into the database per statement (default: {DEFAULT_BATCH_SIZE})")
+        transform_parser.add_argument("--progress", action="store_true", help="show the progress of an import into the database on standard error")
 
     def run(self) -> None:
+        if self.output is None:
+            self.run_import()
+            return
+        if self.chunksize is not None:
+            self.run_chunked()
+            return
+
+        from dt.io.reader import DataReader
+        from dt.lib.transform import Transformer
+        from dt.lib.transaction import TransactionBatch
+
         # Need to handle the list that is currently coming in.
-        reader = DataReader(self.paths, headers=self.config.headers(), verbose=self.verbose)
+        reader = DataReader(self.paths, headers=self.config.headers(), verbose=self.verbose, jobs=self.jobs, usecols=self.plan.usecols(), schema=self.schema)
+
+        # With several jobs the transforms are applied to each file in the worker
+        # processes instead of to the combined data afterwards.
+        per_file = self.jobs > 1
+
         try:
-            df = reader.read()
+            if per_file:
+                file_transformer = Transformer()
+                file_transformer.set_transforms(self.transforms)
+                df = reader.read(file_transformer.transform)
+            else:
+                df = reader.read()
         except Exception as e:
             print(f"Error reading files:\n {reader}: {e}")
             return
+
+        if len(reader.rows) == 0:
+            if self.verbose:
+                print("No new or modified files to import")
+            return
+        
+        if not per_file:
+            try:
+                transformer = Transformer(self.verbose)
+                transformer.set_transforms(self.transforms)
+                df = transformer.transform(df)
+            except Exception as e:
+                print(f"Error transforming data from file {reader}: {e}")
+                return
         
         try:
-            transformer = Transformer(self.verbose)
-            transformer.set_transforms(self.config.transforms())
-            df = transformer.transform(df)
+            transactions = TransactionBatch.from_dataframe(df)
+
+            if self.format == "csv":
+                transactions.write_to_csv(self.output, self.append, self.verbose)
+            else:
+                transactions.write_to_columnar(self.output, self.format, self.append, self.verbose)
         except Exception as e:
-            print(f"Error transforming data from file {reader}: {e}")
+            print(f"Error creating transactions from data frame: {e}")
             return
-        
+
+    def run_chunked(self) -> None:
+        """Read, transform and write the data to the output one chunk at a time."""
+        from dt.io.reader import DataReader
+        from dt.lib.transform import Transformer
+        from dt.lib.transaction import TransactionBatch
+
+        reader = DataReader(self.paths, headers=self.config.headers(), verbose=self.verbose, chunksize=self.chunksize, usecols=self.plan.usecols(), schema=self.schema)
+        transformer = Transformer(self.verbose)
+        transformer.set_transforms(self.transforms)
+
+        rows = 0
+        append = self.append
+
         try:
-            transaction_list = TransactionList.from_dataframe(df)
+            for df in transformer.transform_chunks(reader.read_chunks()):
+                transactions = TransactionBatch.from_dataframe(df)
 
-            if self.output is None:
-                transaction_list.write_to_db(self.db, verbose=self.verbose)
-            else:
-                transaction_list.write_to_csv(self.output, self.append, self.verbose)
+                if self.format == "csv":
+                    transactions.write_to_csv(self.output, append)
+                else:
+                    transactions.write_to_columnar(self.output, self.format, append)
+                append = True
+
+                rows += len(df)
+        except Exception as e:
+            print(f"Error processing chunked data from file {reader}: {e}")
+            return
+
+        if self.verbose:
+            print(f"Processed {rows} rows in chunks of {self.chunksize}")
+            print(f"Wrote {rows} transactions to {self.output}")
+
+    def run_import(self) -> None:
+        """
+        Import the files into the database with an ImportJob, in one database transaction.
+        Files already imported with the configuration are skipped unless forced; interrupting
+        the import rolls it back.
+        """
+        from dt.lib.job import ImportJob, ImportCancelled
+
+        job = ImportJob(self.db, self.config, self.paths, chunksize=self.chunksize, jobs=self.jobs, batch_size=self.batch_size, force=self.force, verbose=self.verbose, on_progress=self.show_progress if self.progress else None)
+
+        try:
+            progress = job.run()
+        except (ImportCancelled, KeyboardInterrupt):
+            print("Import cancelled; the database is unchanged")
+            return
         except Exception as e:
-            print(f"Error creating transaction list from data frame: {e}")
+            print(f"Error importing files {self.paths}: {e}")
             return
+        finally:
+            if self.progress:
+                print(file=sys.stderr)
+
+        if self.verbose:
+            if progress.files_read == 0:
+                print("No new or modified files to import")
+                return
+            if self.chunksize is not None:
+                print(f"Processed {progress.rows_read} rows in chunks of {self.chunksize}")
+            print(f"Transactions added: {progress.rows_inserted}")
+            print(f"Transactions skipped (duplicates): {progress.rows_skipped}")
+
+    @staticmethod
+    def show_progress(progress: ImportProgress, width: int = 30):
+        """Redraw the progress bar of the files read on standard error."""
+        done = width * progress.files_read // progress.files_total if progress.files_total > 0 else width
+        print(f"\r[{"#" * done}{"." * (width - done)}] {progress.summary()}", end="", file=sys.stderr, flush=True)
 
     def __str__(self) -> str:
         return f"paths=({self.paths})"
 
+class WatchApplication(Application):
+    """
+    Stays resident and imports the CSV files dropped into a directory, keeping the database
+    connection and compiled plan between imports. The directory is polled, and a file is
+    imported once its size and modification time are unchanged between two polls so files
+    still being written are left alone. Files arriving together are imported in one
+    database transaction.
+    """
+    def __init__(self, args: Namespace, db: DatabaseInterface):
+        self.db = db
+
+        try:
+            from dt.lib.config import Config
+            self.config = Config(args.config, db)
+
+            self.directory = args.directory
+            self.verbose = args.verbose
+            self.interval = args.interval
+            self.once = args.once
+            self.batch_size = args.batch_size
+            # Compiled once here; every import reuses the plan of the configuration.
+            self.config.plan()
+            # Size and modification time of every file at the previous poll, and of the files already handled.
+            self.previous: dict[str, tuple[int, int]] = {}
+            self.handled: dict[str, tuple[int, int]] = {}
+        except Exception as e:
+            print(f"Error creating \"{self.__class__.__name__}\": {e}")
+
+    @staticmethod
+    def attach(subparser: _SubParsersAction[ArgumentParser]):
+        watch_parser = subparser.add_parser("watch", description="Application imports the files dropped into a directory as they arrive")
+        watch_parser.add_argument("-c", "--config", required=True, type=str, help="path to the configuration file")
+        watch_parser.add_argument("directory", type=str, help="the directory to watch for bank statement files")
+        watch_parser.add_argument("--interval", type=float, default=2.0, help="seconds between polls of the directory (default: 2)")
+        watch_parser.add_argument("--once", action="store_true", help="import the files currently in the directory and exit")
+        watch_parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help=f"number of rows inserted into the database per statement (default: {DEFAULT_BATCH_SIZE})")
+
+    def poll(self) -> list[str]:
+        """
+        Returns the files which are new or modified since they were last handled and, unless
+        running once, unchanged since the previous poll.
+        """
+        current = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if isCSV(entry.path):
+                    stat = entry.stat()
+                    current[entry.path] = (stat.st_size, stat.st_mtime_ns)
+
+        ready = [
+            file_path for file_path, stat in sorted(current.items())
+            if self.handled.get(file_path) != stat and (self.once or self.previous.get(file_path) == stat)
+        ]
+        self.previous = current
+        return ready
+
+    def import_files(self, file_paths: list[str]) -> ImportProgress:
+        """
+        Import the files which are not in the import manifest in a single database transaction
+        with an ImportJob. Files are marked handled once the import is committed, so files whose
+        import failed are imported again at the next poll.
+        """
+        from dt.lib.job import ImportJob
+
+        job = ImportJob(self.db, self.config, file_paths, batch_size=self.batch_size)
+        try:
+            progress = job.import_into(self.db)
+        except Exception as e:
+            raise RuntimeError(f"Failed to import files {file_paths}: {e}") from e
+
+        for file_path in file_paths:
+            self.handled[file_path] = self.previous[file_path]
+
+        if self.verbose and progress.files_read > 0:
+            print(f"Imported {progress.files_read} files ({progress.rows_inserted} transactions added, {progress.rows_skipped} skipped as duplicates)")
+        return progress
+
+    def run(self) -> None:
+        if self.verbose:
+            print(f"Watching {self.directory} every {self.interval} seconds")
+
+        try:
+            while True:
+                ready = self.poll()
+                if len(ready) > 0:
+                    try:
+                        self.import_files(ready)
+                    except RuntimeError as e:
+                        if self.once:
+                            raise
+                        # Keep watching; the files are retried at the next poll.
+                        print(f"Error running dt: {e}", file=sys.stderr)
+                if self.once:
+                    break
+                time.sleep(self.interval)
+        except KeyboardInterrupt:
+            if self.verbose:
+                print(f"Stopped watching {self.directory}")
+
+    def __str__(self) -> str:
+        return f"directory=({self.directory})"
+
+class QueryApplication(Application):
+    """
+    Writes the transactions in the database matching the filters as CSV, in the layout of the
+    transform application's CSV output. Rows are streamed from the database cursor to the
+    output as they are read, so the result is never held in memory.
+    """
+    def __init__(self, args: Namespace, db: DatabaseInterface):
+        self.db = db
+        self.output = args.output
+        self.limit = args.limit
+        self.batch_size = args.batch_size
+        self.query = QueryApplication.query_from_args(args)
+
+    @staticmethod
+    def attach(subparser: _SubParsersAction[ArgumentParser]):
+        query_parser = subparser.add_parser("query", description="Application writes the transactions in the database matching the filters as CSV")
+        QueryApplication.add_filter_arguments(query_parser)
+        query_parser.add_argument("--search", type=str, help="include transactions whose description contains this text, ignoring case")
+        query_parser.add_argument("--sort", choices=list(SORT_COLUMNS), default="date", help="column the transactions are ordered by (default: date)")
+        query_parser.add_argument("--desc", dest="descending", action="store_true", help="largest values first, e.g. newest transactions")
+        query_parser.add_argument("--limit", type=int, help="write at most this many transactions")
+        query_parser.add_argument("-o", "--output", type=str, help="the path to the output CSV file (default: standard output)")
+        query_parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help=f"number of rows fetched from the database at a time (default: {DEFAULT_BATCH_SIZE})")
+
+    @staticmethod
+    def add_filter_arguments(parser: ArgumentParser):
+        parser.add_argument("--from", dest="start_date", type=date.fromisoformat, help="first date to include (YYYY-MM-DD)")
+        parser.add_argument("--to", dest="end_date", type=date.fromisoformat, help="last date to include (YYYY-MM-DD)")
+        parser.add_argument("--institution", action="append", help="include transactions of this institution; may be repeated")
+        parser.add_argument("--type", action="append", help="include transactions of this type; may be repeated")
+        parser.add_argument("--category", action="append", help="include transactions of this category; may be repeated")
+        parser.add_argument("--min", type=parse_amount, help="smallest amount to include, e.g. 12.50")
+        parser.add_argument("--max", type=parse_amount, help="largest amount to include")
+
+    @staticmethod
+    def query_from_args(args: Namespace) -> TransactionQuery:
+        return TransactionQuery(
+            start_date=args.start_date,
+            end_date=args.end_date,
+            institutions=args.institution,
+            types=args.type,
+            categories=args.category,
+            min_cents=args.min,
+            max_cents=args.max,
+            text=getattr(args, "search", None),
+            descending=getattr(args, "descending", False),
+            sort=getattr(args, "sort", "date")
+        )
+
+    def rows(self) -> Iterator[tuple]:
+        return islice(self.db.transactions_stream(self.query, self.batch_size), self.limit)
+
+    def write(self, file) -> int:
+        """Write the rows to the file as CSV. Returns the number written."""
+        writer = csv.writer(file, lineterminator="\n")
+        writer.writerow(["id", "date", "description", "institution", "type", "amount"])
+
+        written = 0
+        for _, hash, day, description, institution, type, amount_cents, *_ in self.rows():
+            # Dates are stored as ISO 8601 date times; missing dates were stored as NaT.
+            writer.writerow([hash, "" if day in (None, "NaT") else day[:10], description, institution, type, format_amount(amount_cents)])
+            written += 1
+        return written
+
+    def run(self) -> None:
+        if self.output is None:
+            try:
+                self.write(sys.stdout)
+                sys.stdout.flush()
+            except BrokenPipeError:
+                # The reader of the output, e.g. `head`, exited early.
+                os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        else:
+            with open(self.output, "w", newline="", encoding="utf-8") as file:
+                written = self.write(file)
+            print(f"Wrote {written} transactions to {self.output}")
+
+    def __str__(self) -> str:
+        return f"query=({self.query})"
+
+class SearchApplication(QueryApplication):
+    """
+    Writes one page of the transactions whose descriptions contain the search words as CSV,
+    best matches first, using the full text index of the descriptions.
+    """
+    def __init__(self, args: Namespace, db: DatabaseInterface):
+        self.db = db
+        self.text = args.text
+        self.page = args.page
+        self.limit = args.limit
+        self.output = args.output
+        self.rebuild = args.rebuild
+        self.query = QueryApplication.query_from_args(args)
+
+    @staticmethod
+    def attach(subparser: _SubParsersAction[ArgumentParser]):
+        search_parser = subparser.add_parser("search", description="Application searches the descriptions of the transactions in the database")
+        search_parser.add_argument("text", nargs="?", type=str, help="words the descriptions must contain; end a word with * to match words starting with it")
+        QueryApplication.add_filter_arguments(search_parser)
+        search_parser.add_argument("--limit", type=int, default=20, help="transactions per page (default: 20)")
+        search_parser.add_argument("--page", type=int, default=1, help="page of the results to write (default: 1)")
+        search_parser.add_argument("-o", "--output", type=str, help="the path to the output CSV file (default: standard output)")
+        search_parser.add_argument("--rebuild", action="store_true", help="rebuild the full text index from the stored transactions first")
+
+    def rows(self) -> Iterator[tuple]:
+        """Returns the rows of the page, reached by following the keys of the pages before it."""
+        after = None
+        for _ in range(self.page):
+            rows = self.db.transactions_search_text(self.text, self.query, after, self.limit)
+            if len(rows) == 0:
+                break
+            after = TransactionQuery.search_key(rows[-1])
+        return iter(rows)
+
+    def run(self) -> None:
+        if self.rebuild:
+            self.db.transactions_fts_rebuild()
+        if self.text is None:
+            if not self.rebuild:
+                raise ValueError("Search text is required unless rebuilding the index")
+            return
+        super().run()
+
+    def __str__(self) -> str:
+        return f"text=({self.text}), page=({self.page}), query=({self.query})"
+
+class ReportApplication(Application):
+    """
+    Writes the number, total, smallest and largest amount of the transactions of every group
+    as CSV, e.g. per month and category. Reports read the monthly aggregates kept up to date
+    as transactions are imported, so they never read the transactions themselves.
+    """
+    def __init__(self, args: Namespace, db: DatabaseInterface):
+        self.db = db
+        self.output = args.output
+        self.rebuild = args.rebuild
+        self.query = AggregateQuery(
+            group_by=args.by,
+            start_month=args.start_month,
+            end_month=args.end_month,
+            institutions=args.institution,
+            types=args.type,
+            categories=args.category
+        )
+
+    @staticmethod
+    def attach(subparser: _SubParsersAction[ArgumentParser]):
+        report_parser = subparser.add_parser("report", description="Application writes totals of the transactions in the database as CSV")
+        report_parser.add_argument("--by", nargs="+", choices=list(GROUP_COLUMNS), default=["month"], help="columns to group the transactions by (default: month)")
+        report_parser.add_argument("--from", dest="start_month", type=ReportApplication.month, help="first month to include (YYYY-MM)")
+        report_parser.add_argument("--to", dest="end_month", type=ReportApplication.month, help="last month to include (YYYY-MM)")
+        report_parser.add_argument("--institution", action="append", help="include transactions of this institution; may be repeated")
+        report_parser.add_argument("--type", action="append", help="include transactions of this type; may be repeated")
+        report_parser.add_argument("--category", action="append", help="include transactions of this category; may be repeated")
+        report_parser.add_argument("-o", "--output", type=str, help="the path to the output CSV file (default: standard output)")
+        report_parser.add_argument("--rebuild", action="store_true", help="recompute the totals from the stored transactions first")
+
+    @staticmethod
+    def month(text: str) -> str:
+        """Validate a month given as YYYY-MM."""
+        return date.fromisoformat(f"{text}-01").isoformat()[:7]
+
+    def write(self, file):
+        writer = csv.writer(file, lineterminator="\n")
+        writer.writerow([*self.query.group_by, "count", "total", "min", "max"])
+        for *groups, count, total_cents, min_cents, max_cents in self.db.aggregates_read(self.query):
+            writer.writerow([*groups, count, format_amount(total_cents), format_amount(min_cents), format_amount(max_cents)])
+
+    def run(self) -> None:
+        if self.rebuild:
+            self.db.aggregates_rebuild()
+
+        if self.output is None:
+            self.write(sys.stdout)
+        else:
+            with open(self.output, "w", newline="", encoding="utf-8") as file:
+                self.write(file)
+
+    def __str__(self) -> str:
+        return f"query=({self.query})"
+
 class ApplicationFactory:
     @staticmethod
     def create_application(argument_reader: ArgumentReader, db: DatabaseInterface) -> Application:
@@ -128,5 +540,13 @@ class ApplicationFactory:
                 return TransformApplication(argument_reader.get_args(), db)
             case "config":
                 return ConfigApplication(argument_reader.get_args(), db)
+            case "watch":
+                return WatchApplication(argument_reader.get_args(), db)
+            case "query":
+                return QueryApplication(argument_reader.get_args(), db)
+            case "search":
+                return SearchApplication(argument_reader.get_args(), db)
+            case "report":
+                return ReportApplication(argument_reader.get_args(), db)
         
         raise Exception(f"Unable to create application: \"{argument_reader.get_application}\"")
\ No newline at end of file
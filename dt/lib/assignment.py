@@ -1,5 +1,22 @@
+import numpy as np
 import pandas as pd
 from enum import Enum
+from typing import Any
+from .matcher import KeywordMatcher
+
+def set_values(df: pd.DataFrame, rows: pd.Series | np.ndarray, column: str | int, values: Any) -> None:
+    """Set the column at the selected rows, adding new values to the categories of categorical columns."""
+    if column in df.columns and isinstance(df[column].dtype, pd.CategoricalDtype):
+        if isinstance(values, (pd.Series, np.ndarray)):
+            candidates = pd.unique(pd.Series(values)).tolist()
+        else:
+            candidates = [values]
+        categories = df[column].cat.categories
+        missing = [value for value in candidates if not pd.isna(value) and value not in categories]
+        if len(missing) > 0:
+            df[column] = df[column].cat.add_categories(missing)
+
+    df.loc[rows, column] = values
 
 class Assignment:
     def __init__(self, column: str | int, value: str | int | float):
@@ -11,7 +28,23 @@ class Assignment:
         if filter is None:
             df[self.column] = self.value
         else:
-            df.loc[filter, self.column] = self.value
+            set_values(df, filter, self.column, self.value)
+
+    def applies(self, df: pd.DataFrame) -> np.ndarray | None:
+        """Returns the rows the assignment gives a value to, or None if it gives every row a value."""
+        return None
+
+    def values(self, df: pd.DataFrame, rows: np.ndarray) -> Any:
+        """Returns the value(s) the assignment gives the rows at the given positions."""
+        return self.value
+
+    def read_columns(self) -> set:
+        """Returns the columns the assignment reads its value from."""
+        return set()
+
+    def used_columns(self) -> set | None:
+        """Returns the columns the assignment reads or writes."""
+        return {self.column}
 
     def __str__(self) -> str:
         return f"{self.__class__.__name__}(column={self.column}, value={self.value})"
@@ -28,7 +61,54 @@ class ColumnAssignment(Assignment):
         if filter is None:
             df[self.column] = df[self.value]
         else:
-            df.loc[filter, self.column] = df[self.value]
+            set_values(df, filter, self.column, df[self.value])
+
+    def values(self, df: pd.DataFrame, rows: np.ndarray) -> Any:
+        return df[self.value].to_numpy()[rows]
+
+    def read_columns(self) -> set:
+        return {self.value}
+
+    def used_columns(self) -> set | None:
+        return {self.column, self.value}
+
+class KeywordAssignment(Assignment):
+    """
+    Assign the label of the first keyword found in another column. Rows whose source
+    column contains none of the keywords are left unchanged, and a new column is missing
+    (NaN) in those rows.
+    """
+    def __init__(self, column: str | int, value: str | int, keywords: dict[str, str], case_sensitive: bool = False):
+        super().__init__(column, value)
+        self.keywords = keywords
+        self.matcher = KeywordMatcher(list(keywords), case_sensitive)
+        self.labels = np.array(list(keywords.values()), dtype=object)
+
+    def assign(self, df: pd.DataFrame, filter: pd.Series | None = None) -> None:
+        found = self.matcher.match(df[self.value])
+        rows = found >= 0
+        if filter is not None:
+            rows &= filter.to_numpy(dtype=bool, na_value=False)
+        if rows.any():
+            set_values(df, rows, self.column, self.labels[found[rows]])
+        elif self.column not in df.columns:
+            # Every chunk of a file has the column, whether or not a keyword is found in it.
+            df[self.column] = np.nan
+
+    def applies(self, df: pd.DataFrame) -> np.ndarray | None:
+        return self.matcher.match(df[self.value]) >= 0
+
+    def values(self, df: pd.DataFrame, rows: np.ndarray) -> Any:
+        return self.labels[self.matcher.match(df[self.value].iloc[rows])]
+
+    def read_columns(self) -> set:
+        return {self.value}
+
+    def used_columns(self) -> set | None:
+        return {self.column, self.value}
+
+    def __str__(self) -> str:
+        return f"{self.__class__.__name__}(column={self.column}, value={self.value}, keywords={self.keywords})"
 
 class IntAssignment(Assignment):
     """Assign an integer value to a column."""
@@ -50,6 +130,7 @@ class AssignmentType(Enum):
     INTEGER = "integer"
     FLOAT = "float"
     COLUMN = "column"
+    KEYWORD = "keyword"
 
 class AssignmentFactory:
     @staticmethod
@@ -81,6 +162,14 @@ class AssignmentFactory:
 
         if column is None or value is None:
             raise ValueError("Assignment dictionary must contain 'column' and 'value' keys.")
+
+        if a_type == AssignmentType.KEYWORD:
+            keywords = a_dict.get("keywords")
+            case_sensitive = a_dict.get("case_sensitive", False)
+            if isinstance(column, (int, str)) and isinstance(value, (int, str)) and isinstance(keywords, dict) and isinstance(case_sensitive, bool):
+                return KeywordAssignment(column, value, keywords, case_sensitive)
+            else:
+                raise ValueError("Invalid types for 'column', 'value', 'keywords' or 'case_sensitive' in keyword assignment dictionary.")
         
         if isinstance(column, (int, str)) and isinstance(value, (int, float, str)):
             return AssignmentFactory.create_assignment(a_type, column, value)
@@ -1,16 +1,23 @@
 from dt.lib.transform import Transform, TransformFactory
+from dt.lib.plan import Plan, PlanCompiler
 from dt.io.db.interface import DatabaseInterface
 from dt.io.reader import ConfigReader
+from dt.io.schema import Schema
 
 class Config:
     def __init__(self, config_name: str, db: DatabaseInterface):
         config_reader = ConfigReader(config_name, db)
-        config_data = config_reader.read()
-        
+        config_data = ConfigReader.parse(config_reader.read_text())
+
+        self.config_name = config_name
+        self.db = db
         self.name = config_data.get("name", "Unnamed Configuration")
         self.description = config_data.get("description", "")
         self.properties = config_data.get("properties", {})
         self.unparsed_transforms = config_data.get("transforms", [])
+        self.unparsed_schema = config_data.get("schema")
+        self.parsed_transforms: list[Transform] | None = None
+        self.compiled_plan: Plan | None = None
 
     def name(self) -> str:
         """Returns the name of the configuration"""
@@ -35,18 +42,39 @@ class Config:
         else:
             raise ValueError("Invalid 'headers' property in configuration; must be a boolean.")
         
-    def transforms(self) -> list[Transform]:
-        """Parses the transforms from the configuration file into a list of parsed tranforms"""
-        if isinstance(self.unparsed_transforms, list):
-            t = []
-            for transform in self.unparsed_transforms:
-                t.append(TransformFactory.from_dict(transform))
-            return t
+    def schema(self) -> Schema | None:
+        """Returns the column types to apply while reading, or None if the configuration has no schema."""
+        if self.unparsed_schema is None:
+            return None
+        elif isinstance(self.unparsed_schema, dict):
+            return Schema.from_dict(self.unparsed_schema, self.headers())
         else:
-            raise ValueError("Invalid 'transforms' property in configuration; must be a list.")
+            raise ValueError("Invalid 'schema' property in configuration; must be an object.")
+
+    def transforms(self) -> list[Transform]:
+        """
+        Parses the transforms from the configuration file into a list of parsed tranforms.
+        The transforms are parsed once and reused on later calls.
+        """
+        if self.parsed_transforms is None:
+            if isinstance(self.unparsed_transforms, list):
+                self.parsed_transforms = [TransformFactory.from_dict(transform) for transform in self.unparsed_transforms]
+            else:
+                raise ValueError("Invalid 'transforms' property in configuration; must be a list.")
+
+        return self.parsed_transforms
+
+    def plan(self) -> Plan:
+        """
+        Returns the compiled plan of the transforms. The plan is compiled once and kept by
+        the configuration for later calls.
+        """
+        if self.compiled_plan is None:
+            self.compiled_plan = PlanCompiler.compile(self.transforms())
+        return self.compiled_plan
     
     def __str__(self):
         return f"Config(\nname={self.name}\ndescription={self.description}\nheaders={self.headers()}\ntransforms=(\n{"\n".join([str(transform) for transform in self.transforms()])}\n))"
     
     def __repr__(self):
-        return self.__str__()
\ No newline at end of file
+        return self.__str__()
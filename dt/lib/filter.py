@@ -1,8 +1,14 @@
+import re
+import numpy as np
 import pandas as pd
 from abc import ABC, abstractmethod
 from enum import Enum
+from .matcher import KeywordMatcher
 
 class Filter(ABC):
+    # Relative cost of evaluating the filter on a row, used to run cheap filters first.
+    cost: int = 1
+
     @classmethod
     @abstractmethod
     def from_dict(cls, f_dict: dict) -> Filter:
@@ -11,6 +17,10 @@ class Filter(ABC):
     @abstractmethod
     def apply(self, df: pd.DataFrame) -> pd.Series:
         pass
+
+    def used_columns(self) -> set | None:
+        """Returns the columns the filter reads, or None if it may read any column."""
+        return None
     
     def __str__(self) -> str:
         return f"{self.__class__.__name__}"
@@ -38,6 +48,9 @@ class NotNull(Filter):
 
     def apply(self, df: pd.DataFrame) -> pd.Series:
         return df[self.column].notnull()
+
+    def used_columns(self) -> set | None:
+        return {self.column}
     
     def __str__(self) -> str:
         return f"{super().__str__()}(column={self.column})"
@@ -45,11 +58,18 @@ class NotNull(Filter):
 
 class Regex(Filter):
     """Filter for checking that a column matches a regex pattern"""
+    cost = 10
+
     def __init__(self, column: str | int, pattern: str):
         super().__init__()
         self.column = column
         self.pattern = pattern
 
+        try:
+            self.regex = re.compile(pattern)
+        except re.error as e:
+            raise FilterError("Regex", f"pattern {pattern} is not a valid regular expression: {e}")
+
     @classmethod
     def from_dict(cls, f_dict: dict) -> Regex:
         column = f_dict.get("column")
@@ -60,12 +80,54 @@ class Regex(Filter):
             raise FilterError("Regex", f"column {column} or pattern {pattern} are not valid types")
 
     def apply(self, df: pd.DataFrame) -> pd.Series:
-        return df[self.column].astype(str).str.match(self.pattern)
+        column = df[self.column]
+
+        # Columns which are not already strings are converted once so the match runs
+        # on pandas' vectorized (Arrow backed when available) string kernels.
+        if not isinstance(column.dtype, pd.StringDtype):
+            column = column.astype("str")
+
+        return column.str.match(self.regex, na=False).astype(bool)
+
+    def used_columns(self) -> set | None:
+        return {self.column}
     
     def __str__(self) -> str:
         return f"{super().__str__()}(column={self.column}, pattern={self.pattern})"
 
 
+class Keywords(Filter):
+    """Filter for checking that a column contains any of a list of keywords, matched in a single pass"""
+    cost = 10
+
+    def __init__(self, column: str | int, keywords: list[str], case_sensitive: bool = False):
+        super().__init__()
+        self.column = column
+
+        try:
+            self.matcher = KeywordMatcher(keywords, case_sensitive)
+        except ValueError as e:
+            raise FilterError("Keywords", str(e))
+
+    @classmethod
+    def from_dict(cls, f_dict: dict) -> Keywords:
+        column = f_dict.get("column")
+        keywords = f_dict.get("keywords")
+        case_sensitive = f_dict.get("case_sensitive", False)
+        if isinstance(column, (int, str)) and isinstance(keywords, list) and isinstance(case_sensitive, bool):
+            return cls(column, keywords, case_sensitive)
+        else:
+            raise FilterError("Keywords", f"column {column}, keywords or case_sensitive {case_sensitive} are not valid types")
+
+    def apply(self, df: pd.DataFrame) -> pd.Series:
+        return pd.Series(self.matcher.match(df[self.column]) >= 0, index=df.index)
+
+    def used_columns(self) -> set | None:
+        return {self.column}
+
+    def __str__(self) -> str:
+        return f"{super().__str__()}(column={self.column}, keywords={self.matcher.keywords}, case_sensitive={self.matcher.case_sensitive})"
+
 class ComparisonFilter(Filter):
     def __init__(self, column: str | int, threshold: int | float):
         super().__init__()
@@ -85,6 +147,9 @@ class ComparisonFilter(Filter):
     def apply(self, df: pd.DataFrame) -> pd.Series:
         pass
 
+    def used_columns(self) -> set | None:
+        return {self.column}
+
     def __str__(self) -> str:
         return f"{super().__str__()}(column={self.column}, threshold={self.threshold})"
 
@@ -108,6 +173,107 @@ class LessThanEqualTo(ComparisonFilter):
     def apply(self, df: pd.DataFrame) -> pd.Series:
         return df[self.column] <= self.threshold
 
+def filters_used_columns(filters: list[Filter]) -> set | None:
+    """Returns the columns read by any of the filters, or None if any of them may read any column."""
+    columns = set()
+    for f in filters:
+        f_columns = f.used_columns()
+        if f_columns is None:
+            return None
+        columns |= f_columns
+    return columns
+
+def as_mask(series: pd.Series) -> np.ndarray:
+    """Convert a filter result to a boolean array, treating missing values as not matching."""
+    return series.to_numpy(dtype=bool, na_value=False)
+
+class ExpressionFilter(Filter):
+    """
+    Filter combining other filters. Cheaper filters are evaluated first, and each following
+    filter is only evaluated on the rows whose result is still undecided.
+    """
+    # Evaluate on a subset of rows only when fewer than this fraction are still undecided,
+    # otherwise copying the rows costs more than it saves.
+    subset_fraction = 0.5
+
+    def __init__(self, filters: list[Filter]):
+        super().__init__()
+        self.filters = filters
+        self.ordered = sorted(filters, key=lambda f: f.cost)
+
+    @classmethod
+    def from_dict(cls, f_dict: dict) -> ExpressionFilter:
+        filters = f_dict.get("filters")
+        if isinstance(filters, list) and len(filters) > 0 and all(isinstance(f, dict) for f in filters):
+            return cls([FilterFactory.from_dict(f) for f in filters])
+        else:
+            raise FilterError(cls.__name__, f"filters {filters} must be a non-empty list of filters")
+
+    @property
+    def cost(self) -> int:
+        return sum(f.cost for f in self.filters)
+
+    # Result of a single filter which decides the result of the whole expression.
+    short_circuit: bool
+
+    def apply(self, df: pd.DataFrame) -> pd.Series:
+        mask = np.full(len(df), not self.short_circuit)
+        columns = self.used_columns()
+
+        for f in self.ordered:
+            undecided = np.flatnonzero(mask != self.short_circuit)
+            if len(undecided) == 0:
+                break
+            elif len(undecided) < len(df) * self.subset_fraction:
+                rows = df.iloc[undecided] if columns is None else df[list(columns)].iloc[undecided]
+                mask[undecided] = as_mask(f.apply(rows))
+            else:
+                result = as_mask(f.apply(df))
+                mask[undecided] = result[undecided]
+
+        return pd.Series(mask, index=df.index)
+
+    def used_columns(self) -> set | None:
+        return filters_used_columns(self.filters)
+
+    def __str__(self) -> str:
+        return f"{super().__str__()}(filters={self.filters})"
+
+class And(ExpressionFilter):
+    """Filter matching rows which match every one of its filters"""
+    short_circuit = False
+
+class Or(ExpressionFilter):
+    """Filter matching rows which match any of its filters"""
+    short_circuit = True
+
+class Not(Filter):
+    """Filter matching rows which do not match its filter"""
+    def __init__(self, filter: Filter):
+        super().__init__()
+        self.filter = filter
+
+    @classmethod
+    def from_dict(cls, f_dict: dict) -> Not:
+        filter = f_dict.get("filter")
+        if isinstance(filter, dict):
+            return cls(FilterFactory.from_dict(filter))
+        else:
+            raise FilterError("Not", f"filter {filter} is not a valid filter")
+
+    @property
+    def cost(self) -> int:
+        return self.filter.cost
+
+    def apply(self, df: pd.DataFrame) -> pd.Series:
+        return pd.Series(~as_mask(self.filter.apply(df)), index=df.index)
+
+    def used_columns(self) -> set | None:
+        return self.filter.used_columns()
+
+    def __str__(self) -> str:
+        return f"{super().__str__()}(filter={self.filter})"
+
 class FilterType(Enum):
     """Used in FilterFactory to identify filter types"""
     NOT_NULL = "not_null"
@@ -117,6 +283,10 @@ class FilterType(Enum):
     GREATER_THAN_EQUAL_TO = "greater_than_equal_to"
     LESS_THAN_EQUAL_TO = "less_than_equal_to"
     REGEX = "regex"
+    KEYWORDS = "keywords"
+    AND = "and"
+    OR = "or"
+    NOT = "not"
 
 class FilterFactory:
     """Factory for creating Filter objects from dictionaries"""
@@ -129,6 +299,14 @@ class FilterFactory:
                 return NotNull.from_dict(f_dict)
             case FilterType.REGEX:
                 return Regex.from_dict(f_dict)
+            case FilterType.KEYWORDS:
+                return Keywords.from_dict(f_dict)
+            case FilterType.AND:
+                return And.from_dict(f_dict)
+            case FilterType.OR:
+                return Or.from_dict(f_dict)
+            case FilterType.NOT:
+                return Not.from_dict(f_dict)
             case FilterType.GREATER_THAN:
                 return GreaterThan.from_dict(f_dict)
             case FilterType.GREATER_THAN_EQUAL_TO:
@@ -0,0 +1,189 @@
+import copy, threading
+from typing import TYPE_CHECKING, Callable, Iterator
+from dt.io.db.interface import DatabaseInterface, DEFAULT_BATCH_SIZE
+from dt.io.manifest import ImportManifest
+
+# Modules which import pandas are imported when a job runs, so that applications which
+# create jobs start without loading pandas.
+if TYPE_CHECKING:
+    from pandas import DataFrame
+    from dt.io.reader import DataReader
+    from dt.lib.config import Config
+    from dt.lib.transform import Transformer
+
+class ImportCancelled(Exception):
+    """Raised by a running import once it is cancelled, after the import has been rolled back."""
+
+class ImportProgress:
+    """Counts of an import so far: files and rows read, rows transformed, transactions added and duplicates skipped."""
+    def __init__(self):
+        self.files_total = 0
+        self.files_skipped = 0
+        self.files_read = 0
+        self.rows_read = 0
+        self.rows_transformed = 0
+        self.rows_inserted = 0
+        self.rows_skipped = 0
+        self.finished = False
+
+    def summary(self) -> str:
+        return f"{self.files_read}/{self.files_total} files, {self.rows_read} rows read, {self.rows_transformed} transformed, {self.rows_inserted} added, {self.rows_skipped} duplicates"
+
+    def __str__(self) -> str:
+        return f"{self.__class__.__name__}(files_total={self.files_total}, files_skipped={self.files_skipped}, files_read={self.files_read}, rows_read={self.rows_read}, rows_transformed={self.rows_transformed}, rows_inserted={self.rows_inserted}, rows_skipped={self.rows_skipped}, finished={self.finished})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+class ImportJob:
+    """
+    Import of files into the database with a configuration, read, transformed and inserted as
+    the transform application does. A copy of the progress is passed to on_progress after
+    every file read, data frame transformed and batch inserted. Everything is written in one
+    database transaction committed when the import completes, so a failed or cancelled import
+    leaves the database unchanged. Cancelling takes effect at the next progress report.
+    """
+    def __init__(
+        self,
+        db: DatabaseInterface,
+        config: Config,
+        paths: list[str],
+        chunksize: int | None = None,
+        jobs: int = 1,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        force: bool = False,
+        verbose: bool = False,
+        on_progress: Callable[[ImportProgress], None] | None = None
+    ):
+        self.db = db
+        self.config = config
+        self.paths = paths
+        self.chunksize = chunksize
+        self.jobs = jobs
+        self.batch_size = batch_size
+        self.force = force
+        self.verbose = verbose
+        self.on_progress = on_progress
+        # Compiled up front, as the configuration reads the plan cache through its own connection.
+        self.plan = config.plan()
+        self.schema = config.schema()
+        self.headers = config.headers()
+        self.progress = ImportProgress()
+        self.error: Exception | None = None
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        """Stop the import at its next progress report. May be called from any thread."""
+        self.cancelled.set()
+
+    def run(self) -> ImportProgress:
+        """Import the files on the calling thread. Returns the final progress."""
+        return self.import_into(self.db)
+
+    def start(self, on_finished: Callable[[ImportJob], None] | None = None) -> threading.Thread:
+        """
+        Import the files on a worker thread, which opens its own connection to the database as
+        SQLite connections belong to the thread that opened them. on_finished is called on the
+        worker thread with the job once it ends; error holds the exception it failed with.
+        """
+        def work():
+            db = DatabaseInterface(self.db.executable_path)
+            try:
+                self.import_into(db)
+            except Exception as e:
+                self.error = e
+            finally:
+                db.connection.close()
+                if on_finished is not None:
+                    on_finished(self)
+
+        thread = threading.Thread(target=work, name="import", daemon=True)
+        thread.start()
+        return thread
+
+    def import_into(self, db: DatabaseInterface) -> ImportProgress:
+        from dt.io.reader import DataReader
+        from dt.lib.transform import Transformer
+        from dt.lib.transaction import TransactionBatch
+
+        manifest = None if self.force else ImportManifest(db, self.config.config_name)
+        reader = DataReader(self.paths, headers=self.headers, verbose=self.verbose, chunksize=self.chunksize, jobs=self.jobs, usecols=self.plan.usecols(), manifest=manifest, schema=self.schema, on_file=self.file_read)
+        self.progress.files_total = len(reader.files())
+        self.progress.files_skipped = len(reader.skipped)
+        self.report()
+
+        transformer = Transformer(self.verbose)
+        transformer.set_transforms(self.plan.steps)
+
+        try:
+            for df in self.frames(reader, transformer):
+                self.progress.rows_transformed += len(df)
+                self.report()
+                TransactionBatch.from_dataframe(df).insert_into_db(db, self.batch_size, self.batch_inserted)
+
+            if len(reader.rows) > 0:
+                # Forced imports are recorded as well.
+                (manifest or ImportManifest(db, self.config.config_name)).record(reader.rows)
+            self.check()
+            db.connection.commit()
+        except BaseException:
+            db.connection.rollback()
+            raise
+
+        self.progress.finished = True
+        self.report(check=False)
+        return self.progress
+
+    def frames(self, reader: DataReader, transformer: Transformer) -> Iterator[DataFrame]:
+        """The transformed data: one data frame per chunk when reading in chunks, otherwise a single one."""
+        if self.chunksize is not None:
+            yield from transformer.transform_chunks(self.chunks_read(reader))
+            return
+
+        # With several jobs the transforms are applied to each file in the worker
+        # processes instead of to the combined data afterwards.
+        per_file = self.jobs > 1
+        if per_file:
+            file_transformer = Transformer()
+            file_transformer.set_transforms(self.plan.steps)
+            df = reader.read(file_transformer.transform)
+        else:
+            df = reader.read()
+
+        if len(reader.rows) > 0:
+            yield df if per_file else transformer.transform(df)
+
+    def chunks_read(self, reader: DataReader) -> Iterator[DataFrame]:
+        """The chunks of the reader, counting their rows as read before they are transformed."""
+        for chunk in reader.read_chunks():
+            self.progress.rows_read += len(chunk)
+            self.report()
+            yield chunk
+
+    def file_read(self, path: str, rows: int):
+        self.progress.files_read += 1
+        # Rows read in chunks were counted chunk by chunk.
+        if self.chunksize is None:
+            self.progress.rows_read += rows
+        self.report()
+
+    def batch_inserted(self, added: int, skipped: int):
+        self.progress.rows_inserted += added
+        self.progress.rows_skipped += skipped
+        self.report()
+
+    def report(self, check: bool = True):
+        if self.on_progress is not None:
+            self.on_progress(copy.copy(self.progress))
+        if check:
+            self.check()
+
+    def check(self):
+        if self.cancelled.is_set():
+            raise ImportCancelled(f"Import of {self.paths} was cancelled")
+
+    def __str__(self) -> str:
+        return f"{self.__class__.__name__}(config={self.config.config_name}, paths={self.paths}, progress={self.progress})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
@@ -0,0 +1,83 @@
+from collections import deque
+import numpy as np
+import pandas as pd
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton finding which of many keywords occur in a text in a single pass
+    over the text, independent of the number of keywords. When several keywords occur in a
+    text the one listed first wins.
+    """
+    def __init__(self, keywords: list[str], case_sensitive: bool = False):
+        if len(keywords) == 0:
+            raise ValueError("KeywordMatcher requires at least one keyword.")
+        if any(not isinstance(keyword, str) or len(keyword) == 0 for keyword in keywords):
+            raise ValueError(f"Keywords must be non-empty strings: {keywords}")
+
+        self.keywords = keywords
+        self.case_sensitive = case_sensitive
+
+        # Node 0 is the root. goto holds the trie edges, fail the longest proper suffix of
+        # each node which is also a node, and best the first keyword ending at the node
+        # or at any of its suffixes (-1 for none).
+        self.goto: list[dict[str, int]] = [{}]
+        self.fail: list[int] = [0]
+        self.best: list[int] = [-1]
+
+        for index, keyword in enumerate(keywords):
+            node = 0
+            for char in self.normalize(keyword):
+                if char not in self.goto[node]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.best.append(-1)
+                    self.goto[node][char] = len(self.goto) - 1
+                node = self.goto[node][char]
+            if self.best[node] == -1:
+                self.best[node] = index
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                fail = self.fail[node]
+                while fail > 0 and char not in self.goto[fail]:
+                    fail = self.fail[fail]
+                self.fail[child] = self.goto[fail].get(char, 0)
+                suffix_best = self.best[self.fail[child]]
+                if suffix_best != -1 and (self.best[child] == -1 or suffix_best < self.best[child]):
+                    self.best[child] = suffix_best
+                queue.append(child)
+
+    def normalize(self, text: str) -> str:
+        return text if self.case_sensitive else text.casefold()
+
+    def search(self, text: str) -> int:
+        """Returns the index of the first listed keyword occurring in the text, or -1 if none does."""
+        goto, fail, best = self.goto, self.fail, self.best
+        found = -1
+        node = 0
+        for char in self.normalize(text):
+            while node > 0 and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if best[node] != -1 and (found == -1 or best[node] < found):
+                found = best[node]
+                if found == 0:
+                    break
+        return found
+
+    def match(self, series: pd.Series) -> np.ndarray:
+        """
+        Returns the index of the matching keyword for every value of the series, or -1 for
+        values without a match. Each distinct value is searched once; missing values never match.
+        """
+        codes, uniques = pd.factorize(series)
+        found = np.array([self.search(value) if isinstance(value, str) else -1 for value in uniques], dtype=np.int64)
+        return np.append(found, -1)[codes]
+
+    def __str__(self) -> str:
+        return f"{self.__class__.__name__}(keywords={len(self.keywords)}, case_sensitive={self.case_sensitive})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
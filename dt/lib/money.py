@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+from decimal import Decimal, ROUND_HALF_UP
+
+# Amounts are held as integer numbers of cents in a nullable Int64 column.
+CENTS_DTYPE = "Int64"
+
+# An amount: one sign before or after it, or accounting parentheses, an optional dollar
+# sign, and digits with an optional fraction. Thousands separators separate groups of three.
+AMOUNT_PATTERN = r"^(?P<open>\()?(?P<lead>[-+])?\$?\s*(?P<after_symbol>[-+])?(?P<whole>\d{1,3}(?:,\d{3})+|\d*)(?:\.(?P<fraction>\d*))?(?P<trail>[-+])?(?P<close>\))?$"
+
+def parse_cents(series: pd.Series) -> pd.Series:
+    """
+    Parse amounts written as text, such as "$1,234.56", "-4.5", "12.00-" or "(12.00)", into exact
+    integer cents without going through floats. Digits past the cents are rounded half away from
+    zero. Each distinct value is parsed once; missing and empty values become <NA>. Raises a
+    ValueError for text which is not an amount, such as "1e3", "12 DR" or "1.234,56".
+    """
+    codes, uniques = pd.factorize(series)
+    text = pd.Series(uniques, dtype=object).astype("str").str.strip()
+
+    parts = text.str.extract(AMOUNT_PATTERN)
+    signs = parts[["lead", "after_symbol", "trail"]]
+    parentheses = parts["open"].notna()
+    whole, fraction = parts["whole"].str.replace(",", "", regex=False), parts["fraction"].fillna("")
+
+    invalid = (
+        whole.isna()
+        | (parentheses != parts["close"].notna())
+        | (signs.notna().sum(axis=1) + parentheses > 1)
+        | ((whole == "") & (fraction == "") & (text != ""))
+    )
+    if invalid.any():
+        raise ValueError(f"Column {series.name} has values which are not amounts: {list(text[invalid][:5])}")
+
+    negative = parentheses | (signs == "-").any(axis=1)
+
+    fraction = fraction.str.pad(3, side="right", fillchar="0")
+    cents = (
+        pd.to_numeric(whole.replace("", "0")).astype("int64") * 100
+        + pd.to_numeric(fraction.str[:2]).astype("int64")
+        + (pd.to_numeric(fraction.str[2]) >= 5).astype("int64")
+    )
+    cents = cents.where(~negative, -cents).astype(CENTS_DTYPE)
+    cents[(text == "").to_numpy()] = pd.NA
+
+    values = pd.array(np.append(cents.to_numpy(dtype=object, na_value=pd.NA), pd.NA), dtype=CENTS_DTYPE)
+    return pd.Series(values[codes], index=series.index, name=series.name)
+
+def to_cents(series: pd.Series) -> pd.Series:
+    """
+    Convert an amount column in currency units to integer cents. Integers are whole units and
+    text is parsed exactly with parse_cents. Floats are rounded to the nearest cent, half away
+    from zero as written in their shortest decimal text, so 1.005 and "1.005" are both 101 cents.
+    """
+    if pd.api.types.is_bool_dtype(series):
+        raise ValueError(f"Column {series.name} has boolean values which are not amounts")
+    elif pd.api.types.is_integer_dtype(series):
+        return (series.astype(CENTS_DTYPE) * 100).rename(series.name)
+    elif pd.api.types.is_float_dtype(series):
+        return round_cents(series)
+    else:
+        return parse_cents(series)
+
+def round_cents(series: pd.Series) -> pd.Series:
+    """
+    Round float amounts in currency units to integer cents, half away from zero. Rounding the
+    scaled floats is exact except near half a cent, where it rounds half to even and the floats
+    are off by their representation error. Those values are rounded from their shortest decimal
+    text instead, once per distinct value.
+    """
+    values = series.to_numpy(dtype="float64", na_value=np.nan)
+    scaled = values * 100
+    cents = np.round(scaled)
+
+    near_half = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < 1e-9 * np.maximum(1, np.abs(scaled))
+    positions = np.flatnonzero(near_half)
+    if len(positions) > 0:
+        codes, uniques = pd.factorize(values[positions])
+        exact = [float((Decimal(repr(value)) * 100).to_integral_value(ROUND_HALF_UP)) for value in uniques.tolist()]
+        cents[positions] = np.array(exact)[codes]
+
+    return pd.Series(cents, index=series.index, name=series.name).astype(CENTS_DTYPE)
+
+def format_cents(series: pd.Series) -> pd.Series:
+    """Format integer cents as exact decimal text with two digits after the point, e.g. -1234 as "-12.34"."""
+    cents = series.astype(CENTS_DTYPE)
+    units = cents.abs() // 100
+    text = units.astype("str") + "." + (cents.abs() % 100).astype("str").str.zfill(2)
+    return text.where(cents >= 0, "-" + text)
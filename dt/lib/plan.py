@@ -0,0 +1,233 @@
+import numpy as np
+import pandas as pd
+from .transform import Transform, ColumnTransform, CreateColumn, RenameColumns, DropColumns, ReorderColumns, ConditionalUpdate, RuleSet
+
+PROJECTIONS = (RenameColumns, DropColumns, ReorderColumns)
+
+class ExcludeColumns:
+    """Callable for the usecols argument of pd.read_csv which skips the given columns while parsing."""
+    def __init__(self, columns: list[str | int]):
+        self.columns = columns
+
+    def __call__(self, column: str | int) -> bool:
+        return column not in self.columns
+
+    def __str__(self) -> str:
+        return f"{self.__class__.__name__}(columns={self.columns})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+class Projection(Transform):
+    """
+    Consecutive rename, drop and reorder transforms applied as one selection of columns.
+    The transforms are first evaluated on the column labels only, then the data is copied once.
+    """
+    def __init__(self, transforms: list[Transform]):
+        self.transforms = transforms
+
+    @classmethod
+    def from_dict(cls, t_dict: dict) -> Transform:
+        raise ValueError("Projection is created by the plan compiler and cannot be configured.")
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        labels = list(df.columns)
+        # Position of each output column in df, or None for columns added by a reorder.
+        sources: list[int | None] = list(range(len(labels)))
+
+        for t in self.transforms:
+            if isinstance(t, RenameColumns):
+                labels = [t.columns.get(label, label) for label in labels]
+            elif isinstance(t, DropColumns):
+                missing = [column for column in t.columns if column not in labels]
+                if len(missing) > 0:
+                    raise KeyError(f"{missing} not found in axis")
+                kept = [index for index, label in enumerate(labels) if label not in t.columns]
+                labels = [labels[index] for index in kept]
+                sources = [sources[index] for index in kept]
+            elif isinstance(t, ReorderColumns):
+                sources = [sources[labels.index(column)] if column in labels else None for column in t.columns]
+                labels = list(t.columns)
+
+        if all(source is not None for source in sources):
+            out = df.iloc[:, sources]
+        else:
+            out = pd.DataFrame({
+                index: df.iloc[:, source] if source is not None else np.nan
+                for index, source in enumerate(sources)
+            }, index=df.index)
+        out.columns = labels
+
+        return out
+
+    def __str__(self) -> str:
+        return f"{super().__str__()}(transforms={self.transforms})"
+
+class ColumnPass(Transform):
+    """
+    Consecutive column transforms and created columns applied column by column,
+    so each column is read and written back to the data frame once.
+    """
+    def __init__(self, transforms: list[ColumnTransform | CreateColumn]):
+        self.transforms = transforms
+
+    @classmethod
+    def from_dict(cls, t_dict: dict) -> Transform:
+        raise ValueError("ColumnPass is created by the plan compiler and cannot be configured.")
+
+    def steps(self) -> dict[str | int, list[ColumnTransform | CreateColumn]]:
+        """Returns the transforms to apply to each column, in order of first use."""
+        steps = {}
+        for t in self.transforms:
+            for column in t.used_columns():
+                steps.setdefault(column, []).append(t)
+        return steps
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        for column, transforms in self.steps().items():
+            series = df[column] if column in df.columns else None
+            for t in transforms:
+                if isinstance(t, CreateColumn):
+                    series = t.create_column(df)
+                elif series is None:
+                    raise KeyError(column)
+                else:
+                    series = t.transform_column(series)
+            df[column] = series
+        return df
+
+    def used_columns(self) -> set | None:
+        return set(self.steps())
+
+    def __str__(self) -> str:
+        steps = "; ".join(f"{column}: {transforms}" for column, transforms in self.steps().items())
+        return f"{super().__str__()}({steps})"
+
+class Plan:
+    """Optimized transforms produced by PlanCompiler, along with the columns to skip while reading."""
+    def __init__(self, original: list[Transform], steps: list[Transform], excluded_columns: list[str | int]):
+        self.original = original
+        self.steps = steps
+        self.excluded_columns = excluded_columns
+
+    def usecols(self) -> ExcludeColumns | None:
+        """Returns the usecols argument for reading the data, or None to read every column."""
+        if len(self.excluded_columns) == 0:
+            return None
+        return ExcludeColumns(self.excluded_columns)
+
+    def explain(self) -> str:
+        """Describe the original and optimized plans."""
+        lines = ["Original plan:"]
+        lines += [f"  {index + 1}. {t}" for index, t in enumerate(self.original)]
+        lines.append("Optimized plan:")
+        if len(self.excluded_columns) > 0:
+            lines.append(f"  0. Read (skipping columns {self.excluded_columns})")
+        lines += [f"  {index + 1}. {t}" for index, t in enumerate(self.steps)]
+        return "\n".join(lines)
+
+    def __str__(self) -> str:
+        return self.explain()
+
+class PlanCompiler:
+    """Rewrites a list of transforms into an equivalent plan which touches the data fewer times."""
+    @staticmethod
+    def compile(transforms: list[Transform]) -> Plan:
+        steps = PlanCompiler.push_down_drops(list(transforms))
+        steps, excluded_columns = PlanCompiler.drops_to_read(steps)
+        steps = PlanCompiler.fuse(steps)
+        return Plan(list(transforms), steps, excluded_columns)
+
+    @staticmethod
+    def push_down_drops(transforms: list[Transform]) -> list[Transform]:
+        """Move every DropColumns before the transforms that do not use the dropped columns."""
+        steps = []
+        for t in transforms:
+            if not isinstance(t, DropColumns):
+                steps.append(t)
+                continue
+
+            columns = list(t.columns)
+            position = len(steps)
+            while position > 0:
+                moved = PlanCompiler.drop_before(steps[position - 1], columns)
+                if moved is None:
+                    break
+                columns = moved
+                position -= 1
+
+            steps.insert(position, t if columns == t.columns else DropColumns(columns))
+        return steps
+
+    @staticmethod
+    def drop_before(previous: Transform, columns: list[str | int]) -> list[str | int] | None:
+        """
+        Returns the columns to drop if the drop is moved in front of the previous transform,
+        or None if it cannot be moved.
+        """
+        if isinstance(previous, DropColumns):
+            return columns if set(columns).isdisjoint(previous.columns) else None
+        elif isinstance(previous, RenameColumns):
+            renamed = []
+            for column in columns:
+                sources = [source for source, target in previous.columns.items() if target == column]
+                if len(sources) > 1 or (len(sources) == 0 and column in previous.columns):
+                    return None
+                renamed.append(sources[0] if len(sources) == 1 else column)
+            return renamed
+        elif isinstance(previous, ReorderColumns):
+            return None
+
+        used = previous.used_columns()
+        if used is None or not used.isdisjoint(columns):
+            return None
+        return columns
+
+    @staticmethod
+    def drops_to_read(transforms: list[Transform]) -> tuple[list[Transform], list[str | int]]:
+        """Remove the leading DropColumns transforms and return their columns to be skipped while reading."""
+        excluded_columns = []
+        while len(transforms) > 0 and isinstance(transforms[0], DropColumns):
+            excluded_columns += transforms[0].columns
+            transforms = transforms[1:]
+        return transforms, excluded_columns
+
+    @staticmethod
+    def fuse(transforms: list[Transform]) -> list[Transform]:
+        """
+        Group runs of projections into a Projection, runs of column transforms into a ColumnPass
+        and runs of conditional updates into a RuleSet.
+        """
+        steps = []
+        run: list[Transform] = []
+
+        def end_run():
+            if len(run) == 1:
+                steps.append(run[0])
+            elif len(run) > 1 and isinstance(run[0], PROJECTIONS):
+                steps.append(Projection(list(run)))
+            elif len(run) > 1 and isinstance(run[0], ConditionalUpdate):
+                steps.append(RuleSet(list(run)))
+            elif len(run) > 1:
+                steps.append(ColumnPass(list(run)))
+            run.clear()
+
+        for t in transforms:
+            if isinstance(t, PROJECTIONS):
+                if len(run) > 0 and not isinstance(run[0], PROJECTIONS):
+                    end_run()
+                run.append(t)
+            elif isinstance(t, (ColumnTransform, CreateColumn)):
+                if len(run) > 0 and not isinstance(run[0], (ColumnTransform, CreateColumn)):
+                    end_run()
+                run.append(t)
+            elif isinstance(t, ConditionalUpdate):
+                if len(run) > 0 and not isinstance(run[0], ConditionalUpdate):
+                    end_run()
+                run.append(t)
+            else:
+                end_run()
+                steps.append(t)
+        end_run()
+
+        return steps
@@ -1,89 +1,168 @@
 from datetime import datetime
 from hashlib import sha256
-from dt.io.db.interface import DatabaseInterface
-from pandas import DataFrame
-import bisect
+from typing import Callable, Iterator
+from dt.io.db.interface import DatabaseInterface, DEFAULT_BATCH_SIZE
+from dt.io.columnar import write_partitioned
+from dt.lib.money import to_cents, format_cents
+from pandas import DataFrame, Series
+import numpy as np
+import pandas as pd
 
-class TransactionList:
-    def __init__(self):
-        self.transactions: list[Transaction] = []
+# Columns every transformed data frame must provide. The amount is in currency units and
+# may be numbers or text such as "$1,234.56"; data frames read back from columnar output
+# provide "amount_cents" instead.
+COLUMNS = ["date", "description", "institution", "type", "amount"]
+
+# Columns of a batch after its hash, in the order they are hashed. Amounts are integer cents.
+BATCH_COLUMNS = ["date", "description", "institution", "type", "amount_cents"]
+
+# Optional column kept after BATCH_COLUMNS when the data frame has it. It is not hashed, so
+# categorizing a transaction differently does not make it a new transaction.
+CATEGORY = "category"
+
+def format_unique(series: Series, formatter: Callable = str) -> np.ndarray:
+    """Format every value of the series, calling the formatter only once per distinct value."""
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    formatted = np.array([formatter(value) for value in uniques], dtype=object)
+    return formatted[codes]
+
+def hash_transactions(df: DataFrame) -> np.ndarray:
+    """Compute the transaction hash of every row of BATCH_COLUMNS; identical to hashing each row with Transaction."""
+    text = format_unique(df[BATCH_COLUMNS[0]])
+    for column in BATCH_COLUMNS[1:]:
+        text = text + format_unique(df[column])
+
+    return np.array([sha256(t.encode('utf-8')).hexdigest() for t in text], dtype=object)
+
+class TransactionBatch:
+    """
+    Columnar collection of transactions, stored as a data frame with a hash column followed by
+    BATCH_COLUMNS and, when the transactions are categorized, the category.
+    """
+    def __init__(self, frame: DataFrame | None = None):
+        if frame is None:
+            frame = DataFrame(columns=["hash", *BATCH_COLUMNS])
+        self.frame = frame
 
     @classmethod
-    def from_dataframe(cls, df):
-        transaction_list = cls()
-        for _, row in df.iterrows():
-            transaction = Transaction(
-                date=row['date'],
-                description=row['description'],
-                institution=row['institution'],
-                type=row['type'],
-                amount=row['amount']
-            )
-            transaction_list.add_transaction(transaction)
-        return transaction_list
-
-    def add_transaction(self, transaction: Transaction):
-        self.transactions.append(transaction)
+    def from_dataframe(cls, df: DataFrame):
+        category = [CATEGORY] if CATEGORY in df.columns else []
+        if "amount_cents" in df.columns and "amount" not in df.columns:
+            frame = df.loc[:, BATCH_COLUMNS + category].reset_index(drop=True)
+            frame["amount_cents"] = frame["amount_cents"].astype("Int64")
+        else:
+            frame = df.loc[:, COLUMNS + category].reset_index(drop=True)
+            frame["amount"] = to_cents(frame["amount"])
+            frame = frame.rename(columns={"amount": "amount_cents"})
+        frame.insert(0, "hash", hash_transactions(frame))
+        return cls(frame)
 
     def remove_transaction(self, id: str):
-        self.transactions = [t for t in self.transactions if t.hash != id]
+        self.frame = self.frame[self.frame["hash"] != id].reset_index(drop=True)
 
-    def write_to_db(self, db: DatabaseInterface, verbose: bool = False):
-        transactions_added = 0
-        transactions_skipped = 0
-
-        hashes_in_db = set(db.transactions_get_hashes())
-        for transaction in self.transactions:
-            if transaction.hash not in hashes_in_db:
-                db.connection.execute(
-                    """
-                    INSERT INTO transactions (hash, date, description, institution, type, amount)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                    """,
-                    (transaction.hash, transaction.date.isoformat(), transaction.description, transaction.institution, transaction.type, transaction.amount)
-                )
-                db.connection.commit()
-                transactions_added += 1
-            else:
-                transactions_skipped += 1
+    def write_to_db(self, db: DatabaseInterface, verbose: bool = False, batch_size: int = DEFAULT_BATCH_SIZE) -> tuple[int, int]:
+        """
+        Insert the transactions into the database in a single database transaction,
+        batch_size rows per executemany call. Transactions whose hash is already stored
+        are skipped by the database. Returns the added and skipped counts.
+        """
+        with db.connection:
+            transactions_added, transactions_skipped = self.insert_into_db(db, batch_size)
 
         if verbose:
             print(f"Transactions added: {transactions_added}")
             print(f"Transactions skipped (duplicates): {transactions_skipped}")
 
+        return transactions_added, transactions_skipped
+
+    def insert_into_db(self, db: DatabaseInterface, batch_size: int = DEFAULT_BATCH_SIZE, on_batch: Callable[[int, int], None] | None = None) -> tuple[int, int]:
+        """
+        Insert the transactions batch_size rows per executemany call without committing, so
+        the caller controls the transaction. on_batch is called with the added and skipped
+        counts of every batch once it is inserted; an exception raised by it stops the insert.
+        Returns the added and skipped counts.
+        """
+        if batch_size < 1:
+            raise ValueError(f"Invalid batch size {batch_size}; must be a positive integer.")
+
+        transactions_added = 0
+        for start in range(0, len(self.frame), batch_size):
+            batch = self.frame.iloc[start:start + batch_size]
+            added = db.transactions_insert_many(zip(
+                batch["hash"],
+                format_unique(batch["date"], lambda date: date.isoformat()),
+                batch["description"].tolist(),
+                batch["institution"].tolist(),
+                batch["type"].tolist(),
+                batch["amount_cents"].to_numpy(dtype=object, na_value=None).tolist(),
+                batch[CATEGORY].astype(object).where(batch[CATEGORY].notna(), None).tolist() if CATEGORY in batch.columns else [None] * len(batch)
+            ))
+            transactions_added += added
+            if on_batch is not None:
+                on_batch(added, len(batch) - added)
+
+        return transactions_added, len(self.frame) - transactions_added
+
     def write_to_csv(self, file_path: str, append: bool = False, verbose: bool = False):
-        df = DataFrame([{
-            'id': t.hash,
-            'date': t.date,
-            'description': t.description,
-            'institution': t.institution,
-            'type': t.type,
-            'amount': t.amount
-        } for t in self.transactions])
+        df = self.frame.rename(columns={'hash': 'id', 'amount_cents': 'amount'})
+        df["amount"] = format_cents(df["amount"])
 
         df.to_csv(
             file_path,
             index=False,
-            float_format="%.2f",
             date_format="%Y-%m-%d",
             header=append is False,
             mode="a" if append is True else "w"
         )
 
         if verbose:
-            print(f"Wrote {len(self.transactions)} transactions to {file_path}")
+            print(f"Wrote {len(self)} transactions to {file_path}")
+
+    def write_to_columnar(self, directory: str, format: str = "parquet", append: bool = False, verbose: bool = False):
+        """
+        Write the transactions with their types (dates, integer cents) preserved as Parquet, Arrow
+        or Feather files partitioned by year and month. See dt.io.columnar.write_partitioned.
+        """
+        files = write_partitioned(self.frame.rename(columns={'hash': 'id'}), directory, format, append=append)
+
+        if verbose:
+            print(f"Wrote {len(self)} transactions to {files} {format} files in {directory}")
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def __getitem__(self, index: int) -> Transaction:
+        row = self.frame.iloc[index]
+        return Transaction(*row[BATCH_COLUMNS], hash=row["hash"], category=row.get(CATEGORY))
+
+    def __iter__(self) -> Iterator[Transaction]:
+        for hash, *values in self.frame.itertuples(index=False, name=None):
+            yield Transaction(*values[:len(BATCH_COLUMNS)], hash=hash, category=values[len(BATCH_COLUMNS)] if len(values) > len(BATCH_COLUMNS) else None)
 
     def __str__(self) -> str:
-        return "\n".join(str(t) for t in self.transactions)
+        return "\n".join(str(t) for t in self)
 
 class Transaction:
-    def __init__(self, date: datetime, description: str, institution: str, type: str, amount: float):
-        self.hash = sha256(f"{date}{description}{institution}{type}{amount}".encode('utf-8')).hexdigest()
+    """
+    A single transaction with its amount in integer cents. Batches hand these out as
+    lightweight views of one of their rows. The category is not part of the hash.
+    """
+    __slots__ = ("hash", "date", "description", "institution", "type", "amount_cents", "category")
+
+    def __init__(self, date: datetime, description: str, institution: str, type: str, amount_cents: int, hash: str | None = None, category: str | None = None):
+        if hash is None:
+            hash = sha256(f"{date}{description}{institution}{type}{amount_cents}".encode('utf-8')).hexdigest()
+        self.hash = hash
         self.date = date
         self.description = description
         self.institution = institution
         self.type = type
-        self.amount = amount
-    
+        self.amount_cents = amount_cents
+        self.category = category
+
+    @property
+    def amount(self) -> float:
+        return self.amount_cents / 100
+
     def __str__(self) -> str:
-        return f"Transaction(id={self.hash}, date={self.date}, description={self.description}, institution={self.institution}, type={self.type}, amount={self.amount})"
+        return f"Transaction(id={self.hash}, date={self.date}, description={self.description}, institution={self.institution}, type={self.type}, amount_cents={self.amount_cents}, category={self.category})"
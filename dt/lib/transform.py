@@ -1,11 +1,11 @@
+import numpy as np
 import pandas as pd
 from enum import Enum
 from abc import ABC, abstractmethod
 from datetime import datetime as dt
-from .filter import Filter, FilterFactory
-from .assignment import Assignment, AssignmentFactory
-from functools import reduce
-import operator
+from .filter import Filter, FilterFactory, And, as_mask, filters_used_columns
+from .assignment import Assignment, AssignmentFactory, set_values
+from typing import Iterable, Iterator
 
 class TransformType(Enum):
     READ_DATE = "read_date"
@@ -14,11 +14,18 @@ class TransformType(Enum):
     REORDER_COLUMNS = "reorder_columns"
     CREATE_COLUMN = "create_column"
     CONDITIONAL_UPDATE = "conditional_update"
+    RULE_SET = "rule_set"
     DATE = "date"
     TRIM_STRINGS = "trim_strings"
     ABSOLUTE_VALUE = "absolute_value"
 
+class TransformError(ValueError):
+    def __init__(self, transform: str, message: str):
+        super().__init__(f"{transform} transform error {message}")
+
 class Transform(ABC):
+    # Transforms compute each row from that row alone, so applying them to consecutive
+    # chunks or to each file gives the same result as applying them to all of the data.
     @abstractmethod
     def transform(self, df: pd.DataFrame) -> pd.DataFrame:
         """Apply the transform to the given data frame and return the transformed data frame."""
@@ -29,12 +36,34 @@ class Transform(ABC):
     def from_dict(cls, t_dict: dict) -> Transform:
         pass
 
+    def used_columns(self) -> set | None:
+        """Returns the columns the transform reads or writes, or None if it may use any column."""
+        return None
+
     def __str__(self) -> str:
         return f"{self.__class__.__name__}"
 
     def __repr__(self) -> str:
         return self.__str__()
 
+class ColumnTransform(Transform):
+    """Transform which replaces each of its columns with a function of that column alone."""
+    def __init__(self, columns: list[str | int]):
+        self.columns = columns
+
+    @abstractmethod
+    def transform_column(self, column: pd.Series) -> pd.Series:
+        """Apply the transform to a single column and return the transformed column."""
+        pass
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        for col in self.columns:
+            df[col] = self.transform_column(df[col])
+        return df
+
+    def used_columns(self) -> set | None:
+        return set(self.columns)
+
 class Transformer:
     def __init__(self, verbose = False):
         self.transforms: list[Transform] = []
@@ -57,10 +86,22 @@ class Transformer:
             df = t.transform(df)
         return df
 
+    def transform_chunks(self, chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """Apply all transforms to each chunk as it is read and yield the transformed chunks."""
+        if self.verbose:
+            for t in self.transforms:
+                print(t)
+
+        for chunk in chunks:
+            for t in self.transforms:
+                chunk = t.transform(chunk)
+            yield chunk
+
 class ConditionalUpdate(Transform):
     def __init__(self, filter: list[Filter], assignments: list[Assignment]):
         self.filter = filter
         self.assignments = assignments
+        self.condition = And(filter)
 
     @classmethod
     def from_dict(cls, t_dict: dict) -> Transform:
@@ -69,23 +110,162 @@ class ConditionalUpdate(Transform):
         return cls(filters, assignments)
 
     def transform(self, df: pd.DataFrame) -> pd.DataFrame:
-        if len(self.filter) == 0:
-            condition = pd.Series([True] * len(df))
-        else:
-            condition = reduce(operator.and_, (f.apply(df) for f in self.filter))
+        condition = self.condition.apply(df)
 
         for assignment in self.assignments:
             assignment.assign(df, condition)
 
         return df
 
+    def used_columns(self) -> set | None:
+        columns = set()
+        for item in [*self.filter, *self.assignments]:
+            item_columns = item.used_columns()
+            if item_columns is None:
+                return None
+            columns |= item_columns
+        return columns
+
+    def read_columns(self) -> set | None:
+        """Returns the columns read by the filters and assignments, or None if any column may be read."""
+        columns = filters_used_columns(self.filter)
+        if columns is None:
+            return None
+        for assignment in self.assignments:
+            columns |= assignment.read_columns()
+        return columns
+
+    def written_columns(self) -> set:
+        """Returns the columns written by the assignments."""
+        return {assignment.column for assignment in self.assignments}
+
     def __str__(self) -> str:
         return f"{super().__str__()}(filter={self.filter}, assignments={self.assignments})"
 
-class TrimStrings(Transform):
-    def __init__(self, columns: list[str | int]):
-        self.columns = columns
+class RuleMatch(Enum):
+    FIRST_MATCH = "first_match"
+    LAST_MATCH = "last_match"
+
+class RuleSet(Transform):
+    """
+    Ordered conditional update rules evaluated together. Filters shared between rules are
+    evaluated once and each assigned column is written once with the value of the first or
+    last matching rule. With last_match the result is the same as applying the rules as
+    consecutive conditional updates.
+    """
+    def __init__(self, rules: list[ConditionalUpdate], match: RuleMatch = RuleMatch.LAST_MATCH):
+        self.rules = rules
+        self.match = match
+        self.segments = RuleSet.segment(rules)
+
+    @classmethod
+    def from_dict(cls, t_dict: dict) -> Transform:
+        rules = t_dict.get("rules")
+        match = t_dict.get("match", RuleMatch.LAST_MATCH.value)
+        if isinstance(rules, list) and all(isinstance(rule, dict) for rule in rules):
+            return cls([ConditionalUpdate.from_dict(rule) for rule in rules], RuleMatch(match))
+        else:
+            raise ValueError("Invalid 'rules' property for RuleSet; must be a list of rules with 'filters' and 'assignments'.")
+
+    @staticmethod
+    def segment(rules: list[ConditionalUpdate]) -> list[list[ConditionalUpdate]]:
+        """
+        Split the rules into runs which can be evaluated together: a rule starts a new run
+        when it reads a column assigned by an earlier rule of the run. Rules which read a
+        column they assign themselves are applied on their own.
+        """
+        segments = []
+        current = []
+        written = set()
+        for rule in rules:
+            reads = rule.read_columns()
+            if len(current) > 0 and (reads is None or not reads.isdisjoint(written | rule.written_columns())):
+                segments.append(current)
+                current = []
+                written = set()
+            current.append(rule)
+            written |= rule.written_columns()
+            if reads is not None and not reads.isdisjoint(rule.written_columns()):
+                # Columns are written in assignment order, so later assignments see earlier ones.
+                segments.append(current)
+                current = []
+                written = set()
+        if len(current) > 0:
+            segments.append(current)
+        return segments
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        # Rows of each column already assigned by an earlier segment, used for first_match.
+        claimed: dict[str | int, np.ndarray] = {}
+        for segment in self.segments:
+            self.transform_segment(df, segment, claimed)
+        return df
+
+    def transform_segment(self, df: pd.DataFrame, rules: list[ConditionalUpdate], claimed: dict[str | int, np.ndarray]):
+        masks: dict[str, np.ndarray] = {}
+        # Position in choices of the assignment giving each row its value, per column.
+        winners: dict[str | int, np.ndarray] = {}
+        choices = []
+        # Assignments of each column in rule order.
+        assigned: dict[str | int, list[Assignment]] = {}
+
+        for rule in rules:
+            rule_mask = np.ones(len(df), dtype=bool)
+            for f in sorted(rule.filter, key=lambda f: f.cost):
+                if not rule_mask.any():
+                    break
+                key = str(f)
+                if key not in masks:
+                    masks[key] = as_mask(f.apply(df))
+                rule_mask &= masks[key]
+
+            for assignment in rule.assignments:
+                column = assignment.column
+                if column not in winners:
+                    winners[column] = np.full(len(df), -1)
+                    claimed.setdefault(column, np.zeros(len(df), dtype=bool))
+
+                rows = rule_mask
+                applies = assignment.applies(df)
+                if applies is not None:
+                    rows = rows & applies
+                if self.match == RuleMatch.FIRST_MATCH:
+                    rows = rows & ~claimed[column]
+                    claimed[column] |= rows
+
+                choices.append(assignment)
+                assigned.setdefault(column, []).append(assignment)
+                winners[column][rows] = len(choices) - 1
+
+        for column, winner in winners.items():
+            rows = winner >= 0
+            values = np.empty(rows.sum(), dtype=object)
+            positions = np.flatnonzero(rows)
+            for choice in np.unique(winner[rows]):
+                selected = winner[rows] == choice
+                values[selected] = choices[choice].values(df, positions[selected])
+
+            if len(values) > 0:
+                set_values(df, rows, column, pd.Series(values, index=df.index[rows]).infer_objects())
+            else:
+                # No row matched: assign to no rows as consecutive conditional updates do, which
+                # creates a missing column (NaN) with the type of the assigned values.
+                for assignment in assigned[column]:
+                    assignment.assign(df, pd.Series(False, index=df.index))
+
+    def used_columns(self) -> set | None:
+        columns = set()
+        for rule in self.rules:
+            rule_columns = rule.used_columns()
+            if rule_columns is None:
+                return None
+            columns |= rule_columns
+        return columns
+
+    def __str__(self) -> str:
+        return f"{super().__str__()}(match={self.match.value}, rules={self.rules})"
 
+class TrimStrings(ColumnTransform):
     @classmethod
     def from_dict(cls, t_dict: dict) -> Transform:
         columns = t_dict.get("columns")
@@ -94,18 +274,26 @@ class TrimStrings(Transform):
         else:
             raise ValueError("Invalid 'columns' property for TrimStrings; must be a list.")
 
-    def transform(self, df: pd.DataFrame):
-        for col in self.columns:
-            df[col] = df[col].transform(lambda s: s.strip() if isinstance(s, str) else s)
-        
-        return df
+    def transform_column(self, column: pd.Series) -> pd.Series:
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            return self.transform_column(column.astype(column.cat.categories.dtype)).astype("category")
+        elif isinstance(column.dtype, pd.StringDtype):
+            return column.str.strip()
+        elif column.dtype != object:
+            # Numbers, dates and booleans have nothing to trim.
+            return column
+        elif pd.api.types.infer_dtype(column, skipna=True) == "string":
+            return column.astype("str").str.strip()
+        else:
+            # Columns mixing strings with other values keep the other values as they are.
+            return column.transform(lambda s: s.strip() if isinstance(s, str) else s)
 
     def __str__(self) -> str:
         return f"{super().__str__()}(columns={self.columns})"
 
-class ReadDate(Transform):
+class ReadDate(ColumnTransform):
     def __init__(self, columns: list[str | int], date_format: str):
-        self.columns = columns
+        super().__init__(columns)
         self.date_format = date_format
 
     @classmethod
@@ -117,10 +305,40 @@ class ReadDate(Transform):
         else:
             raise ValueError("Invalid 'columns' or 'date_format' property for ReadDate; must be a list and a string respectively.")
 
-    def transform(self, df):
-        for col in self.columns:
-            df[col] = df[col].transform(lambda date: dt.strptime(date, self.date_format))
-        return df
+    def transform_column(self, column: pd.Series) -> pd.Series:
+        """
+        Parse the column with the date format. Statements repeat the same dates many times
+        so each distinct value is parsed only once. Missing values become NaT.
+        Raises a TransformError listing every row that could not be parsed.
+        """
+        if pd.api.types.is_datetime64_any_dtype(column):
+            return column
+
+        codes, uniques = pd.factorize(column)
+        parsed = self.parse(pd.Index(uniques))
+
+        # Missing values have code -1, which selects the appended False.
+        failed = np.append(pd.isna(parsed), False)[codes]
+        if failed.any():
+            rows = list(column.index[failed])
+            shown = ", ".join(str(row) for row in rows[:20]) + (", ..." if len(rows) > 20 else "")
+            examples = ", ".join(repr(value) for value in pd.unique(column[failed])[:3])
+            raise TransformError(self.__class__.__name__, f"{len(rows)} values in column {column.name} do not match date format {self.date_format} (e.g. {examples}) at rows: {shown}")
+
+        return pd.Series(parsed.take(codes, allow_fill=True, fill_value=pd.NaT), index=column.index, name=column.name)
+
+    def parse(self, values: pd.Index) -> pd.DatetimeIndex:
+        """Parse the values with the date format, using NaT for values which do not match."""
+        try:
+            return pd.DatetimeIndex(pd.to_datetime(values, format=self.date_format, errors="coerce"))
+        except ValueError:
+            # Formats the vectorized parser does not support fall back to strptime.
+            def strptime(value):
+                try:
+                    return dt.strptime(value, self.date_format)
+                except (TypeError, ValueError):
+                    return pd.NaT
+            return pd.DatetimeIndex([strptime(value) for value in values])
 
     def __str__(self) -> str:
         return f"{super().__str__()}(columns={self.columns}, date_format={self.date_format})"
@@ -164,6 +382,13 @@ class CreateColumn(Transform):
     def transform(self, df: pd.DataFrame):
         df[self.column] = self.default
         return df
+
+    def create_column(self, df: pd.DataFrame) -> pd.Series:
+        """Returns the new column without adding it to the data frame."""
+        return pd.Series(self.default, index=df.index)
+
+    def used_columns(self) -> set | None:
+        return {self.column}
     
     def __str__(self):
         return f"{super().__str__()}(column={self.column}, default_value={self.default})"
@@ -204,10 +429,7 @@ class ReorderColumns(Transform):
     def __str__(self):
         return f"{super().__str__()}(columns={self.columns})"
     
-class AbsoluteValue(Transform):
-    def __init__(self, columns: list[int | float]):
-        self.columns = columns
-
+class AbsoluteValue(ColumnTransform):
     @classmethod
     def from_dict(cls, t_dict: dict) -> Transform:
         columns = t_dict.get("columns")
@@ -216,10 +438,8 @@ class AbsoluteValue(Transform):
         else:
             raise ValueError("Invalid 'columns' property for AbsoluteValue; must be a list.")
 
-    def transform(self, df: pd.DataFrame):
-        for col in self.columns:
-            df[col] = abs(df[col])
-        return df
+    def transform_column(self, column: pd.Series) -> pd.Series:
+        return abs(column)
 
     def __str__(self):
         return f"{super().__str__()}(columns={self.columns})"
@@ -236,6 +456,8 @@ class TransformFactory:
                 return CreateColumn.from_dict(t_dict)
             case TransformType.CONDITIONAL_UPDATE:
                 return ConditionalUpdate.from_dict(t_dict)
+            case TransformType.RULE_SET:
+                return RuleSet.from_dict(t_dict)
             case TransformType.ABSOLUTE_VALUE:
                 return AbsoluteValue.from_dict(t_dict)
             case TransformType.DATE:
@@ -1,9 +1,31 @@
 #!.dt-venv/bin/python3
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
 import unittest
+from unittest import mock
+import importlib.util
 import pandas as pd
 import dt.lib.transform as transform
 import dt.io.reader as r
 import dt.lib.filter as filter_lib
+import dt.lib.assignment as assignment_lib
+import dt.lib.transaction as transaction_lib
+import dt.lib.plan as plan_lib
+from argparse import Namespace
+from dt.lib.application import TransformApplication, WatchApplication, QueryApplication, ReportApplication
+from dt.io.db.interface import DatabaseInterface
+from dt.io.manifest import ImportManifest
+from dt.io.schema import Schema, parse_decimal
+from dt.lib.money import parse_cents, to_cents, format_cents
+from dt.lib.config import Config
+from dt.lib.job import ImportJob, ImportCancelled
+from dt.io.db.migrations import MIGRATIONS
+from dt.io.db.query import TransactionQuery, AggregateQuery, parse_amount
 
 class TestTransforms(unittest.TestCase):
     def test_TrimStrings(self):
@@ -20,6 +42,16 @@ class TestTransforms(unittest.TestCase):
 
         self.assertTrue(t_df.equals(expected_df))
 
+    def test_TrimStringsMixedColumn(self):
+        df = pd.DataFrame({
+            "value": pd.Series([" a ", 1, None, "b "], dtype=object),
+        })
+
+        t_df = transform.TrimStrings(columns=["value"]).transform(df)
+
+        self.assertEqual(list(t_df["value"][[0, 1, 3]]), ["a", 1, "b"])
+        self.assertIsNone(t_df["value"][2])
+
     def test_RenameColumns(self):
         df = pd.DataFrame({
             "old_name": [1, 2, 3],
@@ -34,6 +66,87 @@ class TestTransforms(unittest.TestCase):
 
         self.assertTrue(t_df.equals(expected_df))
 
+    def test_ConditionalUpdateChunk(self):
+        # Chunks after the first do not start at index 0.
+        df = pd.DataFrame({
+            "category": ["", "", ""],
+        }, index=[10, 11, 12])
+
+        t = transform.ConditionalUpdate([], [assignment_lib.StringAssignment("category", "misc")])
+        t_df = t.transform(df)
+
+        self.assertEqual(list(t_df["category"]), ["misc", "misc", "misc"])
+
+    def test_RuleSetMatchesConditionalUpdates(self):
+        df = pd.DataFrame({
+            "description": ["COFFEE shop", "RENT", "Coffee", "Salary", None],
+            "amount": [-4.5, -1200.0, -3.0, 2000.0, 5.0]
+        })
+        rules = [
+            transform.ConditionalUpdate([filter_lib.Regex("description", "(?i)coffee")], [assignment_lib.StringAssignment("category", "food")]),
+            transform.ConditionalUpdate([filter_lib.GreaterThan("amount", 0)], [assignment_lib.StringAssignment("category", "income")]),
+            transform.ConditionalUpdate([filter_lib.LessThan("amount", -1000)], [assignment_lib.ColumnAssignment("note", "description")]),
+            transform.ConditionalUpdate([filter_lib.Regex("description", "(?i)coffee")], [assignment_lib.FloatAssignment("amount", 1.5)]),
+            # Reads a column written by an earlier rule, so it starts a new segment.
+            transform.ConditionalUpdate([filter_lib.EqualTo("amount", 1.5)], [assignment_lib.StringAssignment("category", "cafe")])
+        ]
+        expected = df.copy()
+        for rule in rules:
+            expected = rule.transform(expected)
+
+        rule_set = transform.RuleSet(rules)
+        t_df = rule_set.transform(df.copy())
+
+        self.assertEqual(len(rule_set.segments), 2)
+        self.assertTrue(t_df.equals(expected))
+
+    def test_RuleSetFirstMatch(self):
+        df = pd.DataFrame({
+            "amount": [-5.0, 50.0, 500.0]
+        })
+        rule_set = transform.TransformFactory.from_dict({
+            "type": "rule_set",
+            "match": "first_match",
+            "rules": [
+                {"filters": [{"type": "greater_than", "column": "amount", "threshold": 100}], "assignments": [{"type": "string", "column": "size", "value": "large"}]},
+                {"filters": [{"type": "greater_than", "column": "amount", "threshold": 0}], "assignments": [{"type": "string", "column": "size", "value": "small"}]}
+            ]
+        })
+        t_df = rule_set.transform(df)
+
+        self.assertTrue(pd.isna(t_df["size"][0]))
+        self.assertEqual(list(t_df["size"][1:]), ["small", "large"])
+
+    def test_ReadDate(self):
+        df = pd.DataFrame({
+            "date": ["January 02, 2025", "March 15, 2024", None],
+        })
+
+        t = transform.ReadDate(columns=["date"], date_format="%B %d, %Y")
+        t_df = t.transform(df)
+
+        self.assertEqual(list(t_df["date"][:2]), [datetime(2025, 1, 2), datetime(2024, 3, 15)])
+        self.assertTrue(pd.isna(t_df["date"][2]))
+
+    def test_ReadDateReportsFailedRows(self):
+        df = pd.DataFrame({
+            "date": ["01/02/2025", "2025-01-03", "01/04/2025", "13/45/2025"],
+        })
+
+        t = transform.ReadDate(columns=["date"], date_format="%m/%d/%Y")
+
+        with self.assertRaisesRegex(transform.TransformError, "2 values in column date .* at rows: 1, 3"):
+            t.transform(df)
+
+    def test_ReadDateMatchesStrptime(self):
+        dates = pd.Series([f"{month:02d}/{day:02d}/2025" for month in range(1, 13) for day in range(1, 29)], name="date")
+        t = transform.ReadDate(columns=["date"], date_format="%m/%d/%Y")
+
+        expected = dates.transform(lambda date: datetime.strptime(date, "%m/%d/%Y"))
+        actual = t.transform_column(dates)
+
+        self.assertTrue((actual == expected).all())
+
 class TestFilters(unittest.TestCase):
     def test_from_dict(self):
         not_null_dict = {
@@ -178,6 +291,173 @@ class TestFilters(unittest.TestCase):
 
         self.assertTrue(filteredSeries.equals(expectedSeries))
 
+class TestPlan(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame({
+            "Date": ["01/02/2025", "01/03/2025"],
+            "Description": [" Coffee ", "Rent "],
+            "Amount": [-4.5, -1200.0],
+            "Extra": ["x", "y"]
+        })
+        self.transforms = [
+            transform.RenameColumns({"Date": "date", "Description": "description", "Amount": "amount", "Extra": "extra"}),
+            transform.TrimStrings(["description"]),
+            transform.DropColumns(["extra"]),
+            transform.ReadDate(["date"], "%m/%d/%Y"),
+            transform.CreateColumn("institution", "Bank"),
+            transform.AbsoluteValue(["amount"]),
+            transform.RenameColumns({"amount": "value"}),
+            transform.ReorderColumns(["date", "description", "institution", "value", "category"])
+        ]
+
+    def test_CompiledPlanMatchesTransforms(self):
+        expected = self.df.copy()
+        for t in self.transforms:
+            expected = t.transform(expected)
+
+        plan = plan_lib.PlanCompiler.compile(self.transforms)
+        actual = self.df.loc[:, [column for column in self.df.columns if plan.usecols()(column)]]
+        for t in plan.steps:
+            actual = t.transform(actual)
+
+        self.assertEqual(plan.excluded_columns, ["Extra"])
+        self.assertEqual(len(plan.steps), 3)
+        self.assertTrue(actual.equals(expected))
+
+    def test_Explain(self):
+        explanation = plan_lib.PlanCompiler.compile(self.transforms).explain()
+
+        self.assertIn("Original plan:", explanation)
+        self.assertIn("Read (skipping columns ['Extra'])", explanation)
+        self.assertIn("Projection(", explanation)
+        self.assertIn("ColumnPass(", explanation)
+
+    def test_ConditionalUpdatesFusedIntoRuleSet(self):
+        rules = [
+            transform.ConditionalUpdate([filter_lib.GreaterThan("amount", 0)], [assignment_lib.StringAssignment("category", "income")]),
+            transform.ConditionalUpdate([filter_lib.LessThan("amount", 0)], [assignment_lib.StringAssignment("category", "expense")])
+        ]
+        plan = plan_lib.PlanCompiler.compile([transform.TrimStrings(["description"]), *rules])
+
+        self.assertIsInstance(plan.steps[1], transform.RuleSet)
+        self.assertEqual(plan.steps[1].rules, rules)
+
+    def test_FusedRulesWithoutMatchesCreateColumn(self):
+        df = pd.DataFrame({
+            "description": ["Rent", "Salary"],
+            "amount": [-1200.0, 2000.0]
+        })
+        rules = [
+            transform.ConditionalUpdate([filter_lib.Regex("description", "(?i)coffee")], [assignment_lib.StringAssignment("category", "food")]),
+            transform.ConditionalUpdate([filter_lib.LessThan("amount", -5000)], [assignment_lib.FloatAssignment("fee", 1.5)]),
+            transform.ConditionalUpdate([], [assignment_lib.KeywordAssignment("merchant", "description", {"uber": "Uber"})])
+        ]
+        expected = df.copy()
+        for rule in rules:
+            expected = rule.transform(expected)
+        plan = plan_lib.PlanCompiler.compile(rules)
+        fused = df.copy()
+        for step in plan.steps:
+            fused = step.transform(fused)
+
+        self.assertIsInstance(plan.steps[0], transform.RuleSet)
+        self.assertEqual(list(fused.columns), ["description", "amount", "category", "fee", "merchant"])
+        for column in expected.columns:
+            self.assertEqual(fused[column].dtype, expected[column].dtype, column)
+            self.assertTrue(fused[column].equals(expected[column]), column)
+
+class TestKeywords(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame({
+            "description": ["STARBUCKS #12", "Uber Eats order", "UBER trip", None, "Rent", "shell oil"],
+            "category": ["", "", "", "", "", ""]
+        })
+
+    def test_KeywordsFilter(self):
+        f = filter_lib.FilterFactory.from_dict({"type": "keywords", "column": "description", "keywords": ["starbucks", "uber", "shell"]})
+
+        self.assertEqual(list(f.apply(self.df)), [True, True, True, False, False, True])
+
+    def test_KeywordsCaseSensitive(self):
+        f = filter_lib.Keywords("description", ["UBER", "shell"], case_sensitive=True)
+
+        self.assertEqual(list(f.apply(self.df)), [False, False, True, False, False, True])
+
+    def test_KeywordAssignmentFirstListedKeywordWins(self):
+        a = assignment_lib.AssignmentFactory.from_dict({
+            "type": "keyword",
+            "column": "category",
+            "value": "description",
+            "keywords": {"uber eats": "food", "uber": "travel", "starbucks": "coffee"}
+        })
+        a.assign(self.df)
+
+        self.assertEqual(list(self.df["category"]), ["coffee", "food", "travel", "", "", ""])
+
+    def test_KeywordRulesInRuleSet(self):
+        rules = [
+            transform.ConditionalUpdate([], [assignment_lib.KeywordAssignment("category", "description", {"uber": "travel", "shell": "fuel"})]),
+            transform.ConditionalUpdate([filter_lib.Keywords("description", ["eats", "starbucks"])], [assignment_lib.StringAssignment("category", "food")])
+        ]
+        expected = self.df.copy()
+        for rule in rules:
+            expected = rule.transform(expected)
+
+        self.assertTrue(transform.RuleSet(rules).transform(self.df.copy()).equals(expected))
+
+class RowCounter(filter_lib.Filter):
+    """Filter matching every row which records how many rows it was evaluated on."""
+    cost = 100
+
+    def __init__(self):
+        self.rows = []
+
+    @classmethod
+    def from_dict(cls, f_dict: dict):
+        return cls()
+
+    def apply(self, df: pd.DataFrame) -> pd.Series:
+        self.rows.append(len(df))
+        return pd.Series(True, index=df.index)
+
+class TestFilterExpressions(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame({
+            "description": ["AMAZON 1", "Coffee", "AMAZON 2", None, "Rent"],
+            "amount": [10, 5, 200, 30, 1200]
+        }, index=[10, 11, 12, 13, 14])
+
+    def test_from_dict(self):
+        f = filter_lib.FilterFactory.from_dict({
+            "type": "or",
+            "filters": [
+                {"type": "and", "filters": [
+                    {"type": "regex", "column": "description", "pattern": "AMAZON"},
+                    {"type": "not", "filter": {"type": "greater_than", "column": "amount", "threshold": 100}}
+                ]},
+                {"type": "greater_than_equal_to", "column": "amount", "threshold": 1000}
+            ]
+        })
+
+        self.assertIsInstance(f, filter_lib.Or)
+        self.assertEqual(list(f.apply(self.df)), [True, False, False, False, True])
+        self.assertEqual(list(f.apply(self.df).index), list(self.df.index))
+
+    def test_ShortCircuit(self):
+        counter = RowCounter()
+        f = filter_lib.And([counter, filter_lib.GreaterThan("amount", 100)])
+
+        self.assertEqual(list(f.apply(self.df)), [False, False, True, False, True])
+        # The comparison runs first and leaves two of the five rows for the expensive filter.
+        self.assertEqual(counter.rows, [2])
+
+    def test_OrSkipsMatchedRows(self):
+        counter = RowCounter()
+        f = filter_lib.Or([counter, filter_lib.NotNull("description")])
+
+        self.assertEqual(list(f.apply(self.df)), [True] * 5)
+        self.assertEqual(counter.rows, [1])
+
 class TestCSVReader(unittest.TestCase):
     def test_ReadSingleCSV(self):
         df = r.DataReader(["tests/data/test.csv"], True, False).read()
@@ -199,9 +479,735 @@ class TestCSVReader(unittest.TestCase):
 
         self.assertTrue(df.equals(expected_df))
 
+    def test_ReadChunks(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, "chunks.csv")
+            pd.DataFrame({
+                "name": ["t1", "t2", "t3", "t4", "t5"],
+                "amount": [1.0, 2.0, 3.0, 4.0, 5.0]
+            }).to_csv(file_path, index=False)
+
+            reader = r.DataReader([file_path], True, False, chunksize=2)
+            chunks = list(reader.read_chunks())
+
+            self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+            self.assertTrue(pd.concat(chunks).equals(reader.read()))
+
+    def test_ReadParallel(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for month in range(1, 5):
+                pd.DataFrame({
+                    "name": [f"t{month}a", f"t{month}b"],
+                    "amount": [float(month), float(month * 10)]
+                }).to_csv(os.path.join(directory, f"2025-{month:02d}.csv"), index=False)
+
+            serial = r.DataReader([directory], True, False).read()
+            threaded = r.DataReader([directory], True, False, jobs=2).read()
+
+            rename = transform.RenameColumns(columns={"name": "description"})
+            processes = r.DataReader([directory], True, False, jobs=2).read(rename.transform)
+
+            self.assertEqual(list(serial["name"]), ["t1a", "t1b", "t2a", "t2b", "t3a", "t3b", "t4a", "t4b"])
+            self.assertTrue(threaded.equals(serial))
+            self.assertTrue(processes.equals(rename.transform(serial)))
+
+class TestSchema(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file = os.path.join(self.directory.name, "statement.csv")
+        with open(self.file, "w") as file:
+            file.write("Date,Description,Institution,Amount\n")
+            for day in range(1, 21):
+                file.write(f'01/{day:02d}/2025,Shop {day},Bank,"${day},000.50"\n')
+            file.write("01/21/2025,Refund,Bank,(12.00)\n")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_ParseDecimal(self):
+        series = pd.Series(["$1,234.56", "(12.00)", "-4.5", None, ""], name="amount")
+
+        parsed = parse_decimal(series)
+
+        self.assertEqual(list(parsed[:3]), [1234.56, -12.0, -4.5])
+        self.assertTrue(parsed[3:].isna().all())
+        with self.assertRaises(ValueError):
+            parse_decimal(pd.Series(["12.00", "twelve"]))
+
+    def test_ParseCents(self):
+        series = pd.Series(["$1,234.56", "(12.00)", "-4.5", "0.005", ".5", "$1,234.56", None, ""], name="amount")
+
+        cents = parse_cents(series)
+
+        self.assertEqual(list(cents[:6]), [123456, -1200, -450, 1, 50, 123456])
+        self.assertTrue(cents[6:].isna().all())
+        self.assertEqual(list(format_cents(cents[:5])), ["1234.56", "-12.00", "-4.50", "0.01", "0.50"])
+        with self.assertRaises(ValueError):
+            parse_cents(pd.Series(["12.00", "1.2.3"]))
+
+    def test_ParseCentsSigns(self):
+        cents = parse_cents(pd.Series(["12.00-", "-$4.50", "$-4.50", "+3", "1234567.891"]))
+
+        self.assertEqual(list(cents), [-1200, -450, -450, 300, 123456789])
+
+    def test_ParseCentsRejectsText(self):
+        for text in ["abc12", "1e3", "10-20", "12 DR", "1.234,56", "12,34", "(12", "-(12)", "-12-", "."]:
+            with self.subTest(text=text), self.assertRaisesRegex(ValueError, "not amounts"):
+                parse_cents(pd.Series(["12.00", text], name="amount"))
+
+    def test_FloatsRoundedAsText(self):
+        amounts = [0.125, 1.005, -0.125, -1.005, 2.675, 0.015, 1234.56]
+
+        self.assertEqual(list(to_cents(pd.Series(amounts))), list(parse_cents(pd.Series([repr(amount) for amount in amounts]))))
+        self.assertEqual(list(to_cents(pd.Series(amounts))), [13, 101, -13, -101, 268, 2, 123456])
+
+    def test_DeclaredAndInferredTypes(self):
+        schema = Schema.from_dict({
+            "columns": {"Date": {"type": "date", "format": "%m/%d/%Y"}, "Amount": "decimal"},
+            "infer": True
+        })
+
+        df = r.DataReader([self.file], schema=schema).read()
+
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(df["Date"]))
+        self.assertIsInstance(df["Institution"].dtype, pd.CategoricalDtype)
+        self.assertNotIsInstance(df["Description"].dtype, pd.CategoricalDtype)
+        self.assertEqual(list(df["Amount"][[0, 20]]), [1000.5, -12.0])
+
+    def test_DateFormatMismatch(self):
+        schema = Schema.from_dict({"columns": {"Date": {"type": "date", "format": "%Y-%m-%d"}}})
+
+        with self.assertRaises(ValueError):
+            r.DataReader([self.file], schema=schema).read()
+
+    def test_AssignNewCategory(self):
+        df = pd.DataFrame({"amount": [-5.0, 10.0], "type": pd.Categorical(["debit", "debit"])})
+        rule = transform.ConditionalUpdate([filter_lib.GreaterThan("amount", 0)], [assignment_lib.StringAssignment("type", "credit")])
+
+        updated = rule.transform(df.copy())
+        combined = transform.RuleSet([rule, rule]).transform(df.copy())
+
+        self.assertEqual(list(updated["type"]), ["debit", "credit"])
+        self.assertEqual(list(combined["type"]), ["debit", "credit"])
+
+class TestTransactions(unittest.TestCase):
+    def test_BatchHashesMatchTransaction(self):
+        df = pd.DataFrame({
+            "date": pd.to_datetime(["2025-01-01", "2025-01-02", None]),
+            "description": ["Coffee", None, "Rent"],
+            "institution": ["Bank", "Bank", "Bank"],
+            "type": ["debit", "debit", "credit"],
+            "amount": [4.5, 10.0, 1200.0]
+        })
+
+        batch = transaction_lib.TransactionBatch.from_dataframe(df)
+        expected = [
+            transaction_lib.Transaction(row["date"], row["description"], row["institution"], row["type"], round(row["amount"] * 100)).hash
+            for _, row in df.iterrows()
+        ]
+
+        self.assertEqual(list(batch.frame["hash"]), expected)
+        self.assertEqual([t.hash for t in batch], expected)
+
+    def test_AmountsHashedAsCents(self):
+        amounts = [pd.Series([10, -3]), pd.Series([10.0, -3.0]), pd.Series(["$10.00", "(3)"]), pd.Series(["10", "-3.00"])]
+        hashes = []
+        for amount in amounts:
+            batch = transaction_lib.TransactionBatch.from_dataframe(pd.DataFrame({
+                "date": pd.to_datetime(["2025-01-01", "2025-01-02"]),
+                "description": ["Coffee", "Fee"],
+                "institution": ["Bank", "Bank"],
+                "type": ["debit", "debit"],
+                "amount": amount
+            }))
+            self.assertEqual(list(batch.frame["amount_cents"]), [1000, -300])
+            hashes.append(list(batch.frame["hash"]))
+
+        self.assertTrue(all(h == hashes[0] for h in hashes))
+
+    def test_WriteCentsToCSV(self):
+        batch = transaction_lib.TransactionBatch.from_dataframe(pd.DataFrame({
+            "date": pd.to_datetime(["2025-01-01", "2025-01-02", "2025-01-03"]),
+            "description": ["a", "b", "c"],
+            "institution": ["Bank"] * 3,
+            "type": ["debit"] * 3,
+            "amount": [0.1 + 0.2, -0.05, 1234567.891]
+        }))
+
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, "out.csv")
+            batch.write_to_csv(file_path)
+            df = pd.read_csv(file_path, dtype={"amount": "str"})
+
+        self.assertEqual(list(df["amount"]), ["0.30", "-0.05", "1234567.89"])
+
+    def test_WriteToDatabase(self):
+        df = pd.DataFrame({
+            "date": pd.to_datetime(["2025-01-01", "2025-01-02", "2025-01-03", "2025-01-04", "2025-01-05"]),
+            "description": ["a", "b", "c", "d", "e"],
+            "institution": ["Bank"] * 5,
+            "type": ["debit"] * 5,
+            "amount": [1.0, 2.0, 3.0, 4.0, 5.0]
+        })
+        batch = transaction_lib.TransactionBatch.from_dataframe(df)
+
+        with tempfile.TemporaryDirectory() as directory:
+            db = DatabaseInterface(os.path.join(directory, "dt"))
+
+            self.assertEqual(batch.write_to_db(db, batch_size=2), (5, 0))
+            self.assertEqual(batch.write_to_db(db, batch_size=2), (0, 5))
+            self.assertEqual(db.transactions_count(), 5)
+            db.connection.close()
+
+    def test_DuplicateHashesIgnored(self):
+        with tempfile.TemporaryDirectory() as directory:
+            # Database from before the unique hash index existed.
+            connection = sqlite3.connect(os.path.join(directory, "db.sqlite"))
+            connection.execute("CREATE TABLE transactions (id INTEGER PRIMARY KEY, hash TEXT, date TEXT, description TEXT, institution TEXT, type TEXT, amount REAL)")
+            connection.executemany("INSERT INTO transactions (hash) VALUES (?)", [("a",), ("a",), ("b",)])
+            connection.commit()
+            connection.close()
+
+            db = DatabaseInterface(os.path.join(directory, "dt"))
+            self.assertEqual(db.transactions_count(), 2)
+
+            with db.connection:
+                added = db.transactions_insert_many([("a", None, None, None, None, None, None), ("c", None, None, None, None, None, None), ("c", None, None, None, None, None, None)])
+            self.assertEqual(added, 1)
+            self.assertEqual(db.transactions_count(), 3)
+            db.connection.close()
+
+@unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow is not installed")
+class TestColumnarOutput(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.directory.name, "out")
+        self.batch = transaction_lib.TransactionBatch.from_dataframe(pd.DataFrame({
+            "date": pd.to_datetime(["2024-12-31", "2025-01-01", "2025-01-15"]),
+            "description": ["Coffee", "Rent", "Salary"],
+            "institution": ["Bank"] * 3,
+            "type": ["debit", "debit", "credit"],
+            "amount": [4.5, 1200.0, 2500.0]
+        }))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_PartitionedRoundTrip(self):
+        for format in ["parquet", "feather"]:
+            output = os.path.join(self.output, format)
+            self.batch.write_to_columnar(output, format)
+            reader = r.DataReader([output])
+            df = reader.read()
+
+            self.assertEqual([os.path.relpath(os.path.dirname(f), output) for f in reader.files()], ["year=2024/month=12", "year=2025/month=01"])
+            self.assertEqual(list(df.columns), ["id", *transaction_lib.BATCH_COLUMNS])
+            self.assertEqual(list(df["date"]), list(self.batch.frame["date"]))
+            self.assertEqual(list(df["amount_cents"]), [450, 120000, 250000])
+            self.assertEqual(list(transaction_lib.TransactionBatch.from_dataframe(df).frame["hash"]), list(df["id"]))
+            self.assertEqual(list(df["id"]), list(self.batch.frame["hash"]))
+
+            chunks = list(r.DataReader([output], chunksize=1).read_chunks())
+            self.assertEqual(len(chunks), 3)
+
+    def test_AppendAddsPartFiles(self):
+        self.batch.write_to_columnar(self.output, "parquet")
+        self.batch.write_to_columnar(self.output, "parquet", append=True)
+        appended = len(r.DataReader([self.output]).read())
+        self.batch.write_to_columnar(self.output, "parquet")
+        overwritten = len(r.DataReader([self.output]).read())
+
+        self.assertEqual(appended, 6)
+        self.assertEqual(overwritten, 3)
+
+class TestDatabase(unittest.TestCase):
+    def test_MigrateBaselineDatabase(self):
+        with tempfile.TemporaryDirectory() as directory:
+            connection = sqlite3.connect(os.path.join(directory, "db.sqlite"))
+            connection.execute("CREATE TABLE transactions (id INTEGER PRIMARY KEY, hash TEXT, date TEXT, description TEXT, institution TEXT, type TEXT, amount REAL)")
+            # Float amounts hashed as written: the same transaction imported as 10.1 and 10.10.
+            connection.executemany(
+                "INSERT INTO transactions (hash, date, description, institution, type, amount) VALUES (?, '2025-01-01T00:00:00', 'Coffee', 'Bank', 'debit', ?)",
+                [("a", 10.1), ("b", 10.10)]
+            )
+            connection.commit()
+            connection.close()
+
+            db = DatabaseInterface(os.path.join(directory, "dt"))
+            version = db.connection.execute("PRAGMA user_version").fetchone()[0]
+            journal_mode = db.connection.execute("PRAGMA journal_mode").fetchone()[0]
+            rows = db.connection.execute("SELECT hash, amount_cents FROM transactions").fetchall()
+            found = db.transactions_search_text("coffee")
+            db.connection.close()
+
+            batch = transaction_lib.TransactionBatch.from_dataframe(pd.DataFrame({
+                "date": pd.to_datetime(["2025-01-01"]), "description": ["Coffee"], "institution": ["Bank"], "type": ["debit"], "amount": ["10.10"]
+            }))
+            self.assertEqual(version, MIGRATIONS[-1].version)
+            self.assertEqual(journal_mode, "wal")
+            self.assertEqual(rows, [(batch.frame["hash"][0], 1010)])
+            self.assertEqual([row[1] for row in found], [batch.frame["hash"][0]])
+
+class TransactionsTestCase(unittest.TestCase):
+    """Database holding a few transactions of two institutions."""
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = DatabaseInterface(os.path.join(self.directory.name, "dt"))
+        transaction_lib.TransactionBatch.from_dataframe(pd.DataFrame({
+            "date": pd.to_datetime(["2025-01-01", "2025-01-31", "2025-02-01", "2025-02-15", "2025-03-01", "2025-03-02"]),
+            "description": ["Coffee", "Rent", "100% Juice", "Coffee beans", "Salary", "Fee"],
+            "institution": ["Bank", "Bank", "Card", "Card", "Bank", "Card"],
+            "type": ["debit", "debit", "debit", "debit", "credit", "debit"],
+            "amount": [4.5, 1200.0, 3.0, 18.25, 2500.0, 12.5],
+            "category": ["food", "housing", "food", "food", "income", None]
+        })).write_to_db(self.db)
+
+    def tearDown(self):
+        self.db.connection.close()
+        self.directory.cleanup()
+
+class TestQuery(TransactionsTestCase):
+    def descriptions(self, query: TransactionQuery) -> list[str]:
+        return [row[3] for row in self.db.transactions_stream(query, batch_size=2)]
+
+    def test_Filters(self):
+        self.assertEqual(self.descriptions(TransactionQuery(start_date=datetime(2025, 1, 31).date(), end_date=datetime(2025, 2, 15).date())), ["Rent", "100% Juice", "Coffee beans"])
+        self.assertEqual(self.descriptions(TransactionQuery(institutions=["Card"], types=["debit"], min_cents=1000)), ["Coffee beans", "Fee"])
+        self.assertEqual(self.descriptions(TransactionQuery(max_cents=parse_amount("4.50"))), ["Coffee", "100% Juice"])
+        self.assertEqual(self.descriptions(TransactionQuery(text="coffee", descending=True)), ["Coffee beans", "Coffee"])
+        self.assertEqual(self.descriptions(TransactionQuery(text="0% j")), ["100% Juice"])
+        self.assertEqual(self.descriptions(TransactionQuery(text="%")), ["100% Juice"])
+
+    def test_KeysetPagination(self):
+        queries = [TransactionQuery(), TransactionQuery(institutions=["Card"], descending=True), TransactionQuery(sort="category"), TransactionQuery(sort="category", descending=True)]
+        for query in queries:
+            for limit in [1, 2]:
+                pages = []
+                after = None
+                while len(page := self.db.transactions_query(query, after, limit)) > 0:
+                    pages.append(page)
+                    after = query.key(page[-1])
+
+                self.assertTrue(all(len(page) <= limit for page in pages))
+                self.assertEqual([row for page in pages for row in page], list(self.db.transactions_stream(query)))
+
+    def test_Sort(self):
+        self.assertEqual(self.descriptions(TransactionQuery(sort="category")), ["Fee", "Coffee", "100% Juice", "Coffee beans", "Rent", "Salary"])
+        self.assertEqual(self.descriptions(TransactionQuery(sort="category", descending=True)), ["Salary", "Rent", "Coffee beans", "100% Juice", "Coffee", "Fee"])
+        self.assertEqual(self.descriptions(TransactionQuery(sort="amount", institutions=["Card"])), ["100% Juice", "Fee", "Coffee beans"])
+        with self.assertRaises(ValueError):
+            TransactionQuery(sort="hash")
+
+    def test_QueryApplicationWritesCSV(self):
+        output = os.path.join(self.directory.name, "out.csv")
+        args = Namespace(start_date=None, end_date=None, institution=["Bank"], type=None, category=None, min=None, max=None, search=None, descending=True, limit=2, output=output, batch_size=100)
+
+        QueryApplication(args, self.db).run()
+
+        with open(output) as file:
+            lines = file.read().splitlines()
+        self.assertEqual(lines[0], "id,date,description,institution,type,amount")
+        self.assertEqual([line.split(",", 1)[1] for line in lines[1:]], ["2025-03-01,Salary,Bank,credit,2500.00", "2025-01-31,Rent,Bank,debit,1200.00"])
+
+class TestSearch(TransactionsTestCase):
+    def descriptions(self, text: str, query: TransactionQuery | None = None) -> list[str]:
+        return [row[3] for row in self.db.transactions_search_text(text, query)]
+
+    def test_RankedMatches(self):
+        self.assertEqual(self.descriptions("coffee"), ["Coffee", "Coffee beans"])
+        self.assertEqual(self.descriptions("COF*"), ["Coffee", "Coffee beans"])
+        self.assertEqual(self.descriptions("coffee beans"), ["Coffee beans"])
+        self.assertEqual(self.descriptions("coffee", TransactionQuery(institutions=["Card"])), ["Coffee beans"])
+        self.assertEqual(self.descriptions('juice" OR "rent'), [])
+
+    def test_IndexFollowsTable(self):
+        with self.db.connection:
+            self.db.connection.execute("UPDATE transactions SET description = 'Espresso' WHERE description = 'Coffee'")
+            self.db.connection.execute("DELETE FROM transactions WHERE description = 'Coffee beans'")
+
+        self.assertEqual(self.descriptions("coffee"), [])
+        self.assertEqual(self.descriptions("espresso"), ["Espresso"])
+
+        self.db.transactions_fts_rebuild()
+        self.assertEqual(self.descriptions("espresso"), ["Espresso"])
+
+    def test_Pagination(self):
+        transaction_lib.TransactionBatch.from_dataframe(pd.DataFrame({
+            "date": pd.to_datetime(["2025-04-01"] * 5),
+            "description": [f"Coffee shop {i}" for i in range(5)],
+            "institution": ["Bank"] * 5,
+            "type": ["debit"] * 5,
+            "amount": [1.0, 2.0, 3.0, 4.0, 5.0]
+        })).write_to_db(self.db)
+
+        pages = []
+        after = None
+        while len(page := self.db.transactions_search_text("coffee", after=after, limit=3)) > 0:
+            pages.append(page)
+            after = TransactionQuery.search_key(page[-1])
+
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual(len({row[0] for page in pages for row in page}), 7)
+        self.assertEqual([row[-1] for page in pages for row in page], sorted(row[-1] for page in pages for row in page))
+
+class TestReport(TransactionsTestCase):
+    def test_AggregatesMaintainedOnInsert(self):
+        transaction_lib.TransactionBatch.from_dataframe(pd.DataFrame({
+            "date": pd.to_datetime(["2025-01-01", "2025-01-20", "2025-02-20"]),
+            "description": ["Coffee", "Coffee", "Tea"],
+            "institution": ["Bank", "Bank", "Card"],
+            "type": ["debit"] * 3,
+            "amount": [4.5, 2.25, 30.0],
+            "category": ["food"] * 3
+        })).write_to_db(self.db)
+
+        totals = self.db.aggregates_read(AggregateQuery(["month", "category"]))
+        self.db.aggregates_rebuild()
+
+        self.assertEqual(totals, self.db.aggregates_read(AggregateQuery(["month", "category"])))
+        self.assertEqual(totals, [
+            ("2025-01", "food", 2, 675, 225, 450),
+            ("2025-01", "housing", 1, 120000, 120000, 120000),
+            ("2025-02", "food", 3, 5125, 300, 3000),
+            ("2025-03", "", 1, 1250, 1250, 1250),
+            ("2025-03", "income", 1, 250000, 250000, 250000),
+        ])
+
+    def test_ReportApplicationWritesCSV(self):
+        output = os.path.join(self.directory.name, "report.csv")
+        args = Namespace(by=["year", "institution"], start_month="2025-02", end_month=None, institution=None, type=["debit"], category=None, output=output, rebuild=False)
+
+        ReportApplication(args, self.db).run()
+
+        with open(output) as file:
+            self.assertEqual(file.read().splitlines(), ["year,institution,count,total,min,max", "2025,Card,3,33.75,3.00,18.25"])
+
+@unittest.skipUnless(importlib.util.find_spec("PyQt5"), "PyQt5 is not installed")
+class TestGUI(TransactionsTestCase):
+    @classmethod
+    def setUpClass(cls):
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PyQt5.QtWidgets import QApplication
+        cls.app = QApplication.instance() or QApplication([])
+
+    def column(self, model, column: int) -> list[str]:
+        return [model.data(model.index(row, column)) for row in range(model.rowCount())]
+
+    def test_ModelFetchesPages(self):
+        from dt.gui import TransactionTableModel
+        model = TransactionTableModel(self.db, page_size=4)
+        self.assertEqual(model.rowCount(), 0)
+
+        model.fetchMore()
+        self.assertEqual(self.column(model, 1), ["Coffee", "Rent", "100% Juice", "Coffee beans"])
+        self.assertTrue(model.canFetchMore())
+
+        model.fetchMore()
+        self.assertEqual(model.rowCount(), 6)
+        self.assertFalse(model.canFetchMore())
+        self.assertEqual(self.column(model, 0)[:2], ["2025-01-01", "2025-01-31"])
+        self.assertEqual(self.column(model, 4)[:2], ["4.50", "1200.00"])
+        self.assertEqual(self.column(model, 5)[-1], "")
+
+    def test_SortAndFilterInDatabase(self):
+        from PyQt5.QtCore import Qt
+        from dt.gui import TransactionTableModel
+        model = TransactionTableModel(self.db, page_size=2)
+
+        model.sort(4, Qt.SortOrder.DescendingOrder)
+        self.assertEqual(self.column(model, 1), ["Salary", "Rent"])
+
+        model.set_query(TransactionQuery(institutions=["Card"]))
+        while model.canFetchMore():
+            model.fetchMore()
+        self.assertEqual(self.column(model, 4), ["18.25", "12.50", "3.00"])
+
+    def test_MainWindow(self):
+        from dt.gui import DTMainWindow, DTFilterBar
+        window = DTMainWindow(self.db)
+        filters = window.findChild(DTFilterBar)
+        self.assertEqual(self.column(window.model, 1), ["Coffee", "Rent", "100% Juice", "Coffee beans", "Salary", "Fee"])
+
+        institution = filters.choices["institution"]
+        self.assertEqual([institution.itemText(index) for index in range(institution.count())], ["All institutions", "Bank", "Card"])
+        institution.setCurrentIndex(2)
+        filters.text.setText("coffee")
+        filters.apply()
+        self.assertEqual(self.column(window.model, 1), ["Coffee beans"])
+        window.close()
+
+    def test_ImportInBackground(self):
+        from dt.gui import DTMainWindow
+        with open(os.path.join(self.directory.name, "statement.csv"), "w") as file:
+            file.write("date,description,type,amount\n2025-04-01,Books,debit,9.99\n")
+        with open(os.path.join(self.directory.name, "bank.json"), "w") as file:
+            file.write("""{"transforms": [
+                {"type": "date", "columns": ["date"], "date_format": "%Y-%m-%d"},
+                {"type": "create_column", "name": "institution", "default_value": "Shop"},
+                {"type": "reorder_columns", "columns": ["date", "description", "institution", "type", "amount"]}
+            ]}""")
+
+        window = DTMainWindow(self.db)
+        finished = []
+        worker = window.start_import(os.path.join(self.directory.name, "bank.json"), [os.path.join(self.directory.name, "statement.csv")])
+        worker.finished.connect(finished.append)
+        deadline = time.monotonic() + 10
+        while len(finished) == 0 and time.monotonic() < deadline:
+            self.app.processEvents()
+
+        self.assertEqual(finished[0].rows_inserted, 1)
+        self.assertEqual(self.column(window.model, 1)[-1], "Books")
+        institution = window.filters.choices["institution"]
+        self.assertEqual([institution.itemText(index) for index in range(institution.count())], ["All institutions", "Bank", "Card", "Shop"])
+        window.close()
+
+class TestImportManifest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = DatabaseInterface(os.path.join(self.directory.name, "dt"))
+        self.statements = os.path.join(self.directory.name, "statements")
+        os.mkdir(self.statements)
+        for name, amount in [("a.csv", 1), ("b.csv", 2)]:
+            with open(os.path.join(self.statements, name), "w") as file:
+                file.write(f"date,amount\n2025-01-01,{amount}\n")
+
+    def tearDown(self):
+        self.db.connection.close()
+        self.directory.cleanup()
+
+    def read(self) -> r.DataReader:
+        reader = r.DataReader([self.statements], manifest=ImportManifest(self.db, "bank"))
+        reader.read()
+        with self.db.connection:
+            reader.manifest.record(reader.rows)
+        return reader
+
+    def test_UnchangedFilesSkipped(self):
+        first = self.read()
+        second = self.read()
+
+        self.assertEqual(len(first.rows), 2)
+        self.assertEqual(len(second.rows), 0)
+        self.assertEqual(len(second.skipped), 2)
+        self.assertEqual(self.db.connection.execute("SELECT SUM(rows) FROM imports").fetchone()[0], 2)
+
+    def test_ModifiedAndCopiedFiles(self):
+        self.read()
+        with open(os.path.join(self.statements, "a.csv"), "a") as file:
+            file.write("2025-01-02,3\n")
+        with open(os.path.join(self.statements, "b.csv")) as source, open(os.path.join(self.statements, "c.csv"), "w") as copy:
+            copy.write(source.read())
+
+        reader = self.read()
+
+        self.assertEqual(list(reader.rows), [os.path.join(self.statements, "a.csv")])
+        self.assertEqual(reader.skipped, [os.path.join(self.statements, "b.csv"), os.path.join(self.statements, "c.csv")])
+
+class TestWatch(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = DatabaseInterface(os.path.join(self.directory.name, "dt"))
+        self.drop = os.path.join(self.directory.name, "drop")
+        os.mkdir(self.drop)
+
+        config = os.path.join(self.directory.name, "bank.json")
+        with open(config, "w") as file:
+            file.write("""{"transforms": [
+                {"type": "date", "columns": ["date"], "date_format": "%Y-%m-%d"},
+                {"type": "create_column", "name": "institution", "default_value": "Bank"},
+                {"type": "reorder_columns", "columns": ["date", "description", "institution", "type", "amount"]}
+            ]}""")
+        self.args = Namespace(config=config, directory=self.drop, verbose=False, interval=0.0, once=True, batch_size=100)
+
+    def tearDown(self):
+        self.db.connection.close()
+        self.directory.cleanup()
+
+    def drop_file(self, name: str, description: str):
+        with open(os.path.join(self.drop, name), "w") as file:
+            file.write(f"date,description,type,amount\n2025-01-01,{description},debit,1.50\n")
+
+    def test_ImportsNewFilesOnce(self):
+        self.drop_file("a.csv", "Coffee")
+        self.drop_file("b.csv", "Rent")
+        application = WatchApplication(self.args, self.db)
+        application.run()
+
+        self.drop_file("c.csv", "Salary")
+        application.run()
+        application.run()
+
+        self.assertEqual(self.db.transactions_count(), 3)
+        self.assertEqual(self.db.connection.execute("SELECT COUNT(*) FROM imports").fetchone()[0], 3)
+
+    def test_FailedImportRetried(self):
+        self.drop_file("a.csv", "Coffee")
+        application = WatchApplication(self.args, self.db)
+        ready = application.poll()
+
+        with mock.patch.object(transaction_lib.TransactionBatch, "insert_into_db", side_effect=sqlite3.OperationalError("database is locked")):
+            with self.assertRaises(RuntimeError):
+                application.import_files(ready)
+        self.assertEqual(self.db.transactions_count(), 0)
+        self.assertEqual(self.db.connection.execute("SELECT COUNT(*) FROM imports").fetchone()[0], 0)
+
+        self.assertEqual(application.poll(), ready)
+        application.import_files(ready)
+        self.assertEqual(self.db.transactions_count(), 1)
+        self.assertEqual(application.poll(), [])
+
+    def test_WaitsForFilesToSettle(self):
+        application = WatchApplication(Namespace(**{**vars(self.args), "once": False}), self.db)
+        self.drop_file("a.csv", "Coffee")
+
+        self.assertEqual(application.poll(), [])
+        self.assertEqual(application.poll(), [os.path.join(self.drop, "a.csv")])
+
+class TestImportJob(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = DatabaseInterface(os.path.join(self.directory.name, "dt"))
+        self.statements = os.path.join(self.directory.name, "statements")
+        os.mkdir(self.statements)
+        for name, descriptions in [("a.csv", ["Coffee", "Rent", "Salary"]), ("b.csv", ["Salary", "Fee", "Juice"])]:
+            with open(os.path.join(self.statements, name), "w") as file:
+                file.write("date,description,type,amount\n" + "".join(f"2025-01-01,{description},debit,1.50\n" for description in descriptions))
+
+        self.config = os.path.join(self.directory.name, "bank.json")
+        with open(self.config, "w") as file:
+            file.write("""{"transforms": [
+                {"type": "date", "columns": ["date"], "date_format": "%Y-%m-%d"},
+                {"type": "create_column", "name": "institution", "default_value": "Bank"},
+                {"type": "reorder_columns", "columns": ["date", "description", "institution", "type", "amount"]}
+            ]}""")
+
+    def tearDown(self):
+        self.db.connection.close()
+        self.directory.cleanup()
+
+    def job(self, **kwargs) -> ImportJob:
+        return ImportJob(self.db, Config(self.config, self.db), [self.statements], batch_size=2, **kwargs)
+
+    def stored(self, table: str) -> int:
+        return self.db.connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def test_ProgressReported(self):
+        events = []
+        progress = self.job(on_progress=events.append).run()
+
+        self.assertEqual([event.files_read for event in events if event.rows_transformed == 0], [0, 1, 2])
+        self.assertEqual([event.rows_inserted + event.rows_skipped for event in events if event.rows_transformed == 6], [0, 2, 4, 6, 6])
+        self.assertEqual((progress.files_total, progress.rows_read, progress.rows_inserted, progress.rows_skipped, progress.finished), (2, 6, 5, 1, True))
+        self.assertTrue(events[-1].finished)
+        self.assertEqual(self.db.transactions_count(), 5)
+        self.assertEqual(self.stored("imports"), 2)
+
+    def test_ChunkedProgressCountsRowsReadPerChunk(self):
+        events = []
+        progress = self.job(chunksize=2, on_progress=events.append).run()
+
+        self.assertTrue(all(event.rows_transformed <= event.rows_read for event in events))
+        self.assertEqual((progress.files_read, progress.rows_read, progress.rows_transformed), (2, 6, 6))
+
+    def test_CancelledImportLeavesDatabaseUnchanged(self):
+        def cancel(progress):
+            if progress.rows_inserted > 0:
+                job.cancel()
+
+        for chunksize in [None, 2]:
+            job = self.job(chunksize=chunksize, on_progress=cancel)
+            with self.assertRaises(ImportCancelled):
+                job.run()
+
+            for table in ["transactions", "imports", "monthly_aggregates", "transactions_fts"]:
+                self.assertEqual(self.stored(table), 0)
+
+        self.assertEqual(self.job().run().rows_inserted, 5)
+
+    def test_RunsOnWorkerThread(self):
+        finished = []
+        job = self.job()
+        job.start(on_finished=finished.append).join()
+
+        self.assertEqual(finished, [job])
+        self.assertIsNone(job.error)
+        self.assertEqual(self.db.transactions_count(), 5)
+
+    def test_EveryTransformAppliedInChunks(self):
+        with open(self.config, "w") as file:
+            file.write("""{"transforms": [
+                {"type": "trim_strings", "columns": ["description"]},
+                {"type": "date", "columns": ["date"], "date_format": "%Y-%m-%d"},
+                {"type": "absolute_value", "columns": ["amount"]},
+                {"type": "create_column", "name": "institution", "default_value": "Bank"},
+                {"type": "create_column", "name": "source", "default_value": "statement"},
+                {"type": "conditional_update", "filters": [{"type": "keywords", "column": "description", "keywords": ["fee"]}], "assignments": [{"type": "string", "column": "type", "value": "credit"}]},
+                {"type": "rule_set", "match": "first_match", "rules": [
+                    {"filters": [{"type": "keywords", "column": "description", "keywords": ["salary"]}], "assignments": [{"type": "string", "column": "category", "value": "Income"}]}
+                ]},
+                {"type": "rename_columns", "columns": {"description": "memo"}},
+                {"type": "rename_columns", "columns": {"memo": "description"}},
+                {"type": "drop_columns", "columns": ["source"]},
+                {"type": "reorder_columns", "columns": ["date", "description", "institution", "type", "amount", "category"]}
+            ]}""")
+
+        outputs = []
+        for chunksize in [None, 1]:
+            output = os.path.join(self.directory.name, f"out_{chunksize}.csv")
+            args = Namespace(config=self.config, paths=[self.statements], verbose=False, output=output, append=False, chunksize=chunksize, batch_size=2, jobs=1, force=False, format="csv", progress=False)
+            TransformApplication(args, self.db).run()
+            outputs.append(pd.read_csv(output))
+
+        self.assertEqual(len(outputs[0]), 6)
+        pd.testing.assert_frame_equal(outputs[1], outputs[0])
+
+class TestStartup(unittest.TestCase):
+    def test_ApplicationsImportWithoutPandas(self):
+        result = subprocess.run(
+            [sys.executable, "-c", "import sys, dt.cli; print('pandas' in sys.modules)"],
+            capture_output=True, text=True
+        )
+
+        self.assertEqual(result.stdout.strip(), "False")
+
+    def test_DatabaseOpenedOnFirstUse(self):
+        with tempfile.TemporaryDirectory() as directory:
+            db = DatabaseInterface(os.path.join(directory, "dt"))
+            created = os.path.exists(os.path.join(directory, "db.sqlite"))
+            db.config_list()
+
+            self.assertFalse(created)
+            self.assertTrue(os.path.exists(os.path.join(directory, "db.sqlite")))
+            db.connection.close()
+
 class TestConfigReader(unittest.TestCase):
     def test_ConfigDescription(self):
         self.assertTrue(True)
 
+class TestConfigPlan(unittest.TestCase):
+    CONFIG = '{"name": "bank", "transforms": [{"type": "trim_strings", "columns": ["description"]}, {"type": "absolute_value", "columns": ["amount"]}]}'
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = DatabaseInterface(os.path.join(self.directory.name, "dt"))
+        self.db.config_insert("bank", self.CONFIG)
+
+    def tearDown(self):
+        self.db.connection.close()
+        self.directory.cleanup()
+
+    def test_PlanCompiledOnce(self):
+        config = Config("bank", self.db)
+        plan = config.plan()
+
+        self.assertIs(config.plan(), plan)
+        self.assertEqual(config.transforms(), plan.original)
+        self.assertEqual(len(plan.steps), 1)
+
+    def test_PlanCacheDropped(self):
+        tables = [row[0] for row in self.db.connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+
+        self.assertNotIn("plan_cache", tables)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file